@@ -0,0 +1,46 @@
+"""
+AgentPool: A fixed-size pool of agent manager instances.
+
+Flow:
+1. Constructor (__init__) receives a factory and a pool size
+2. The factory is called once per slot to build independent agent managers
+   (each has its own chat memory, so concurrent queries never share state)
+3. acquire() checks an agent out of the pool and returns it when the block exits,
+   blocking while every agent is busy
+
+The pool is shared by the batch runner and anything else that needs to run
+several queries at the same time.
+"""
+
+import queue
+import logging
+from contextlib import contextmanager
+from typing import Callable, Iterator, Any
+
+logger = logging.getLogger(__name__)
+
+class AgentPool:
+    """Pool of agent managers that can be checked out one query at a time."""
+
+    def __init__(self, factory: Callable[[], Any], size: int):
+        """Build `size` agent managers with the factory."""
+        if size < 1:
+            raise ValueError("Agent pool size must be at least 1")
+        self.size = size
+        self._agents: "queue.Queue[Any]" = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._agents.put(factory())
+        logger.info(f"Created agent pool with {size} agents")
+
+    @contextmanager
+    def acquire(self, timeout: float = None) -> Iterator[Any]:
+        """Check out an agent for the duration of the block."""
+        agent = self._agents.get(timeout=timeout)
+        try:
+            yield agent
+        finally:
+            self._agents.put(agent)
+
+    def available(self) -> int:
+        """Number of idle agents."""
+        return self._agents.qsize()
@@ -0,0 +1,144 @@
+"""
+BatchRunner: Replays JSONL query files through a pool of agents.
+
+Flow:
+1. Constructor (__init__) receives an AgentPool and the number of worker threads
+2. run() streams the input file line by line; at most a few queries per worker
+   are held in memory at once, so arbitrarily large files can be replayed
+3. Each query is answered by an agent checked out of the pool; with a timeout, a query that
+   waits longer than that for an agent fails with BUSY_ERROR instead of queueing forever
+4. Results are appended to the output JSONL as soon as each query finishes
+5. A summary with per-query latency percentiles, queries/sec and failure counts
+   is returned (and written as the final log line)
+
+Input lines are JSON objects. The query text is read from the first present key in
+QUERY_FIELDS and an optional identifier from ID_FIELDS; plain strings are also accepted.
+"""
+
+import json
+import time
+import queue
+import logging
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from agents.agent_pool import AgentPool
+from utils.stats import summarize_latencies
+
+logger = logging.getLogger(__name__)
+
+QUERY_FIELDS = ("query", "prompt", "question", "body")
+ID_FIELDS = ("id", "request_id")
+ERROR_PREFIX = "An error occurred"  # Agent managers report failures as text with this prefix
+BUSY_ERROR = "No agent became available"  # Error of a query that timed out waiting for an agent
+
+class BatchRunner:
+    """Run a JSONL file of queries concurrently and record the results."""
+
+    def __init__(self, pool: AgentPool, workers: Optional[int] = None):
+        """Initialize the runner with a pool of agents."""
+        self.pool = pool
+        self.workers = workers or pool.size
+
+    def _read_queries(self, input_path: Path) -> Iterator[Tuple[str, str]]:
+        """Yield (id, query) pairs from a JSONL file without loading it all."""
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Skipping invalid JSON on line {line_number}: {e}")
+                    continue
+
+                if isinstance(record, str):
+                    yield str(line_number), record
+                    continue
+
+                query = next((record[k] for k in QUERY_FIELDS if record.get(k)), None)
+                if query is None:
+                    logger.warning(f"Skipping line {line_number}: no query field ({', '.join(QUERY_FIELDS)})")
+                    continue
+                query_id = next((record[k] for k in ID_FIELDS if record.get(k)), line_number)
+                yield str(query_id), query
+
+    def run_one(self, query_id: str, query: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Answer one query with a pooled agent and time it, waiting at most timeout for the agent."""
+        start = time.perf_counter()
+        error = None
+        response = ""
+        try:
+            with self.pool.acquire(timeout=timeout) as agent:
+                try:
+                    # Queries are independent: don't let a previous query's chat memory leak in
+                    agent.reset()
+                    response = agent.query(query)
+                except Exception as e:
+                    error = str(e)
+        except queue.Empty:
+            error = f"{BUSY_ERROR} within {timeout:g}s"
+        latency = time.perf_counter() - start
+        if error is None and response.startswith(ERROR_PREFIX):
+            error = response
+        return {
+            "id": query_id,
+            "query": query,
+            "response": response,
+            "latency_s": round(latency, 4),
+            "ok": error is None,
+            "error": error,
+        }
+
+    def run(self, input_path: Path, output_path: Path) -> Dict[str, Any]:
+        """Replay every query in input_path and write results to output_path."""
+        input_path, output_path = Path(input_path), Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Running batch {input_path} -> {output_path} with {self.workers} workers")
+
+        latencies: List[float] = []
+        failures = 0
+        write_lock = threading.Lock()
+        # Bound the number of queued queries so the input is streamed, not slurped
+        in_flight = threading.BoundedSemaphore(self.workers * 2)
+
+        start = time.perf_counter()
+        with open(output_path, "w", encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=self.workers) as executor:
+
+            def on_done(future):
+                nonlocal failures
+                in_flight.release()
+                try:
+                    result = future.result()
+                except Exception as e:  # Defensive: run_one already captures agent errors
+                    logger.error(f"Batch worker failed: {e}")
+                    with write_lock:
+                        failures += 1
+                    return
+                with write_lock:
+                    latencies.append(result["latency_s"])
+                    if not result["ok"]:
+                        failures += 1
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    out.flush()
+                logger.info(f"[{result['id']}] {'ok' if result['ok'] else 'FAILED'} in {result['latency_s']:.2f}s")
+
+            for query_id, query in self._read_queries(input_path):
+                in_flight.acquire()
+                executor.submit(self.run_one, query_id, query).add_done_callback(on_done)
+
+        elapsed = time.perf_counter() - start
+        completed = len(latencies)
+        summary = {
+            "queries": completed,
+            "failures": failures,
+            "elapsed_s": round(elapsed, 3),
+            "queries_per_sec": round(completed / elapsed, 3) if elapsed > 0 else 0.0,
+            "latency_s": {k: round(v, 4) for k, v in summarize_latencies(latencies).items()},
+        }
+        logger.info(f"Batch summary: {json.dumps(summary)}")
+        return summary
@@ -7,52 +7,221 @@ Flow:
    - self.tools (from parameters)
    - self.llm (from config)
    - self.agent (by calling _create_agent())
-3. _create_agent() creates a FunctionCallingAgent with the tools and LLM
-4. query() method processes user queries by delegating to the FunctionCallingAgent
-   and handles any errors that might occur
+3. _create_agent() creates a FunctionCallingAgent with the tools and LLM; its
+   ParallelFunctionCallingAgentWorker runs all tool calls of one model turn concurrently
+   through the shared ToolExecutor (per-tool timeouts and concurrency limits)
+4. query() / aquery() process user queries by delegating to the FunctionCallingAgent
+   and handle any errors that might occur
+5. If a ResponseCache is supplied, answers are served from / stored in it
+   under the "function" namespace before the agent is consulted
 
 The function calling approach differs from ReAct by using structured function 
 definitions that the LLM can directly call, rather than using a reasoning-action loop.
 This results in more predictable tool usage patterns when the task is well-defined.
 """
 
+import json
+import uuid
 import logging 
-from typing import List
+from typing import Any, List, Optional, Sequence
 import importlib
 
-from llama_index.core.agent import FunctionCallingAgent
-from llama_index.core.tools import BaseTool
+from llama_index.core.agent import FunctionCallingAgent, FunctionCallingAgentWorker
+from llama_index.core.agent.function_calling.step import build_missing_tool_output, get_function_by_name
+from llama_index.core.agent.types import Task, TaskStep, TaskStepOutput
+from llama_index.core.agent.utils import add_user_step_to_memory
+from llama_index.core.base.llms.types import ChatMessage, ChatResponse, MessageRole
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.chat_engine.types import AgentChatResponse
+from llama_index.core.llms.function_calling import ToolSelection
+from llama_index.core.tools import BaseTool, ToolOutput
 
 from llm.local_llm import get_llm
+from cache.response_cache import ResponseCache
+from tools.tool_executor import ToolExecutor, get_tool_executor
+from utils.tracing import trace
 
 logger = logging.getLogger(__name__)
 
+class ParallelFunctionCallingAgentWorker(FunctionCallingAgentWorker):
+    """FunctionCallingAgentWorker that runs the tool calls of one model turn concurrently.
+
+    The upstream sync worker calls the tools of a turn one after another. Here they go to
+    the ToolExecutor together, and their results are written to memory in call order.
+    """
+
+    def __init__(self, *args: Any, tool_executor: Optional[ToolExecutor] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.tool_executor = tool_executor or get_tool_executor()
+
+    def _start_turn(self, step: TaskStep, task: Task) -> List[BaseTool]:
+        if step.input is not None:
+            add_user_step_to_memory(step, task.extra_state["new_memory"], verbose=self._verbose)
+        return self.get_tools(task.input)
+
+    def _pending_tool_calls(self, task: Task, response: ChatResponse) -> List[ToolSelection]:
+        """Tool calls of this turn, or none when the model answered or the call budget is spent."""
+        tool_calls = self._llm.get_tool_calls_from_response(response, error_on_no_tool_call=False)
+        if self._verbose and response.message.content:
+            print("=== LLM Response ===")
+            print(str(response.message.content))
+        if not self.allow_parallel_tool_calls and len(tool_calls) > 1:
+            raise ValueError("Parallel tool calls are disabled for this function calling agent")
+        task.extra_state["new_memory"].put(response.message)
+        if task.extra_state["n_function_calls"] >= self._max_function_calls:
+            return []
+        if self._verbose:
+            for tool_call in tool_calls:
+                print("=== Calling Function ===")
+                print(f"Calling function: {tool_call.tool_name} with args: {json.dumps(tool_call.tool_kwargs)}")
+        return tool_calls
+
+    def _finish_turn(self, step: TaskStep, task: Task, response: ChatResponse, tools: List[BaseTool],
+                     tool_calls: List[ToolSelection], outputs: List[ToolOutput]) -> TaskStepOutput:
+        """Record the tool results like the upstream worker does and build the step output."""
+        for tool_call, tool_output in zip(tool_calls, outputs):
+            with self.callback_manager.event(
+                CBEventType.FUNCTION_CALL,
+                payload={EventPayload.FUNCTION_CALL: json.dumps(tool_call.tool_kwargs)},
+            ) as event:
+                event.on_end(payload={EventPayload.FUNCTION_OUTPUT: str(tool_output)})
+            if self._verbose:
+                print("=== Function Output ===")
+                print(tool_output.content)
+            task.extra_state["new_memory"].put(ChatMessage(
+                content=str(tool_output),
+                role=MessageRole.TOOL,
+                additional_kwargs={"name": tool_call.tool_name, "tool_call_id": tool_call.tool_id},
+            ))
+        task.extra_state["sources"].extend(outputs)
+        task.extra_state["n_function_calls"] += len(tool_calls)
+
+        is_done = not tool_calls
+        response_str = str(response.message.content)
+        # A return_direct tool ends the task with its output, as upstream, only for a single call
+        if len(tool_calls) == 1:
+            tool = get_function_by_name(tools, tool_calls[0].tool_name)
+            if tool is not None and tool.metadata.return_direct:
+                is_done = True
+                response_str = outputs[0].content
+
+        new_steps = [] if is_done else [step.get_next_step(step_id=str(uuid.uuid4()), input=None)]
+        return TaskStepOutput(
+            output=AgentChatResponse(response=response_str, sources=outputs),
+            task_step=step,
+            is_last=is_done,
+            next_steps=new_steps,
+        )
+
+    def _resolve(self, tools: List[BaseTool], tool_calls: List[ToolSelection]) -> List[Optional[tuple]]:
+        """(tool, arguments) per call, or None for a tool the model made up."""
+        resolved = []
+        for tool_call in tool_calls:
+            tool = get_function_by_name(tools, tool_call.tool_name)
+            resolved.append((tool, tool_call.tool_kwargs) if tool is not None else None)
+        return resolved
+
+    def _merge(self, tool_calls: List[ToolSelection], resolved: List[Optional[tuple]],
+               outputs: List[ToolOutput]) -> List[ToolOutput]:
+        """Outputs in call order, with an error output for each unknown tool."""
+        executed = iter(outputs)
+        return [next(executed) if call is not None else build_missing_tool_output(tool_call)
+                for tool_call, call in zip(tool_calls, resolved)]
+
+    def run_step(self, step: TaskStep, task: Task, **kwargs: Any) -> TaskStepOutput:
+        tools = self._start_turn(step, task)
+        response = self._llm.chat_with_tools(
+            tools=tools,
+            user_msg=None,
+            chat_history=self.get_all_messages(task),
+            verbose=self._verbose,
+            allow_parallel_tool_calls=self.allow_parallel_tool_calls,
+        )
+        tool_calls = self._pending_tool_calls(task, response)
+        resolved = self._resolve(tools, tool_calls)
+        outputs = self.tool_executor.run([call for call in resolved if call is not None])
+        return self._finish_turn(step, task, response, tools, tool_calls, self._merge(tool_calls, resolved, outputs))
+
+    async def arun_step(self, step: TaskStep, task: Task, **kwargs: Any) -> TaskStepOutput:
+        tools = self._start_turn(step, task)
+        response = await self._llm.achat_with_tools(
+            tools=tools,
+            user_msg=None,
+            chat_history=self.get_all_messages(task),
+            verbose=self._verbose,
+            allow_parallel_tool_calls=self.allow_parallel_tool_calls,
+        )
+        tool_calls = self._pending_tool_calls(task, response)
+        resolved = self._resolve(tools, tool_calls)
+        outputs = await self.tool_executor.arun([call for call in resolved if call is not None])
+        return self._finish_turn(step, task, response, tools, tool_calls, self._merge(tool_calls, resolved, outputs))
+
 class FunctionCallingAgentManager(FunctionCallingAgent):
     """Manager for creating and using Function Calling agents."""
-    def __init__(self, tools: List[BaseTool]):
+    CACHE_NAMESPACE = "function"
+
+    def __init__(self, tools: List[BaseTool], response_cache: Optional[ResponseCache] = None):
+        self.response_cache = response_cache
         # Get LLM settings from config
         config_vars = vars(importlib.import_module("config"))
         self.llm = get_llm(config_vars)
         self.tools = tools
         self.agent = self._create_agent()
     
+    def _get_cached(self, query_text: str) -> Optional[str]:
+        """Look the query up in the response cache, if one is configured."""
+        if self.response_cache is None:
+            return None
+        return self.response_cache.get(query_text, namespace=self.CACHE_NAMESPACE)
+
+    def _store(self, query_text: str, response: str, sources: Sequence[ToolOutput] = ()) -> str:
+        """Store a successful response (and the tool outputs behind it) in the cache and return it."""
+        if self.response_cache is not None and response:
+            self.response_cache.put(query_text, response, namespace=self.CACHE_NAMESPACE, sources=sources)
+        return response
+
     def _create_agent(self) -> FunctionCallingAgent:
         """Create a FunctionCalling agent with the configured tools."""
         logger.info("Creating FunctionCalling agent")
-        return FunctionCallingAgent.from_tools(
+        worker = ParallelFunctionCallingAgentWorker.from_tools(
             tools=self.tools,
             llm=self.llm,
             verbose=True,
         )
+        # Same wiring as FunctionCallingAgent.from_tools, with the parallel worker
+        return FunctionCallingAgent(worker, llm=self.llm, callback_manager=self.llm.callback_manager, verbose=True)
     
+    def reset(self):
+        """Clear the wrapped agent's chat memory so the next query starts fresh."""
+        self.agent.reset()
+
     def query(self, query_text: str) -> str:
         """Process a query using the Function Calling agent."""
         logger.info(f"Processing query with Function Calling agent: {query_text}")
-        try:
-            # Call the agent's query method to process the input
-            response = self.agent.query(query_text)
-            return str(response)
-        except Exception as e:
-            logger.error(f"Error processing query: {e}")
-            return f"An error occurred: {str(e)}"
- 
\ No newline at end of file
+        with trace("function.query", query=query_text) as root:
+            cached = self._get_cached(query_text)
+            if cached is not None:
+                root.set(response_cache_hit=True)
+                return cached
+            try:
+                # What agent.query does, keeping the tool outputs (sources) for the response cache
+                response = self.agent.chat(query_text, chat_history=[])
+                return self._store(query_text, str(response), response.sources)
+            except Exception as e:
+                logger.error(f"Error processing query: {e}")
+                return f"An error occurred: {str(e)}"
+
+    async def aquery(self, query_text: str) -> str:
+        """Process a query asynchronously, without blocking a thread while the model generates."""
+        logger.info(f"Processing async query with Function Calling agent: {query_text}")
+        with trace("function.query", query=query_text) as root:
+            cached = self._get_cached(query_text)
+            if cached is not None:
+                root.set(response_cache_hit=True)
+                return cached
+            try:
+                response = await self.agent.achat(query_text, chat_history=[])
+                return self._store(query_text, str(response), response.sources)
+            except Exception as e:
+                logger.error(f"Error processing query: {e}")
+                return f"An error occurred: {str(e)}"
@@ -0,0 +1,124 @@
+"""
+ReAct Prompt Budgeting
+
+The ReAct worker resends its whole scratchpad (thoughts, actions and tool observations) on
+every step, so prompt prefill grows with each iteration. BudgetedReActChatFormatter keeps it
+bounded:
+
+1. OBSERVATION LIMIT: Tool observations longer than max_observation_tokens are truncated
+   (e.g. the full package list python_package_info returns on a miss)
+2. COMPACTION: When the prompt exceeds prompt_token_budget, all but the keep_recent_steps
+   most recent action/observation pairs are collapsed into one short summary message
+   (tool, input and the start of each observation), built without an LLM call
+3. METRICS: Each formatted prompt's token count is recorded on the current tracing span
+   (the ReAct iteration) and aggregated in stats()
+
+Token counts use utils.tokens, so they are estimates for local models' tokenizers.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from llama_index.core.agent.react.formatter import ReActChatFormatter
+from llama_index.core.agent.react.types import ActionReasoningStep, BaseReasoningStep, ObservationReasoningStep
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.tools import BaseTool
+
+from utils.tokens import count_tokens, truncate_to_tokens
+from utils.tracing import current_span
+
+SUMMARY_HEADER = "Summary of earlier steps (observations shortened):"
+
+class BudgetedReActChatFormatter(ReActChatFormatter):
+    """ReActChatFormatter that truncates observations and compacts old steps to a token budget."""
+
+    prompt_token_budget: int = 3000
+    max_observation_tokens: int = 800
+    keep_recent_steps: int = 2
+    summary_observation_tokens: int = 40
+
+    _stats: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _stats_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def _truncate_observations(self, steps: List[BaseReasoningStep]) -> List[BaseReasoningStep]:
+        truncated = []
+        for step in steps:
+            if isinstance(step, ObservationReasoningStep):
+                observation = truncate_to_tokens(step.observation, self.max_observation_tokens)
+                if observation != step.observation:
+                    self._count("truncated_observations")
+                    step = ObservationReasoningStep(observation=observation, return_direct=step.return_direct)
+            truncated.append(step)
+        return truncated
+
+    def _summary(self, steps: Sequence[BaseReasoningStep]) -> str:
+        """One line per earlier action with the start of its observation."""
+        lines = [SUMMARY_HEADER]
+        for step in steps:
+            if isinstance(step, ActionReasoningStep):
+                lines.append(f"- Action: {step.action}, Input: {step.action_input}")
+            elif isinstance(step, ObservationReasoningStep):
+                observation = " ".join(step.observation.split())
+                lines.append(f"  Observation: {truncate_to_tokens(observation, self.summary_observation_tokens)}")
+        return "\n".join(lines)
+
+    def _split_recent(self, steps: List[BaseReasoningStep]) -> int:
+        """Index of the first step kept verbatim: the start of the last keep_recent_steps actions."""
+        actions = [i for i, step in enumerate(steps) if isinstance(step, ActionReasoningStep)]
+        if len(actions) <= self.keep_recent_steps:
+            return 0
+        return actions[-self.keep_recent_steps] if self.keep_recent_steps else len(steps)
+
+    def format(
+        self,
+        tools: Sequence[BaseTool],
+        chat_history: List[ChatMessage],
+        current_reasoning: Optional[List[BaseReasoningStep]] = None,
+    ) -> List[ChatMessage]:
+        """Format the prompt like ReActChatFormatter, within the token budget."""
+        steps = self._truncate_observations(current_reasoning or [])
+        messages = super().format(tools, chat_history, steps)
+        prompt_tokens = sum(count_tokens(message.content or "") for message in messages)
+
+        compacted = 0
+        split = self._split_recent(steps)
+        if prompt_tokens > self.prompt_token_budget and split > 0:
+            # The reasoning history is the tail of the message list, one message per step
+            prefix = messages[:len(messages) - len(steps)]
+            summary = self._summary(steps[:split])
+            # The first kept step is an assistant action, so the summary joins the preceding user
+            # message; chat templates like Mistral's require alternating roles
+            if prefix[-1].role == MessageRole.USER:
+                prefix[-1] = ChatMessage(role=MessageRole.USER, content=f"{prefix[-1].content}\n\n{summary}")
+            else:
+                prefix.append(ChatMessage(role=MessageRole.USER, content=summary))
+            messages = prefix + messages[len(messages) - len(steps) + split:]
+            compacted = split
+            prompt_tokens = sum(count_tokens(message.content or "") for message in messages)
+
+        self._record(prompt_tokens, compacted)
+        current_span().set(prompt_tokens_estimate=prompt_tokens, compacted_steps=compacted)
+        return messages
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] = self._stats.get(key, 0) + amount
+
+    def _record(self, prompt_tokens: int, compacted: int):
+        with self._stats_lock:
+            self._stats["prompts"] = self._stats.get("prompts", 0) + 1
+            self._stats["prompt_tokens_total"] = self._stats.get("prompt_tokens_total", 0) + prompt_tokens
+            self._stats["prompt_tokens_max"] = max(self._stats.get("prompt_tokens_max", 0), prompt_tokens)
+            self._stats["last_prompt_tokens"] = prompt_tokens
+            if compacted:
+                self._stats["compactions"] = self._stats.get("compactions", 0) + 1
+                self._stats["compacted_steps"] = self._stats.get("compacted_steps", 0) + compacted
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-step prompt size metrics: prompts formatted, total/max/last tokens, compactions."""
+        with self._stats_lock:
+            stats = {"prompts": 0, "prompt_tokens_total": 0, "prompt_tokens_max": 0, "last_prompt_tokens": 0,
+                     "truncated_observations": 0, "compactions": 0, "compacted_steps": 0, **self._stats}
+        stats["prompt_tokens_mean"] = stats["prompt_tokens_total"] / stats["prompts"] if stats["prompts"] else 0.0
+        return stats
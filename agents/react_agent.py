@@ -7,54 +7,325 @@ Flow:
    - self.tools (from parameters)
    - self.llm (from config)
    - self.agent (by calling _create_agent())
-3. _create_agent() creates a ReActAgent with the tools and LLM
-4. query() method processes user queries by delegating to the ReActAgent
-   and handles any errors that might occur
+3. _create_agent() creates a ReAct agent (an AgentRunner driving a TracedReActAgentWorker,
+   which records one tracing span per reasoning iteration) with the tools and LLM; tools run
+   through the shared ToolExecutor, so ReAct actions get the same timeouts and concurrency limits,
+   and a BudgetedReActChatFormatter keeps each step's prompt within REACT_PROMPT_TOKEN_BUDGET
+4. query() / aquery() process user queries by delegating to the ReAct agent
+   and handle any errors that might occur; each query is traced when tracing is enabled
+   and runs under a REACT_QUERY_DEADLINE_SECONDS deadline: the worker stops early with its
+   best partial answer when time runs out, the model repeats a tool call, or
+   REACT_MAX_ITERATIONS is reached (partial answers are not cached)
+5. If a ResponseCache is supplied, answers are served from / stored in it
+   under the "react" namespace before the agent is consulted
+6. stream_query() yields the final answer token by token as the LLM produces it
 
 The 'self' parameter in each method refers to the specific instance,
 allowing each ReActAgentManager to maintain its own state.
 """
 
+import json
+import time
 import logging
-from typing import List
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 import importlib
 
-from llama_index.core.agent import ReActAgent
-from llama_index.core.tools import BaseTool
+from llama_index.core.agent import AgentRunner, ReActAgentWorker
+from llama_index.core.agent.react.types import (
+    ActionReasoningStep,
+    BaseReasoningStep,
+    ObservationReasoningStep,
+    ResponseReasoningStep,
+)
+from llama_index.core.agent.types import Task, TaskStep, TaskStepOutput
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+from llama_index.core.chat_engine.types import AgentChatResponse
+from llama_index.core.tools import BaseTool, ToolOutput
 
-from config import LLM_TYPE
+from config import (
+    LLM_TYPE,
+    REACT_PROMPT_TOKEN_BUDGET,
+    REACT_MAX_OBSERVATION_TOKENS,
+    REACT_KEEP_RECENT_STEPS,
+    REACT_SUMMARY_OBSERVATION_TOKENS,
+    REACT_QUERY_DEADLINE_SECONDS,
+    REACT_MAX_ITERATIONS,
+    REACT_MAX_REPEATED_ACTIONS,
+)
+from agents.prompt_budget import BudgetedReActChatFormatter
 from llm.local_llm import get_llm
+from llm.streaming import StreamStats
+from cache.response_cache import ResponseCache
+from tools.tool_executor import get_tool_executor
+from utils.deadline import DeadlineExceeded, current_deadline, deadline
+from utils.tokens import truncate_to_tokens
+from utils.tracing import current_span, span, trace
 
 logger = logging.getLogger(__name__)
 
+STEP_TIME_SMOOTHING = 0.3     # Weight of the latest step in the moving average of step durations
+PARTIAL_ANSWER_TOKENS = 400   # Tool output kept in a partial answer
+
+STOP_MESSAGES = {
+    "deadline": "I ran out of time before I could finish the answer.",
+    "loop": "I stopped because I kept repeating the same step without making progress.",
+    "max_iterations": "I reached the maximum number of reasoning steps before I could finish the answer.",
+}
+
+class TracedReActAgentWorker(ReActAgentWorker):
+    """ReActAgentWorker that records one "iteration" span per reasoning step and stops early.
+
+    Instead of running another step, a task ends with its best partial answer (the tool results
+    gathered so far) when the query deadline has passed or is closer than a typical step takes,
+    when the model repeats the same tool call max_repeated_actions times, or after
+    max_iterations steps.
+    """
+
+    def __init__(self, *args: Any, max_repeated_actions: int = 2, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._max_repeated_actions = max_repeated_actions
+        self._step_seconds: Optional[float] = None  # Moving average over this worker's steps
+        self.last_stop_reason: Optional[str] = None
+
+    def initialize_step(self, task: Task, **kwargs: Any) -> TaskStep:
+        self.last_stop_reason = None
+        return super().initialize_step(task, **kwargs)
+
+    @contextmanager
+    def _iteration_span(self, task: Task) -> Iterator[None]:
+        reasoning = task.extra_state["current_reasoning"]
+        seen = len(reasoning)
+        task.extra_state["iterations"] = task.extra_state.get("iterations", 0) + 1
+        started = time.monotonic()
+        with span("react.iteration", kind="iteration", iteration=task.extra_state["iterations"]) as iteration_span:
+            yield
+            actions = [step.action for step in reasoning[seen:] if isinstance(step, ActionReasoningStep)]
+            iteration_span.set(actions=actions)
+        elapsed = time.monotonic() - started
+        self._step_seconds = elapsed if self._step_seconds is None else (
+            STEP_TIME_SMOOTHING * elapsed + (1 - STEP_TIME_SMOOTHING) * self._step_seconds
+        )
+
+    def _stop_reason(self, task: Task) -> Optional[str]:
+        """Why the task should not run another step, or None to continue."""
+        iterations = task.extra_state.get("iterations", 0)
+        if iterations >= self._max_iterations:
+            return "max_iterations"
+        active = current_deadline()
+        if active is None:
+            return None
+        if active.expired:
+            return "deadline"
+        # After the first step, don't start one that would likely be cut off by the deadline
+        if iterations and self._step_seconds is not None and active.remaining() < self._step_seconds:
+            return "deadline"
+        return None
+
+    def _repeats_action(self, task: Task) -> bool:
+        """Whether the latest tool call (name and input) has now been made max_repeated_actions times."""
+        if not self._max_repeated_actions:
+            return False
+        calls = [
+            (step.action, json.dumps(step.action_input, sort_keys=True, default=str))
+            for step in task.extra_state["current_reasoning"]
+            if isinstance(step, ActionReasoningStep)
+        ]
+        return bool(calls) and calls.count(calls[-1]) >= self._max_repeated_actions
+
+    def _partial_answer(self, task: Task, reason: str) -> str:
+        """The stop message followed by the successful tool results, else the last thought."""
+        findings: List[str] = []
+        for source in task.extra_state["sources"]:
+            content = source.content
+            if not source.is_error and not content.startswith("Error:") and content not in findings:
+                findings.append(content)
+        if findings:
+            found = truncate_to_tokens("\n".join(findings), PARTIAL_ANSWER_TOKENS)
+            return f"{STOP_MESSAGES[reason]} Here is what I found so far:\n{found}"
+        thoughts = [
+            step.thought for step in task.extra_state["current_reasoning"]
+            if isinstance(step, ActionReasoningStep) and step.thought
+        ]
+        if thoughts:
+            return f"{STOP_MESSAGES[reason]} My last thought was: {thoughts[-1]}"
+        return STOP_MESSAGES[reason]
+
+    def _stop(self, step: TaskStep, task: Task, reason: str) -> TaskStepOutput:
+        """Finish the task with its best partial answer."""
+        answer = self._partial_answer(task, reason)
+        logger.warning(f"ReAct task stopped early ({reason}) after {task.extra_state.get('iterations', 0)} iterations")
+        self.last_stop_reason = reason
+        current_span().set(stopped_early=reason)
+        task.extra_state["new_memory"].put(ChatMessage(content=answer, role=MessageRole.ASSISTANT))
+        # is_dummy_stream lets a streaming caller read the answer from response_gen as well
+        response = AgentChatResponse(response=answer, sources=task.extra_state["sources"], is_dummy_stream=True)
+        return TaskStepOutput(output=response, task_step=step, is_last=True, next_steps=[])
+
+    def _after_step(self, output: TaskStepOutput, step: TaskStep, task: Task) -> TaskStepOutput:
+        if not output.is_last and self._repeats_action(task):
+            return self._stop(step, task, "loop")
+        return output
+
+    def _get_response(self, current_reasoning: List[BaseReasoningStep], sources: List[ToolOutput]) -> AgentChatResponse:
+        # As in ReActAgentWorker, minus its "Reached max iterations" error (which counts reasoning
+        # steps, not iterations): the iteration limit is enforced in _stop_reason instead
+        if not current_reasoning:
+            raise ValueError("No reasoning steps were taken.")
+        last = current_reasoning[-1]
+        if isinstance(last, ResponseReasoningStep):
+            response = last.response
+        elif isinstance(last, ObservationReasoningStep) and last.return_direct:
+            response = last.observation
+        else:
+            response = last.get_content()
+        return AgentChatResponse(response=response, sources=sources)
+
+    def run_step(self, step: TaskStep, task: Task, **kwargs: Any) -> TaskStepOutput:
+        reason = self._stop_reason(task)
+        if reason:
+            return self._stop(step, task, reason)
+        try:
+            with self._iteration_span(task):
+                output = super().run_step(step, task, **kwargs)
+        except DeadlineExceeded:
+            return self._stop(step, task, "deadline")
+        return self._after_step(output, step, task)
+
+    async def arun_step(self, step: TaskStep, task: Task, **kwargs: Any) -> TaskStepOutput:
+        reason = self._stop_reason(task)
+        if reason:
+            return self._stop(step, task, reason)
+        try:
+            with self._iteration_span(task):
+                output = await super().arun_step(step, task, **kwargs)
+        except DeadlineExceeded:
+            return self._stop(step, task, "deadline")
+        return self._after_step(output, step, task)
+
+    def stream_step(self, step: TaskStep, task: Task, **kwargs: Any) -> TaskStepOutput:
+        # The final answer keeps streaming after this returns; its LLM span records the rest
+        reason = self._stop_reason(task)
+        if reason:
+            return self._stop(step, task, reason)
+        try:
+            with self._iteration_span(task):
+                output = super().stream_step(step, task, **kwargs)
+        except DeadlineExceeded:
+            return self._stop(step, task, "deadline")
+        return self._after_step(output, step, task)
+
 class ReActAgentManager:
     """Manager for creating and using ReAct agents."""
     
-    def __init__(self, tools: List[BaseTool]):
-        """Initialize the agent manager with tools."""
+    CACHE_NAMESPACE = "react"
+
+    def __init__(self, tools: List[BaseTool], response_cache: Optional[ResponseCache] = None):
+        """Initialize the agent manager with tools and an optional shared response cache."""
         self.tools = tools
+        self.response_cache = response_cache
         # Get LLM settings from config
         config_vars = vars(importlib.import_module("config"))
         self.llm = get_llm(config_vars)
         self.agent = self._create_agent()
         
-    def _create_agent(self) -> ReActAgent:
+    def _get_cached(self, query_text: str) -> Optional[str]:
+        """Look the query up in the response cache, if one is configured."""
+        if self.response_cache is None:
+            return None
+        return self.response_cache.get(query_text, namespace=self.CACHE_NAMESPACE)
+
+    def _store(self, query_text: str, response: str, sources: Sequence[ToolOutput] = ()) -> str:
+        """Store a successful response (and the tool outputs behind it) in the cache and return it."""
+        if self.worker.last_stop_reason is not None:
+            # A partial answer (deadline, loop, iteration limit) is not worth repeating
+            return response
+        if self.response_cache is not None and response:
+            self.response_cache.put(query_text, response, namespace=self.CACHE_NAMESPACE, sources=sources)
+        return response
+
+    def _create_agent(self) -> AgentRunner:
         """Create a ReAct agent with the configured tools."""
         logger.info("Creating ReAct agent")
-        return ReActAgent.from_tools(
-            tools=self.tools,
+        executor = get_tool_executor()
+        self.chat_formatter = BudgetedReActChatFormatter(
+            prompt_token_budget=REACT_PROMPT_TOKEN_BUDGET,
+            max_observation_tokens=REACT_MAX_OBSERVATION_TOKENS,
+            keep_recent_steps=REACT_KEEP_RECENT_STEPS,
+            summary_observation_tokens=REACT_SUMMARY_OBSERVATION_TOKENS,
+        )
+        self.worker = TracedReActAgentWorker(
+            tools=[executor.wrap(tool) for tool in self.tools],
             llm=self.llm,
             verbose=True,
-            max_iterations=10,
+            max_iterations=REACT_MAX_ITERATIONS,
+            react_chat_formatter=self.chat_formatter,
+            max_repeated_actions=REACT_MAX_REPEATED_ACTIONS,
         )
+        # Same wiring as ReActAgent.from_tools, with the traced worker
+        return AgentRunner(self.worker, llm=self.llm, callback_manager=self.llm.callback_manager, verbose=True)
     
+    def reset(self):
+        """Clear the agent's chat memory so the next query starts fresh."""
+        self.agent.reset()
+
+    def prompt_stats(self) -> Dict[str, Any]:
+        """Prompt tokens per ReAct step (estimated) and how often history was compacted."""
+        return self.chat_formatter.stats()
+
     def query(self, query_text: str) -> str:
         """Process a query using the ReAct agent."""
         logger.info(f"Processing query with ReAct agent: {query_text}")
-        try:
-            # Call the agent's query method to process the input
-            response = self.agent.query(query_text)
-            return str(response)
-        except Exception as e:
-            logger.error(f"Error processing query: {e}")
-            return f"An error occurred: {str(e)}"
\ No newline at end of file
+        with trace("react.query", query=query_text) as root, deadline(REACT_QUERY_DEADLINE_SECONDS):
+            cached = self._get_cached(query_text)
+            if cached is not None:
+                root.set(response_cache_hit=True)
+                return cached
+            try:
+                # What agent.query does, keeping the tool outputs (sources) for the response cache
+                response = self.agent.chat(query_text, chat_history=[])
+                return self._store(query_text, str(response), response.sources)
+            except Exception as e:
+                logger.error(f"Error processing query: {e}")
+                return f"An error occurred: {str(e)}"
+
+    async def aquery(self, query_text: str) -> str:
+        """Process a query asynchronously, without blocking a thread while the model generates."""
+        logger.info(f"Processing async query with ReAct agent: {query_text}")
+        with trace("react.query", query=query_text) as root, deadline(REACT_QUERY_DEADLINE_SECONDS):
+            cached = self._get_cached(query_text)
+            if cached is not None:
+                root.set(response_cache_hit=True)
+                return cached
+            try:
+                response = await self.agent.achat(query_text, chat_history=[])
+                return self._store(query_text, str(response), response.sources)
+            except Exception as e:
+                logger.error(f"Error processing query: {e}")
+                return f"An error occurred: {str(e)}"
+
+    def stream_query(self, query_text: str) -> Iterator[str]:
+        """Process a query and yield the final answer as tokens arrive."""
+        logger.info(f"Processing streaming query with ReAct agent: {query_text}")
+        with trace("react.stream_query", query=query_text) as root, deadline(REACT_QUERY_DEADLINE_SECONDS):
+            cached = self._get_cached(query_text)
+            if cached is not None:
+                root.set(response_cache_hit=True)
+                yield cached
+                return
+            stats = StreamStats(label="ReAct query stream")
+            try:
+                response = self.agent.stream_chat(query_text, chat_history=[])
+                # A partial answer is complete already; its dummy stream would replay it word by word
+                token_gen = response.response_gen if self.worker.last_stop_reason is None else iter([response.response])
+                tokens = []
+                for token in token_gen:
+                    stats.record(token)
+                    tokens.append(token)
+                    yield token
+                self._store(query_text, "".join(tokens), response.sources)
+            except Exception as e:
+                logger.error(f"Error processing query: {e}")
+                yield f"An error occurred: {str(e)}"
+            finally:
+                stats.finish()
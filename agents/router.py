@@ -0,0 +1,263 @@
+"""
+FastPathRouter: Answers tool-shaped queries without an LLM round-trip.
+
+Flow:
+1. RULES: Anchored patterns recognise direct tool invocations ("weather in Tokyo",
+   "sqrt of 144", "17 times 23", "what is pandas") and extract the tool arguments
+2. EMBEDDINGS: Queries the rules miss are compared with example utterances per intent using
+   the knowledge base's embedding model; a confident weather or package intent whose
+   argument is found in the query (exactly one known city or package) is routed as well
+3. DIRECT CALLS: A routed query calls the tool itself and returns the tool output as the answer
+4. FALLBACK: Everything else - low similarity, no clear lead over the "needs the agent"
+   examples, an unknown city or package, or a tool error - goes to the wrapped agent manager
+5. METRICS: stats() reports the hit rate and the LLM calls saved (a direct tool query costs an
+   agent one call to pick the tool and one to phrase the answer)
+
+One router is shared by all agent managers of a process; RoutedAgentManager puts it in
+front of a single ReActAgentManager or FunctionCallingAgentManager.
+"""
+
+import re
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.tools import BaseTool
+
+from data.sample_documents import PYTHON_PACKAGES
+from tools.weather_tool import WEATHER_DATA
+from utils.tracing import trace
+
+logger = logging.getLogger(__name__)
+
+NUMBER = r"-?\d+(?:\.\d+)?"
+
+BINARY_OPERATIONS = {
+    "+": "add", "plus": "add", "added to": "add",
+    "-": "subtract", "minus": "subtract",
+    "*": "multiply", "x": "multiply", "×": "multiply", "times": "multiply", "multiplied by": "multiply",
+    "/": "divide", "÷": "divide", "over": "divide", "divided by": "divide",
+    "^": "power", "**": "power", "to the power of": "power", "raised to": "power",
+}
+
+_QUESTION = r"^(?:(?:what|how) (?:is|are|'s)|what's|how's|tell me about|tell me|describe|show me|calculate|compute|get)?\s*(?:the )?"
+
+def _number(text: str) -> float:
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+def _binary_arguments(match: re.Match) -> Optional[Dict[str, Any]]:
+    return {"operation": BINARY_OPERATIONS[match["op"]], "a": _number(match["a"]), "b": _number(match["b"])}
+
+def _city_arguments(match: re.Match) -> Optional[Dict[str, Any]]:
+    location = match["location"].strip()
+    return {"location": location} if location in WEATHER_DATA else None
+
+def _package_arguments(match: re.Match) -> Optional[Dict[str, Any]]:
+    package = match["package"]
+    return {"package_name": package} if package in PYTHON_PACKAGES else None
+
+# (tool name, pattern over the normalized query, argument extractor returning None to decline)
+RULES: List[Tuple[str, "re.Pattern", Callable[[re.Match], Optional[Dict[str, Any]]]]] = [
+    ("calculator",
+     re.compile(_QUESTION + rf"(?:sqrt|square root)(?: of)? (?P<a>{NUMBER})$"),
+     lambda m: {"operation": "square_root", "a": _number(m["a"])}),
+    ("calculator",
+     re.compile(_QUESTION + rf"(?P<a>{NUMBER}) ?(?P<op>{'|'.join(re.escape(op) for op in sorted(BINARY_OPERATIONS, key=len, reverse=True))}) ?(?P<b>{NUMBER})$"),
+     _binary_arguments),
+    ("weather_tool",
+     re.compile(_QUESTION + r"(?:current )?weather(?: like)?(?: forecast)? (?:in|for|at) (?P<location>[a-z .'-]+?)(?: today| now| right now)?$"),
+     _city_arguments),
+    ("weather_tool",
+     re.compile(_QUESTION + r"(?P<location>[a-z .'-]+?) weather(?: today| now| right now)?$"),
+     _city_arguments),
+    ("python_package_info",
+     re.compile(_QUESTION + r"(?:python )?(?:package |library )?(?P<package>[a-z0-9_.-]+)(?: python)?(?: package| library| module)?(?: used for| for| about)?$"),
+     _package_arguments),
+]
+
+# Example utterances per intent for embedding classification; "agent" holds queries that
+# look similar but need the full agent (several tools, comparisons, explanations)
+INTENT_EXAMPLES = {
+    "weather_tool": [
+        "what's the weather in London",
+        "how is the weather looking in Paris today",
+        "is it sunny in Sydney",
+        "temperature in Tokyo right now",
+        "do I need an umbrella in New York",
+    ],
+    "python_package_info": [
+        "what is numpy",
+        "what is the pandas library used for",
+        "tell me about the scikit-learn package",
+        "what does pytorch do",
+        "describe the transformers python module",
+    ],
+    "agent": [
+        "compare the temperature in London and Paris",
+        "how does LlamaIndex relate to numpy",
+        "explain retrieval-augmented generation",
+        "which python package should I use for machine learning and why",
+        "what is the weather in Tokyo and what is 12 times 12",
+    ],
+}
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop politeness and trailing punctuation."""
+    text = " ".join(query.lower().split())
+    text = re.sub(r"^(?:please|hey|hi)[, ]+|[, ]+please$", "", text)
+    return text.strip(" ?!.")
+
+def _mentions(text: str, names) -> List[str]:
+    """Known names (cities, packages) that occur in the text as whole words."""
+    return [name for name in names if re.search(rf"(?<![\w-]){re.escape(name)}(?![\w-])", text)]
+
+class FastPathRouter:
+    """Shared rule- and embedding-based router that calls tools directly."""
+
+    def __init__(
+        self,
+        tools: List[BaseTool],
+        embed_model: Optional[BaseEmbedding] = None,
+        min_similarity: float = 0.8,
+        min_margin: float = 0.05,
+        llm_calls_per_hit: int = 2,
+    ):
+        """Initialize the router with the agent tools and an optional embedding model."""
+        self.tools = {tool.metadata.name: tool for tool in tools}
+        self.embed_model = embed_model
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.llm_calls_per_hit = llm_calls_per_hit
+        self._intent_vectors: Optional[Dict[str, np.ndarray]] = None
+        self._lock = threading.Lock()
+        self._metrics = {"queries": 0, "rule_hits": 0, "embedding_hits": 0, "tool_errors": 0}
+        self._hits_by_tool: Dict[str, int] = {}
+
+    def _intent_matrix(self) -> Dict[str, np.ndarray]:
+        """Normalized example embeddings per intent, computed on first use."""
+        if self._intent_vectors is None:
+            with self._lock:
+                if self._intent_vectors is None:
+                    vectors = {}
+                    for intent, examples in INTENT_EXAMPLES.items():
+                        matrix = np.array([self.embed_model.get_query_embedding(text) for text in examples], dtype=np.float32)
+                        vectors[intent] = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+                    self._intent_vectors = vectors
+        return self._intent_vectors
+
+    def classify(self, text: str) -> Tuple[Optional[str], float]:
+        """Best intent by embedding similarity, or None when it does not lead the agent examples."""
+        vector = np.asarray(self.embed_model.get_query_embedding(text), dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        scores = {intent: float((matrix @ vector).max()) for intent, matrix in self._intent_matrix().items()}
+        agent_score = scores.pop("agent")
+        intent, score = max(scores.items(), key=lambda item: item[1])
+        if score < self.min_similarity or score - agent_score < self.min_margin:
+            return None, score
+        return intent, score
+
+    def match(self, query: str) -> Optional[Tuple[str, Dict[str, Any], str]]:
+        """(tool name, arguments, "rule" or "embedding") for a routable query, else None."""
+        text = normalize_query(query)
+        for tool_name, pattern, extract in RULES:
+            if tool_name not in self.tools:
+                continue
+            found = pattern.match(text)
+            arguments = extract(found) if found else None
+            if arguments is not None:
+                return tool_name, arguments, "rule"
+
+        if self.embed_model is None:
+            return None
+        intent, score = self.classify(text)
+        if intent is None or intent not in self.tools:
+            return None
+        names = WEATHER_DATA if intent == "weather_tool" else PYTHON_PACKAGES
+        mentioned = _mentions(text, names)
+        if len(mentioned) != 1:
+            return None
+        logger.debug(f"Embedding intent {intent} ({score:.2f}) for: {query}")
+        argument = "location" if intent == "weather_tool" else "package_name"
+        return intent, {argument: mentioned[0]}, "embedding"
+
+    def answer(self, query: str) -> Optional[str]:
+        """Answer the query with a direct tool call, or None to hand it to the agent."""
+        with self._lock:
+            self._metrics["queries"] += 1
+        try:
+            routed = self.match(query)
+        except Exception as e:
+            logger.warning(f"Router could not classify query, using the agent: {e}")
+            return None
+        if routed is None:
+            return None
+
+        tool_name, arguments, method = routed
+        try:
+            output = self.tools[tool_name].call(**arguments)
+        except Exception as e:
+            logger.warning(f"Fast path {tool_name} failed, using the agent: {e}")
+            output = None
+        if output is None or output.is_error or output.content.startswith("Error:"):
+            with self._lock:
+                self._metrics["tool_errors"] += 1
+            return None
+        with self._lock:
+            self._metrics[f"{method}_hits"] += 1
+            self._hits_by_tool[tool_name] = self._hits_by_tool.get(tool_name, 0) + 1
+        logger.info(f"Fast path: {tool_name}({arguments}) answered without the LLM ({method} match)")
+        return output.content
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit-rate and saved-LLM-call metrics."""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats.update({f"hits_{tool}": count for tool, count in self._hits_by_tool.items()})
+        stats["hits"] = stats["rule_hits"] + stats["embedding_hits"]
+        stats["hit_rate"] = stats["hits"] / stats["queries"] if stats["queries"] else 0.0
+        stats["saved_llm_calls"] = stats["hits"] * self.llm_calls_per_hit
+        return stats
+
+class RoutedAgentManager:
+    """Agent manager wrapper that tries the fast-path router before the agent."""
+
+    def __init__(self, agent_manager: Any, router: FastPathRouter):
+        self.agent_manager = agent_manager
+        self.router = router
+
+    def __getattr__(self, name: str) -> Any:
+        # Everything else (agent, llm, tools, ...) is the wrapped manager's
+        return getattr(self.agent_manager, name)
+
+    def reset(self):
+        self.agent_manager.reset()
+
+    def query(self, query_text: str) -> str:
+        with trace("router.query", query=query_text) as root:
+            answer = self.router.answer(query_text)
+            root.set(fast_path=answer is not None)
+            if answer is not None:
+                return answer
+            return self.agent_manager.query(query_text)
+
+    async def aquery(self, query_text: str) -> str:
+        with trace("router.query", query=query_text) as root:
+            # Embedding classification runs the model, so keep it off the event loop
+            answer = await asyncio.to_thread(self.router.answer, query_text)
+            root.set(fast_path=answer is not None)
+            if answer is not None:
+                return answer
+            return await self.agent_manager.aquery(query_text)
+
+    def stream_query(self, query_text: str) -> Iterator[str]:
+        answer = self.router.answer(query_text)
+        if answer is not None:
+            yield answer
+        elif hasattr(self.agent_manager, "stream_query"):
+            yield from self.agent_manager.stream_query(query_text)
+        else:
+            yield self.agent_manager.query(query_text)
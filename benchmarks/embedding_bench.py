@@ -0,0 +1,169 @@
+"""
+Embedding Benchmark
+
+Compares embedding backends and vector storage dtypes for CPU-only deployments:
+
+1. ISOLATION: Each EMBEDDING_MODEL spec runs in its own subprocess, so peak RSS reflects
+   only that backend (model weights, runtime and buffers)
+2. LATENCY: Model load time, corpus embedding throughput and single-query latency
+3. RECALL: Top-k retrieval over the corpus for each query, compared against the first
+   (reference) spec, e.g. the PyTorch model
+4. STORAGE: Index bytes per vector and recall@k of float16/int8 storage vs. float32,
+   using the reference embeddings
+
+The corpus defaults to the sample knowledge base split into sentences; pass --corpus with
+a text file (one passage per line) for a more realistic workload.
+
+Run from the project root:
+    python -m benchmarks.embedding_bench --models local:BAAI/bge-small-en-v1.5 \\
+        onnx:BAAI/bge-small-en-v1.5 onnx-int8:BAAI/bge-small-en-v1.5
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from utils.stats import summarize_latencies
+
+QUERIES = [
+    "What is LlamaIndex used for?",
+    "How do I connect an LLM to my own data?",
+    "Which framework chains LLM calls together?",
+    "What does retrieval-augmented generation do?",
+    "Where are embeddings stored for similarity search?",
+    "How do several agents work together on a task?",
+    "How can a model call external tools or APIs?",
+    "What is RAG?",
+]
+
+def load_corpus(path: str = None) -> List[str]:
+    """Passages from a file (one per line) or the sample documents split into sentences."""
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    from data.sample_documents import AI_DOCUMENTS
+
+    passages = []
+    for doc in AI_DOCUMENTS:
+        passages.extend(s.strip() for s in re.split(r"(?<=[.!?])\s+", doc["content"]) if s.strip())
+    return passages
+
+def run_worker(spec: str, corpus_path: str, output: str, batch_size: int):
+    """Embed the corpus and queries with one backend and write metrics + vectors."""
+    corpus = load_corpus(corpus_path)
+
+    start = time.perf_counter()
+    from knowledge_base.vector_store import get_embedding_model
+    model = get_embedding_model(spec)
+    model.embed_batch_size = batch_size
+    load_s = time.perf_counter() - start
+
+    model.get_query_embedding("warmup")
+    start = time.perf_counter()
+    doc_vectors = model.get_text_embedding_batch(corpus)
+    embed_s = time.perf_counter() - start
+
+    latencies, query_vectors = [], []
+    for query in QUERIES:
+        t0 = time.perf_counter()
+        query_vectors.append(model.get_query_embedding(query))
+        latencies.append(time.perf_counter() - t0)
+
+    np.savez(output, docs=np.asarray(doc_vectors, dtype=np.float32), queries=np.asarray(query_vectors, dtype=np.float32))
+    with open(output + ".json", "w", encoding="utf-8") as f:
+        json.dump({
+            "load_s": load_s,
+            "texts_per_sec": len(corpus) / embed_s if embed_s > 0 else 0.0,
+            "query_latency_s": summarize_latencies(latencies),
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }, f)
+
+def top_k(docs: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    """Exact cosine top-k document indices for each query."""
+    docs = docs / np.linalg.norm(docs, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ docs.T
+    return [set(np.argsort(-row)[:k]) for row in scores]
+
+def recall(reference: List[set], candidate: List[set]) -> float:
+    return float(np.mean([len(r & c) / len(r) for r, c in zip(reference, candidate)]))
+
+def storage_report(docs: np.ndarray, queries: np.ndarray, k: int):
+    """Recall and footprint of each NumpyVectorStore dtype against float32."""
+    from knowledge_base.numpy_vector_store import NumpyVectorStore
+
+    results = {}
+    for dtype in ("float32", "float16", "int8"):
+        store = NumpyVectorStore(dtype=dtype)
+        store.add([TextNode(id_=str(i), text="", embedding=v.tolist()) for i, v in enumerate(docs)])
+        ids = [
+            set(int(i) for i in store.query(VectorStoreQuery(query_embedding=q.tolist(), similarity_top_k=k)).ids)
+            for q in queries
+        ]
+        bytes_per_vector = store._matrix.itemsize * docs.shape[1] + (4 if store._scales is not None else 0)
+        results[dtype] = (ids, bytes_per_vector)
+
+    reference = results["float32"][0]
+    print(f"\n{'storage':>10} {'bytes/vector':>13} {'recall@' + str(k):>10}")
+    for dtype, (ids, bytes_per_vector) in results.items():
+        print(f"{dtype:>10} {bytes_per_vector:>13} {recall(reference, ids):>10.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends and vector storage dtypes")
+    parser.add_argument("--models", nargs="+", default=[
+        "local:BAAI/bge-small-en-v1.5", "onnx:BAAI/bge-small-en-v1.5", "onnx-int8:BAAI/bge-small-en-v1.5",
+    ], help="EMBEDDING_MODEL specs; the first one is the recall reference")
+    parser.add_argument("--corpus", default=None, help="Text file with one passage per line")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.corpus, args.output, args.batch_size)
+        return
+
+    k = args.top_k
+    reference = None
+    print(f"{'model':>36} {'load s':>8} {'texts/s':>9} {'query p50 ms':>13} {'peak RSS MB':>12} {'recall@' + str(k):>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n, spec in enumerate(args.models):
+            output = str(Path(tmp) / f"model{n}.npz")
+            command = [sys.executable, "-m", "benchmarks.embedding_bench", "--worker", spec, "--output", output,
+                       "--batch-size", str(args.batch_size)]
+            if args.corpus:
+                command += ["--corpus", args.corpus]
+            if subprocess.run(command).returncode != 0:
+                print(f"{spec:>36} failed (see error above)")
+                continue
+
+            with open(output + ".json", "r", encoding="utf-8") as f:
+                metrics = json.load(f)
+            vectors = np.load(output)
+            ranked = top_k(vectors["docs"], vectors["queries"], k)
+            if reference is None:
+                reference = (ranked, vectors["docs"], vectors["queries"])
+            print(
+                f"{spec:>36} {metrics['load_s']:>8.2f} {metrics['texts_per_sec']:>9.1f} "
+                f"{metrics['query_latency_s']['p50'] * 1000:>13.2f} {metrics['peak_rss_mb']:>12.0f} "
+                f"{recall(reference[0], ranked):>10.3f}"
+            )
+
+    if reference is not None:
+        storage_report(reference[1], reference[2], k)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Import Time Benchmark
+
+Guards CLI startup time against regressions:
+
+1. MEASURE: Imports the module in a fresh interpreter with `python -X importtime`
+   (best of several runs) and times `python main.py --help` end to end
+2. REPORT: Lists the slowest imports by cumulative time
+3. CHECK: Fails (exit code 1) when the import exceeds the time budget or when a heavy
+   dependency that should load lazily (torch, transformers, LlamaIndex, ...) is imported
+
+Run from the project root:
+    python -m benchmarks.import_time --budget-ms 300
+"""
+
+import re
+import sys
+import time
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+# Modules that must only be imported when the knowledge base, an agent or an LLM is used
+DEFAULT_FORBIDDEN = [
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "llama_index.core",
+    "llama_index.embeddings.huggingface",
+    "openai",
+    "chromadb",
+    "onnxruntime",
+]
+
+LINE_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure_imports(module: str) -> Tuple[Dict[str, int], List[Tuple[str, int, int]]]:
+    """Import `module` in a fresh interpreter; returns ({name: cumulative us}, [(name, depth, cumulative us)])."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    cumulative, entries = {}, []
+    for line in result.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match:
+            name, us, depth = match.group(4), int(match.group(2)), (len(match.group(3)) - 1) // 2
+            cumulative[name] = us
+            entries.append((name, depth, us))
+    return cumulative, entries
+
+def time_command(command: List[str], repeat: int) -> float:
+    """Best wall time in seconds over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, capture_output=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure and guard the import time of the CLI")
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Show this many slowest imports")
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="Fail above this import time")
+    parser.add_argument("--forbid", nargs="*", default=DEFAULT_FORBIDDEN, help="Modules that must not be imported")
+    args = parser.parse_args()
+
+    runs = [measure_imports(args.module) for _ in range(args.repeat)]
+    cumulative, entries = min(runs, key=lambda run: run[0].get(args.module, 0))
+    total_ms = cumulative.get(args.module, 0) / 1000
+    help_s = time_command([sys.executable, "main.py", "--help"], args.repeat)
+
+    print(f"import {args.module}: {total_ms:.1f} ms (best of {args.repeat})")
+    print(f"python main.py --help: {help_s * 1000:.1f} ms wall")
+    print("\nSlowest imports (cumulative):")
+    for name, depth, us in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"  {us / 1000:>9.1f} ms  {'  ' * depth}{name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import {args.module} took {total_ms:.1f} ms, budget is {args.budget_ms:.0f} ms")
+    for name in args.forbid:
+        if name in cumulative:
+            failures.append(f"{name} is imported eagerly ({cumulative[name] / 1000:.1f} ms)")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nOK: within budget and no heavy modules imported at startup")
+
+if __name__ == "__main__":
+    main()
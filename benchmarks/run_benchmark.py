@@ -0,0 +1,276 @@
+"""
+End-to-End Agent Benchmark
+
+Reproducible performance runs of the agent managers against the scripted stub LLM server:
+
+1. SCENARIOS: A JSONL file of queries with the same fields as --batch files (so the backlog's
+   requests.jsonl works as-is); a query may add a "steps" list of tool calls and an "answer",
+   which the stub replays as a deterministic ReAct trace, or as tool calls for the function
+   calling agent (a step that is a list of calls becomes one turn with parallel tool calls).
+   Queries without steps are answered directly
+2. LLM: The stub adds a fixed time to first token (--latency) and generates at a fixed
+   --tokens-per-sec, so timings reflect the client code rather than a real model
+3. METRICS: For each agent type and concurrency level: latency distribution, LLM calls per
+   query, throughput (queries/sec), failures and memory (current and peak RSS); with --router
+   also the fast-path router's hit rate and saved LLM calls, and with --single-flight the LLM
+   calls and retrievals coalesced (--burst sends each query's repeats at the same time)
+4. BASELINES: --save-baseline writes the results as JSON; --baseline compares a run against
+   a saved one and exits with code 1 when a metric is worse by more than --tolerance
+
+The agents use the real tools (calculator, weather, Python packages and the knowledge base),
+built once by main.setup_tools(); the response and completion caches, the fast-path router and
+request coalescing are off unless --response-cache / --router / --single-flight are given, so
+every query exercises the full agent loop.
+
+Run from the project root:
+    python -m benchmarks.run_benchmark --agents react function --concurrency 1 4 \\
+        --save-baseline benchmarks/baselines/local.json
+    python -m benchmarks.run_benchmark --agents react function --concurrency 1 4 \\
+        --baseline benchmarks/baselines/local.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from agents.batch_runner import ID_FIELDS, QUERY_FIELDS
+from benchmarks.stub_llm_server import StubLLMServer, script_turns
+from utils.stats import summarize_latencies
+
+DEFAULT_SCENARIO = Path(__file__).parent / "scenarios" / "agent_tools.jsonl"
+
+# Metrics compared against a baseline, and whether higher values are better
+BASELINE_METRICS = {
+    "latency_p50_s": False,
+    "latency_p95_s": False,
+    "queries_per_sec": True,
+    "llm_calls_per_query": False,
+    "peak_rss_mb": False,
+}
+
+def load_scenarios(path: Path) -> List[Dict[str, Any]]:
+    """Read scenario queries; each gets an id, a query and optional steps/answer."""
+    scenarios = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"query": record}
+            query = next((record[k] for k in QUERY_FIELDS if record.get(k)), None)
+            if query is None:
+                continue
+            scenarios.append({
+                "id": str(next((record[k] for k in ID_FIELDS if record.get(k)), line_number)),
+                "query": query,
+                "steps": record.get("steps", []),
+                "answer": record.get("answer", f"Scripted answer for scenario {line_number}."),
+            })
+    return scenarios
+
+def rss_mb() -> float:
+    """Current resident set size in MB (Linux), falling back to the peak."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+def configure(server: StubLLMServer, response_cache: bool, router: bool, single_flight: bool):
+    """Point the agents at the stub server and turn off result caching, routing and coalescing."""
+    import config
+
+    config.LOCAL_LLM_URL = server.chat_url
+    config.LOCAL_LLM_IS_CHAT_MODEL = True              # Tool definitions are only sent with chat messages
+    config.LOCAL_LLM_IS_FUNCTION_CALLING_MODEL = True  # The stub answers with tool calls when given tools
+    config.RESPONSE_CACHE_ENABLED = response_cache
+    config.COMPLETION_CACHE_ENABLED = False
+    config.ROUTER_ENABLED = router
+    config.SINGLE_FLIGHT_ENABLED = single_flight
+
+def coalesced_calls() -> Dict[str, int]:
+    """Coalesced LLM calls and retrievals so far (zero when coalescing is off)."""
+    from cache.single_flight import get_single_flight
+
+    counts = {}
+    for name in ("llm", "kb"):
+        single_flight = get_single_flight(name)
+        counts[f"coalesced_{name}_calls"] = single_flight.stats()["coalesced"] if single_flight is not None else 0
+    return counts
+
+def run_scenarios(agent_type: str, concurrency: int, scenarios: List[Dict[str, Any]], repeat: int,
+                  tools: list, response_cache, router, server: StubLLMServer, burst: bool = False) -> Dict[str, Any]:
+    """Replay every scenario `repeat` times through a pool of `concurrency` agents.
+
+    With burst, each scenario's repeats are queued back to back so they run at the same time.
+    """
+    from agents.agent_pool import AgentPool
+    from agents.batch_runner import BatchRunner
+    from main import create_agent_manager
+
+    pool = AgentPool(lambda: create_agent_manager(agent_type, tools, response_cache, router), size=concurrency)
+    runner = BatchRunner(pool, concurrency)
+    runner.run_one("warmup", scenarios[0]["query"])  # Exclude first-call costs (imports, connections)
+    routed_before = router.stats() if router is not None else None
+
+    if burst:
+        workload = [(f"{s['id']}#{n}", s["query"]) for s in scenarios for n in range(repeat)]
+    else:
+        workload = [(f"{s['id']}#{n}", s["query"]) for n in range(repeat) for s in scenarios]
+    coalesced_before = coalesced_calls()
+    server.reset_counters()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda item: runner.run_one(*item), workload))
+    elapsed = time.perf_counter() - start
+
+    latency = summarize_latencies([r["latency_s"] for r in results])
+    expected_calls = sum(len(script_turns(s["steps"], agent_type == "function")) + 1 for s in scenarios) * repeat
+    routed = {}
+    if router is not None:
+        after = router.stats()
+        hits = after["hits"] - routed_before["hits"]
+        routed = {
+            "router_hit_rate": hits / len(results),
+            "router_saved_llm_calls": after["saved_llm_calls"] - routed_before["saved_llm_calls"],
+        }
+    return {
+        "queries": len(results),
+        "failures": sum(1 for r in results if not r["ok"]),
+        "elapsed_s": elapsed,
+        "queries_per_sec": len(results) / elapsed if elapsed > 0 else 0.0,
+        "latency_mean_s": latency["mean"],
+        "latency_p50_s": latency["p50"],
+        "latency_p95_s": latency["p95"],
+        "latency_p99_s": latency["p99"],
+        "llm_calls_per_query": server.request_count / len(results),
+        "expected_llm_calls_per_query": expected_calls / len(results),
+        "rss_mb": rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+        **routed,
+        **{key: count - coalesced_before[key] for key, count in coalesced_calls().items()},
+    }
+
+def print_results(results: Dict[str, Dict[str, Any]]):
+    print(f"\n{'run':>14} {'queries':>8} {'fail':>5} {'q/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'LLM calls':>10} {'expected':>9} {'RSS MB':>8} {'peak MB':>8}")
+    for name, r in results.items():
+        print(f"{name:>14} {r['queries']:>8} {r['failures']:>5} {r['queries_per_sec']:>8.2f} "
+              f"{r['latency_p50_s'] * 1000:>9.1f} {r['latency_p95_s'] * 1000:>9.1f} {r['latency_p99_s'] * 1000:>9.1f} "
+              f"{r['llm_calls_per_query']:>10.2f} {r['expected_llm_calls_per_query']:>9.2f} "
+              f"{r['rss_mb']:>8.0f} {r['peak_rss_mb']:>8.0f}")
+    for name, r in results.items():
+        if "router_hit_rate" in r:
+            print(f"{name:>14} fast-path router: {r['router_hit_rate']:.0%} of queries, "
+                  f"{r['router_saved_llm_calls']} LLM calls saved")
+        if r.get("coalesced_llm_calls") or r.get("coalesced_kb_calls"):
+            print(f"{name:>14} coalesced: {r['coalesced_llm_calls']} LLM calls, {r['coalesced_kb_calls']} retrievals")
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print the change of each metric vs. the baseline and return the regressions."""
+    regressions = []
+    print(f"\nCompared with baseline from {baseline['meta'].get('timestamp', 'unknown time')} (tolerance {tolerance:.0%}):")
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"  {name}: not in baseline")
+            continue
+        for metric, higher_is_better in BASELINE_METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > tolerance else ""
+            print(f"  {name:>14} {metric:>20}: {old:>10.4f} -> {new:>10.4f} ({change:+.1%}) {flag}")
+            if flag:
+                regressions.append(f"{name} {metric} {change:+.1%}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end agent benchmark against a scripted stub LLM")
+    parser.add_argument("--scenario", default=str(DEFAULT_SCENARIO), help="JSONL file of scenario queries")
+    parser.add_argument("--agents", nargs="+", default=["react"], choices=["react", "function"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4], help="Agent pool sizes to run")
+    parser.add_argument("--repeat", type=int, default=3, help="Times each scenario is replayed per run")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub time to first token (seconds)")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0, help="Stub generation speed (0 = instant)")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the response cache on")
+    parser.add_argument("--router", action="store_true", help="Put the fast-path router in front of the agents")
+    parser.add_argument("--single-flight", action="store_true", help="Coalesce identical in-flight LLM calls and retrievals")
+    parser.add_argument("--burst", action="store_true", help="Send each scenario's repeats at the same time")
+    parser.add_argument("--save-baseline", default=None, metavar="FILE", help="Write results to this JSON file")
+    parser.add_argument("--baseline", default=None, metavar="FILE", help="Compare against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    scenarios = load_scenarios(Path(args.scenario))
+    if not scenarios:
+        parser.error(f"No queries found in {args.scenario}")
+    scripts = {s["query"]: {"steps": s["steps"], "answer": s["answer"]} for s in scenarios}
+
+    with StubLLMServer(latency=args.latency, tokens_per_sec=args.tokens_per_sec, scripts=scripts) as server:
+        configure(server, args.response_cache, args.router, args.single_flight)
+        import main as app
+
+        app.setup_environment()
+        kb = app.setup_knowledge_base()
+        tools = app.setup_tools(kb)
+        response_cache = app.setup_response_cache(kb)
+        router = app.setup_router(tools, kb)
+
+        results = {}
+        for agent_type in args.agents:
+            for concurrency in args.concurrency:
+                name = f"{agent_type}@{concurrency}"
+                print(f"Running {name}: {len(scenarios)} scenarios x {args.repeat}")
+                try:
+                    results[name] = run_scenarios(agent_type, concurrency, scenarios, args.repeat, tools,
+                                                  response_cache, router, server, burst=args.burst)
+                except Exception as e:
+                    print(f"{name} could not run: {e}")
+
+    print_results(results)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "scenario": args.scenario,
+            "repeat": args.repeat,
+            "latency_s": args.latency,
+            "tokens_per_sec": args.tokens_per_sec,
+            "router": args.router,
+            "single_flight": args.single_flight,
+            "burst": args.burst,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.save_baseline:
+        path = Path(args.save_baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nBaseline written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nFAILED: " + "; ".join(regressions))
+            sys.exit(1)
+        print("\nOK: no regressions beyond tolerance")
+
+if __name__ == "__main__":
+    main()
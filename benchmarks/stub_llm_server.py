@@ -0,0 +1,315 @@
+"""
+Stub OpenAI-compatible LLM Server
+
+A tiny local stand-in for LM Studio used to measure the client side of the system:
+
+1. ENDPOINTS: Serves POST /v1/chat/completions and GET /v1/models like LM Studio does
+2. KEEP-ALIVE: Speaks HTTP/1.1 so pooled clients can reuse connections
+3. LATENCY: Adds a configurable delay per completion (time to first token) plus, optionally,
+   generation time at a fixed tokens/sec (one word = one token)
+4. STREAMING: Answers 'stream: true' requests with chunked server-sent events, one word per chunk
+5. COUNTERS: Records accepted TCP connections and requests so connections-per-query can be measured
+6. SCRIPTS: Optional per-query scripts of tool calls and a final answer, replayed deterministically
+   as ReAct text ("Action: ...") or, when the request carries tool definitions, as OpenAI tool
+   calls (a step given as a list is one turn with parallel tool calls); requests are also
+   counted per scripted query
+
+Use it as a fixture from scripts and tests:
+
+    with StubLLMServer(latency=0.05, tokens_per_sec=50) as server:
+        url = server.chat_url
+        ...
+        print(server.connection_count, server.request_count)
+
+Or run it standalone:
+    python -m benchmarks.stub_llm_server --port 1234 --latency 0.2
+"""
+
+import json
+import time
+import socket
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ANSWER = "Thought: I can answer without using any more tools.\nAnswer: This is a stub response."
+REACT_ACTION = "Thought: I need to use a tool to help me answer the question.\nAction: {tool}\nAction Input: {input}"
+REACT_ANSWER = "Thought: I can answer without using any more tools.\nAnswer: {answer}"
+
+def _message_text(message: Dict[str, Any]) -> str:
+    return str(message.get("content") or "")
+
+def script_turns(steps: List[Any], function_calling: bool) -> List[List[Dict[str, Any]]]:
+    """Group script steps into model turns.
+
+    A step that is a list of tool calls is one function calling turn with parallel tool
+    calls; ReAct emits one Action per turn, so there it becomes consecutive turns.
+    """
+    turns = [step if isinstance(step, list) else [step] for step in steps]
+    if not function_calling:
+        turns = [[call] for turn in turns for call in turn]
+    return turns
+
+def scripted_reply(script: Dict[str, Any], query: str, messages: List[Dict[str, Any]], function_calling: bool) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+    """Next reply of a script: the first tool turn not yet observed, then the final answer.
+
+    Progress is read from the conversation itself (observations after the query in ReAct
+    mode, tool messages in function calling mode), so replies are deterministic.
+    """
+    turns = script_turns(script.get("steps", []), function_calling)
+    answer = script.get("answer", "This is a stub response.")
+    if function_calling:
+        last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user" and query in _message_text(m)), default=-1)
+        done = sum(1 for m in messages[last_user + 1:] if m.get("role") == "tool")
+    else:
+        text = "\n".join(_message_text(m) for m in messages)
+        done = text[text.rfind(query) + len(query):].count("Observation:")
+
+    index = 0
+    while index < len(turns) and done >= len(turns[index]):
+        done -= len(turns[index])
+        index += 1
+    if index >= len(turns):
+        return (answer if function_calling else REACT_ANSWER.format(answer=answer)), None
+    if function_calling:
+        tool_calls = [
+            {"id": f"call_{index + 1}_{n + 1}", "type": "function",
+             "function": {"name": call["tool"], "arguments": json.dumps(call.get("input", {}))}}
+            for n, call in enumerate(turns[index])
+        ]
+        return "", tool_calls
+    call = turns[index][0]
+    return REACT_ACTION.format(tool=call["tool"], input=json.dumps(call.get("input", {}))), None
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the subset of the OpenAI API used by the agents."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; without NODELAY keep-alive
+        # connections hit the Nagle / delayed-ACK stall on every response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format: str, *args: Any):
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, payload: Dict[str, Any], answer: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        model = payload.get("model", self.server.model)
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            if i and self.server.tokens_per_sec:
+                time.sleep(1.0 / self.server.tokens_per_sec)
+            chunk = {
+                "id": f"chatcmpl-stub-{self.server.request_count}",
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def do_GET(self):
+        self.server.record_request()
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": self.server.model, "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path: {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        self.server.record_request()
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path: {self.path}"}})
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        answer, tool_calls = self.server.reply(payload)
+        if payload.get("stream"):
+            self._send_stream(payload, answer)
+            return
+
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in payload.get("messages", []))
+        completion_tokens = len(answer.split()) + sum(len(c["function"]["arguments"].split()) for c in tool_calls or [])
+        if self.server.tokens_per_sec:
+            time.sleep(completion_tokens / self.server.tokens_per_sec)
+        message = {"role": "assistant", "content": answer}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        self._send_json(200, {
+            "id": f"chatcmpl-stub-{self.server.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", self.server.model),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_calls else "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+class _CountingHTTPServer(ThreadingHTTPServer):
+    """Threading HTTP server that counts accepted connections and requests."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, handler, latency: float, answer: str, model: str,
+                 tokens_per_sec: float = 0.0, scripts: Optional[Dict[str, Dict[str, Any]]] = None):
+        super().__init__(address, handler)
+        self.latency = latency
+        self.answer = answer
+        self.model = model
+        self.tokens_per_sec = tokens_per_sec
+        self.scripts = scripts or {}
+        # Longest first, so a query that contains another one is matched correctly
+        self._script_queries = sorted(self.scripts, key=len, reverse=True)
+        self.connection_count = 0
+        self.request_count = 0
+        self.query_counts: Dict[str, int] = {}
+        self._counter_lock = threading.Lock()
+
+    def reply(self, payload: Dict[str, Any]) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+        """Answer text (and tool calls) for a chat-completions request."""
+        messages = payload.get("messages", [])
+        text = "\n".join(_message_text(m) for m in messages)
+        query = next((q for q in self._script_queries if q in text), None)
+        if query is None:
+            return self.answer, None
+        with self._counter_lock:
+            self.query_counts[query] = self.query_counts.get(query, 0) + 1
+        return scripted_reply(self.scripts[query], query, messages, function_calling=bool(payload.get("tools")))
+
+    def get_request(self):
+        conn, addr = super().get_request()
+        with self._counter_lock:
+            self.connection_count += 1
+        return conn, addr
+
+    def record_request(self):
+        with self._counter_lock:
+            self.request_count += 1
+
+class StubLLMServer:
+    """Run the stub server on a background thread."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        answer: str = DEFAULT_ANSWER,
+        model: str = "stub-model",
+        tokens_per_sec: float = 0.0,
+        scripts: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        """Create the server; port 0 picks a free port.
+
+        scripts maps a query to {"steps": [{"tool": ..., "input": {...}}, ...], "answer": ...},
+        where a step may also be a list of such calls made in one turn;
+        tokens_per_sec 0 means generation is instantaneous after the latency.
+        """
+        self._server = _CountingHTTPServer(
+            (host, port), _StubHandler, latency, answer, model, tokens_per_sec=tokens_per_sec, scripts=scripts
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    @property
+    def connection_count(self) -> int:
+        return self._server.connection_count
+
+    @property
+    def request_count(self) -> int:
+        return self._server.request_count
+
+    def calls_for(self, query: str) -> int:
+        """Completions requested so far for a scripted query."""
+        return self._server.query_counts.get(query, 0)
+
+    def reset_counters(self):
+        """Zero the connection and request counters."""
+        with self._server._counter_lock:
+            self._server.connection_count = 0
+            self._server.request_count = 0
+            self._server.query_counts.clear()
+
+    def start(self) -> "StubLLMServer":
+        """Start serving on a daemon thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Stub LLM server listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        """Stop serving and close the listening socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main():
+    """Run the stub server in the foreground."""
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per completion")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Generation speed (0 = instant)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = StubLLMServer(args.host, args.port, args.latency, tokens_per_sec=args.tokens_per_sec).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Transport Benchmark
+
+Compares the pooled HTTPTransport against a bare requests.post per call:
+
+1. SETUP: Starts the stub OpenAI-compatible server on a free local port
+2. WORKLOAD: Simulates queries that each make several sequential LLM calls (ReAct steps)
+3. METRICS: Reports mean latency per call, total wall time and TCP connections per query
+
+Run from the project root:
+    python -m benchmarks.transport_bench --queries 20 --steps 10 --latency 0.01
+"""
+
+import time
+import argparse
+
+import requests
+
+from benchmarks.stub_llm_server import StubLLMServer
+from llm.transport import HTTPTransport
+
+def _payload(step: int) -> dict:
+    return {"model": "stub-model", "messages": [{"role": "user", "content": f"step {step}"}]}
+
+def run(label: str, server: StubLLMServer, post, queries: int, steps: int):
+    """Run the workload with the given post function and print the results."""
+    server.reset_counters()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(queries):
+        for step in range(steps):
+            t0 = time.perf_counter()
+            response = post(server.chat_url, _payload(step))
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    print(f"{label}:")
+    print(f"  calls:                 {len(latencies)}")
+    print(f"  mean latency per call: {1000 * sum(latencies) / len(latencies):.2f} ms")
+    print(f"  total wall time:       {elapsed:.3f} s")
+    print(f"  connections per query: {server.connection_count / queries:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs. unpooled LLM HTTP calls")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=10, help="LLM calls per query (ReAct iterations)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub server delay per completion")
+    args = parser.parse_args()
+
+    with StubLLMServer(latency=args.latency) as server:
+        run("requests.post per call", server,
+            lambda url, payload: requests.post(url, json=payload),
+            args.queries, args.steps)
+
+        transport = HTTPTransport(backend=server.base_url)
+        run("pooled HTTPTransport", server, transport.post, args.queries, args.steps)
+        transport.close()
+
+if __name__ == "__main__":
+    main()
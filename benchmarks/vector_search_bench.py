@@ -0,0 +1,111 @@
+"""
+Vector Search Benchmark
+
+Measures how the NumPy vector store scales with corpus size:
+
+1. SETUP: Builds stores of synthetic unit vectors at several sizes and persists them
+   (clustered like real embeddings, or uniformly random with --clusters 0)
+2. COLD START: Times opening each persisted store (memory-mapped)
+3. QUERY: Times exact top-k search with query vectors drawn from the same distribution
+4. ANN: With --nprobe, trains an IVF index on the same store and reports latency and
+   recall@k against the exact results for each nprobe value
+
+Run from the project root:
+    python -m benchmarks.vector_search_bench --sizes 1000 10000 100000 --dim 384
+    python -m benchmarks.vector_search_bench --sizes 100000 --nprobe 1 4 8 16 32
+"""
+
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from knowledge_base.numpy_vector_store import NumpyVectorStore
+from utils.stats import summarize_latencies
+
+def sample_vectors(count: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Random vectors, scattered around `clusters` random centers when clusters > 0."""
+    noise = rng.standard_normal((count, dim)).astype(np.float32)
+    if clusters <= 0:
+        return noise
+    centers = np.random.default_rng(12345).standard_normal((clusters, dim)).astype(np.float32) * 3
+    return centers[rng.integers(0, clusters, size=count)] + noise
+
+def build_store(size: int, dim: int, clusters: int, persist_dir: Path, rng: np.random.Generator) -> None:
+    """Create and persist a store with `size` synthetic vectors."""
+    store = NumpyVectorStore()
+    vectors = sample_vectors(size, dim, clusters, rng)
+    batch = 10000
+    for start in range(0, size, batch):
+        nodes = [
+            TextNode(id_=f"n{i}", text="", embedding=vectors[i].tolist())
+            for i in range(start, min(start + batch, size))
+        ]
+        store.add(nodes)
+    store.persist(str(persist_dir / "default__vector_store.json"))
+
+def run_queries(store: NumpyVectorStore, queries: np.ndarray, top_k: int, **kwargs):
+    """Return (latencies, result ids) for each query."""
+    latencies, results = [], []
+    for q in queries:
+        query = VectorStoreQuery(query_embedding=q.tolist(), similarity_top_k=top_k)
+        t0 = time.perf_counter()
+        result = store.query(query, **kwargs)
+        latencies.append(time.perf_counter() - t0)
+        results.append(result.ids)
+    return latencies, results
+
+def recall(exact, approximate) -> float:
+    """Mean fraction of the exact top-k found by the approximate search."""
+    return float(np.mean([len(set(e) & set(a)) / len(e) for e, a in zip(exact, approximate) if e]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NumPy vector store load and search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--clusters", type=int, default=100, help="Synthetic clusters (0 = uniform random)")
+    parser.add_argument("--nprobe", type=int, nargs="*", default=[], help="Also benchmark IVF at these nprobe values")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default ~4 * sqrt(N))")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            persist_dir = Path(tmp)
+            build_store(size, args.dim, args.clusters, persist_dir, rng)
+            queries = sample_vectors(args.queries, args.dim, args.clusters, rng)
+
+            start = time.perf_counter()
+            store = NumpyVectorStore.from_persist_dir(persist_dir)
+            load_ms = (time.perf_counter() - start) * 1000
+            latencies, exact = run_queries(store, queries, args.top_k)
+            stats = summarize_latencies(latencies)
+
+            print(f"\nsize={size} dim={args.dim} load={load_ms:.2f}ms")
+            print(f"{'search':>12} {'p50 ms':>10} {'p95 ms':>10} {'recall@' + str(args.top_k):>10}")
+            print(f"{'exact':>12} {stats['p50'] * 1000:>10.3f} {stats['p95'] * 1000:>10.3f} {1.0:>10.3f}")
+            if not args.nprobe:
+                continue
+
+            start = time.perf_counter()
+            ivf_store = NumpyVectorStore.from_persist_dir(
+                persist_dir, index_type="ivf", nlist=args.nlist, ivf_min_vectors=0
+            )
+            print(f"{'ivf train':>12} {(time.perf_counter() - start) * 1000:>10.0f}")
+            for nprobe in args.nprobe:
+                latencies, approximate = run_queries(ivf_store, queries, args.top_k, nprobe=nprobe)
+                stats = summarize_latencies(latencies)
+                print(
+                    f"{'ivf/' + str(nprobe):>12} {stats['p50'] * 1000:>10.3f} {stats['p95'] * 1000:>10.3f} "
+                    f"{recall(exact, approximate):>10.3f}"
+                )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Initialize cache package
@@ -0,0 +1,142 @@
+"""
+LLM Completion Cache
+
+This module memoizes individual chat-completion calls made by CustomOpenAILike:
+
+1. KEYING: SHA-256 of the request (model, messages, temperature, max_tokens and any tool definitions)
+2. DETERMINISM: Only requests sent with temperature 0 are cached; sampled output is never reused
+3. MEMORY TIER: A size-bounded in-process LRU for the hot set
+4. DISK TIER: An SQLite file so test runs and replays are nearly free across processes
+
+The cache stores the raw server response, so every parsing path (completion, chat,
+tool calls) behaves exactly as if the server had answered.
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import importlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ("model", "messages", "temperature", "max_tokens", "tools", "tool_choice")
+
+class CompletionCache:
+    """Memory + SQLite cache of deterministic LLM completions."""
+
+    def __init__(self, db_path: Optional[Path] = None, max_entries: int = 512):
+        """Open the optional on-disk store and set the memory bound."""
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "skipped": 0}
+
+        self._db = None
+        if db_path is not None:
+            db_path = Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, response TEXT, created REAL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def is_cacheable(payload: Dict[str, Any]) -> bool:
+        """Only deterministic (temperature 0), non-streaming requests are cached."""
+        return payload.get("temperature") == 0 and not payload.get("stream")
+
+    @staticmethod
+    def key(payload: Dict[str, Any]) -> str:
+        """Hash the parts of the request that determine the completion."""
+        material = {field: payload.get(field) for field in KEY_FIELDS if field in payload}
+        return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, response: Dict[str, Any]):
+        """Insert into the memory LRU (caller holds the lock)."""
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the cached raw response for the request, or None."""
+        if not self.is_cacheable(payload):
+            with self._lock:
+                self._metrics["skipped"] += 1
+            return None
+
+        key = self.key(payload)
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                self._metrics["memory_hits"] += 1
+                return response
+
+            if self._db is not None:
+                row = self._db.execute("SELECT response FROM completions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    response = json.loads(row[0])
+                    self._remember(key, response)
+                    self._metrics["disk_hits"] += 1
+                    return response
+
+            self._metrics["misses"] += 1
+            return None
+
+    def put(self, payload: Dict[str, Any], response: Dict[str, Any]):
+        """Store the raw response for a cacheable request."""
+        if not self.is_cacheable(payload):
+            return
+        key = self.key(payload)
+        with self._lock:
+            self._remember(key, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO completions VALUES (?, ?, ?)",
+                    (key, json.dumps(response), time.time()),
+                )
+                self._db.commit()
+            self._metrics["stores"] += 1
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM completions")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss metrics."""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+_completion_cache: Optional[CompletionCache] = None
+_completion_cache_lock = threading.Lock()
+
+def get_completion_cache(config: Optional[Dict[str, Any]] = None) -> Optional[CompletionCache]:
+    """Return the process-wide completion cache, or None when it is disabled in config."""
+    global _completion_cache
+    config = config or vars(importlib.import_module("config"))
+    if not config.get("COMPLETION_CACHE_ENABLED", False):
+        return None
+    with _completion_cache_lock:
+        if _completion_cache is None:
+            _completion_cache = CompletionCache(
+                db_path=config.get("COMPLETION_CACHE_PATH"),
+                max_entries=config.get("COMPLETION_CACHE_MAX_ENTRIES", 512),
+            )
+            logger.info("LLM completion cache enabled")
+        return _completion_cache
@@ -0,0 +1,164 @@
+"""
+Query Embedding Cache
+
+This module wraps an embedding model so repeated query texts are embedded only once:
+
+1. KEYING: Queries are normalized (case, whitespace, trailing punctuation) and hashed with the full
+   model spec (e.g. "onnx-int8:BAAI/bge-small-en-v1.5"), so variants of one model never share vectors
+2. MEMORY TIER: A size-bounded LRU of query embeddings shared by every caller of the model
+3. DISK TIER (optional): An SQLite file so embeddings survive restarts
+4. PASS-THROUGH: Document/text embeddings are delegated unchanged, so ingestion is unaffected
+
+A ReAct loop often asks the knowledge base the same sub-question several times, and the
+semantic response cache embeds each incoming query as well; both reuse the cached vector.
+"""
+
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.embeddings import BaseEmbedding
+
+from cache.response_cache import normalize_query
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+class CachedEmbedding(BaseEmbedding):
+    """Embedding model wrapper with an LRU (and optional SQLite) cache of query embeddings."""
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _model_spec: str = PrivateAttr()
+    _max_entries: int = PrivateAttr()
+    _memory: "OrderedDict[str, List[float]]" = PrivateAttr()
+    _lock: Any = PrivateAttr()
+    _db: Any = PrivateAttr()
+    _metrics: Dict[str, int] = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, max_entries: int = 1024, db_path: Optional[Path] = None,
+                 model_spec: Optional[str] = None, **kwargs: Any):
+        """Wrap `inner`; db_path enables the on-disk tier.
+
+        model_spec is the EMBEDDING_MODEL string the model was built from; cache keys use it
+        (falling back to the model name), since e.g. onnx: and onnx-int8: share a model name.
+        """
+        super().__init__(model_name=inner.model_name, embed_batch_size=inner.embed_batch_size, **kwargs)
+        self._inner = inner
+        self._model_spec = model_spec or inner.model_name
+        self._max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._db = None
+        if db_path is not None:
+            db_path = Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vector BLOB, created REAL)"
+            )
+            self._db.commit()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        """The wrapped embedding model."""
+        return self._inner
+
+    def _key(self, query: str) -> str:
+        material = f"{self._model_spec}\n{normalize_query(query)}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, embedding: List[float]):
+        """Insert into the memory LRU (caller holds the lock)."""
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                self._metrics["memory_hits"] += 1
+                return embedding
+
+            if self._db is not None:
+                row = self._db.execute("SELECT vector FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    embedding = np.frombuffer(row[0], dtype=np.float32).tolist()
+                    self._remember(key, embedding)
+                    self._metrics["disk_hits"] += 1
+                    return embedding
+
+            self._metrics["misses"] += 1
+            return None
+
+    def _store(self, key: str, embedding: List[float]):
+        with self._lock:
+            self._remember(key, embedding)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?)",
+                    (key, np.asarray(embedding, dtype=np.float32).tobytes(), time.time()),
+                )
+                self._db.commit()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        with span("embed.query", kind="embedding", model=self.model_name) as embed_span:
+            key = self._key(query)
+            embedding = self._lookup(key)
+            embed_span.set(cache_hit=embedding is not None)
+            if embedding is None:
+                embedding = self._inner._get_query_embedding(query)
+                self._store(key, embedding)
+            return embedding
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        with span("embed.query", kind="embedding", model=self.model_name) as embed_span:
+            key = self._key(query)
+            embedding = self._lookup(key)
+            embed_span.set(cache_hit=embedding is not None)
+            if embedding is None:
+                embedding = await self._inner._aget_query_embedding(query)
+                self._store(key, embedding)
+            return embedding
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._inner._get_text_embedding(text)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return await self._inner._aget_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._inner._get_text_embeddings(texts)
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM query_embeddings")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss metrics."""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
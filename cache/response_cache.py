@@ -0,0 +1,306 @@
+"""
+Agent Response Cache
+
+This module caches final agent answers so repeated questions skip the ReAct loop:
+
+1. EXACT TIER: Normalized query text (case, whitespace, trailing punctuation) hashed with SHA-256
+2. SEMANTIC TIER: Query embeddings from the KnowledgeBase embedding model, matched by cosine
+   similarity above a configurable threshold (one matrix product per lookup). A near-duplicate
+   only counts when its numbers, capitalized words and tool arguments match the query exactly,
+   so "weather in Tokyo" never answers "weather in Paris"
+3. EVICTION: Least-recently-used eviction beyond max_entries and time-to-live expiry
+4. PERSISTENCE: Entries live in an SQLite file under storage/ and survive restarts
+5. METRICS: Exact hits, semantic hits, misses, evictions and expirations are counted
+6. FRESHNESS: Answers that used a time-varying tool (e.g. the weather) are not stored
+
+Entries are namespaced (e.g. by agent type) so different agents never share answers.
+"""
+
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so trivially different phrasings share a cache key."""
+    text = re.sub(r"\s+", " ", query.strip().lower())
+    return text.rstrip("?!. ")
+
+def query_signature(query: str) -> Tuple[Set[str], Set[str]]:
+    """The numbers and capitalized words (names, places) a semantically similar query must share.
+
+    The first word is skipped, since it is capitalized in any sentence.
+    """
+    numbers = set(re.findall(r"\d+(?:\.\d+)?", query))
+    words = re.findall(r"[A-Za-z][\w'-]*", query)
+    capitalized = {word for word in words[1:] if word[0].isupper()}
+    return numbers, capitalized
+
+def tool_arguments(sources: Iterable[Any]) -> List[str]:
+    """The scalar argument values of the tool calls (ToolOutputs) behind an answer."""
+    values = []
+    for source in sources:
+        raw_input = getattr(source, "raw_input", None) or {}
+        if not isinstance(raw_input, dict):
+            continue
+        if "kwargs" in raw_input or "args" in raw_input:
+            arguments = list(raw_input.get("args") or ()) + list((raw_input.get("kwargs") or {}).values())
+        else:
+            arguments = list(raw_input.values())
+        values.extend(str(value) for value in arguments if isinstance(value, (str, int, float)) and str(value).strip())
+    return values
+
+def _mentions(text: str, value: str) -> bool:
+    return re.search(rf"(?<!\w){re.escape(normalize_query(value))}(?!\w)", text) is not None
+
+class _Entry:
+    """A cached response held in memory."""
+    __slots__ = ("key", "namespace", "query", "response", "embedding", "tool_args", "created", "last_access")
+
+    def __init__(self, key, namespace, query, response, embedding, tool_args, created, last_access):
+        self.key = key
+        self.namespace = namespace
+        self.query = query
+        self.response = response
+        self.embedding = embedding
+        self.tool_args = tool_args
+        self.created = created
+        self.last_access = last_access
+
+    def matches(self, query: str) -> bool:
+        """Whether a semantically similar query asks about the same specifics as this entry's query.
+
+        Tool arguments taken from this entry's query (a city, a package) must appear in the new one.
+        """
+        if query_signature(query) != query_signature(self.query):
+            return False
+        cached, text = normalize_query(self.query), normalize_query(query)
+        return all(_mentions(text, value) for value in self.tool_args if _mentions(cached, value))
+
+class ResponseCache:
+    """Two-tier (exact + semantic) cache of agent responses backed by SQLite."""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        embed_model: Any = None,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.95,
+        uncacheable_tools: Sequence[str] = (),
+    ):
+        """Open (or create) the on-disk cache and load live entries into memory.
+
+        embed_model is any LlamaIndex BaseEmbedding; without one only the exact tier is used.
+        Answers that called any of uncacheable_tools are never stored.
+        """
+        self.embed_model = embed_model
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.uncacheable_tools = frozenset(uncacheable_tools)
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()  # Recent lookups, reused by put()
+        # Per-namespace (keys, embedding matrix) for the semantic tier, rebuilt after changes
+        self._matrices: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self._metrics = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+        self._db = None
+        if cache_dir is not None:
+            cache_dir = Path(cache_dir)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(cache_dir / "responses.sqlite3"), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, namespace TEXT, query TEXT, response TEXT, "
+                "embedding BLOB, created REAL, last_access REAL, tool_args TEXT)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(responses)")}
+            if "tool_args" not in columns:
+                self._db.execute("ALTER TABLE responses ADD COLUMN tool_args TEXT")
+            self._db.commit()
+            self._load()
+
+    def _load(self):
+        """Load unexpired entries from disk, oldest access first."""
+        now = time.time()
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        rows = self._db.execute(
+            "SELECT key, namespace, query, response, embedding, tool_args, created, last_access "
+            "FROM responses ORDER BY last_access"
+        ).fetchall()
+        for key, namespace, query, response, embedding, tool_args, created, last_access in rows:
+            vector = np.frombuffer(embedding, dtype=np.float32) if embedding else None
+            args = json.loads(tool_args) if tool_args else []
+            self._entries[key] = _Entry(key, namespace, query, response, vector, args, created, last_access)
+        self._evict()
+        self._db.commit()
+        logger.info(f"Loaded {len(self._entries)} cached responses")
+
+    def _key(self, query: str, namespace: str) -> str:
+        return hashlib.sha256(f"{namespace}\0{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        """Embed the normalized query as a unit vector (memoized for the following put)."""
+        if self.embed_model is None:
+            return None
+        text = normalize_query(query)
+        vector = self._embeddings.get(text)
+        if vector is None:
+            vector = np.asarray(self.embed_model.get_query_embedding(text), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector = vector / norm
+            with self._lock:
+                self._embeddings[text] = vector
+                while len(self._embeddings) > 256:
+                    self._embeddings.popitem(last=False)
+        return vector
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return now - entry.created > self.ttl_seconds
+
+    def _remove(self, keys: List[str]):
+        """Delete entries from memory and disk (caller holds the lock)."""
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._matrices.pop(entry.namespace, None)
+        if self._db is not None and keys:
+            self._db.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in keys])
+            self._db.commit()
+
+    def _evict(self):
+        """Evict least-recently-used entries beyond max_entries (caller holds the lock)."""
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            keys = list(self._entries.keys())[:overflow]
+            self._remove(keys)
+            self._metrics["evictions"] += overflow
+
+    def _matrix(self, namespace: str, dim: int) -> Tuple[List[str], np.ndarray]:
+        """Keys and stacked embeddings of a namespace's dim-sized entries (caller holds the lock)."""
+        cached = self._matrices.get(namespace)
+        if cached is None or cached[1].shape[1] != dim:
+            entries = [e for e in self._entries.values()
+                       if e.namespace == namespace and e.embedding is not None and len(e.embedding) == dim]
+            matrix = np.stack([e.embedding for e in entries]) if entries else np.empty((0, dim), dtype=np.float32)
+            cached = self._matrices[namespace] = ([e.key for e in entries], matrix)
+        return cached
+
+    def _touch(self, entry: _Entry, now: float):
+        entry.last_access = now
+        self._entries.move_to_end(entry.key)
+        if self._db is not None:
+            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, entry.key))
+            self._db.commit()
+
+    def get(self, query: str, namespace: str = "default") -> Optional[str]:
+        """Return a cached response for the query, or None on a miss."""
+        now = time.time()
+        key = self._key(query, namespace)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._expired(entry, now):
+                    self._remove([key])
+                    self._metrics["expirations"] += 1
+                else:
+                    self._touch(entry, now)
+                    self._metrics["exact_hits"] += 1
+                    logger.info(f"Response cache exact hit: {query}")
+                    return entry.response
+
+        vector = self._embed(query)
+        if vector is not None:
+            with self._lock:
+                keys, matrix = self._matrix(namespace, len(vector))
+            # The matrix is replaced, never modified, so it is scored outside the lock
+            scores = matrix @ vector
+            candidates = np.flatnonzero(scores >= self.similarity_threshold)
+            with self._lock:
+                expired = []
+                for i in candidates[np.argsort(-scores[candidates])]:
+                    entry = self._entries.get(keys[i])
+                    if entry is None:
+                        continue
+                    if self._expired(entry, now):
+                        expired.append(entry.key)
+                        continue
+                    if not entry.matches(query):
+                        continue
+                    self._remove(expired)
+                    self._metrics["expirations"] += len(expired)
+                    self._touch(entry, now)
+                    self._metrics["semantic_hits"] += 1
+                    logger.info(f"Response cache semantic hit ({scores[i]:.3f}): {query} ~ {entry.query}")
+                    return entry.response
+                self._remove(expired)
+                self._metrics["expirations"] += len(expired)
+
+        with self._lock:
+            self._metrics["misses"] += 1
+        return None
+
+    def put(self, query: str, response: str, namespace: str = "default", sources: Sequence[Any] = ()):
+        """Store a response for the query.
+
+        sources are the ToolOutputs the answer was built from (response.sources); answers from an
+        uncacheable tool are skipped, and the others' arguments guard semantic hits.
+        """
+        used = {getattr(source, "tool_name", None) for source in sources}
+        if used & self.uncacheable_tools:
+            logger.debug(f"Not caching an answer that used {sorted(used & self.uncacheable_tools)}: {query}")
+            return
+        now = time.time()
+        key = self._key(query, namespace)
+        vector = self._embed(query)
+        args = tool_arguments(sources)
+        entry = _Entry(key, namespace, query, response, vector, args, now, now)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._matrices.pop(namespace, None)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, namespace, query, response, embedding, created, last_access, tool_args) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, namespace, query, response,
+                     vector.tobytes() if vector is not None else None, now, now, json.dumps(args)),
+                )
+            self._evict()
+            if self._db is not None:
+                self._db.commit()
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss metrics."""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["entries"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["semantic_hits"]) / lookups if lookups else 0.0
+        return stats
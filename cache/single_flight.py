@@ -0,0 +1,161 @@
+"""
+Single-Flight Request Coalescing
+
+When several queries need the same thing at the same moment, only one of them does the work:
+
+1. KEYING: Callers pass a key identifying the request (e.g. the hash of an LLM payload or the
+   text of a knowledge base query)
+2. COALESCING: The first caller with a key runs the call; callers arriving with the same key
+   while it is in flight wait for it and receive the same result (or the same backend error).
+   If the call fails for the first caller's own reasons (its deadline passed or it was
+   cancelled) the waiters run the call again themselves, one of them leading
+3. NO STALENESS: Nothing is kept once the call finishes; the next caller starts a new call,
+   so this complements rather than replaces the response and completion caches
+4. DEADLINES: A waiting caller gives up when its own query deadline passes
+5. METRICS: stats() reports calls, executions, coalesced calls and the coalesce rate
+
+Sync callers share a threading.Event per key; async callers share a future per event loop.
+The shared result object is handed to every waiter, so callers must not mutate it.
+"""
+
+import asyncio
+import logging
+import weakref
+import threading
+import importlib
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from utils.deadline import DeadlineExceeded, remaining_time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class _Call:
+    """One in-flight sync call and its outcome."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class _LeaderCancelled(Exception):
+    """Set on an async call whose leader was cancelled, so waiters retry instead of being cancelled."""
+
+def _shared(error: BaseException) -> bool:
+    """Whether waiters receive the leader's error, rather than retrying the call themselves.
+
+    A deadline or cancellation belongs to the leader's query, not to the request."""
+    return isinstance(error, Exception) and not isinstance(error, (DeadlineExceeded, _LeaderCancelled))
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        # asyncio futures belong to one event loop, so async calls are kept per loop
+        self._async_calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._metrics = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Run fn, or wait for the identical call already in flight; returns (result, coalesced)."""
+        with self._lock:
+            self._metrics["calls"] += 1
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self._metrics["executions"] += 1
+            if leader:
+                break
+            if not call.done.wait(remaining_time()):
+                raise DeadlineExceeded(f"Query deadline passed while waiting for a coalesced {self.name} call")
+            if call.error is None or _shared(call.error):
+                with self._lock:
+                    self._metrics["coalesced"] += 1
+                if call.error is not None:
+                    raise call.error
+                return call.result, True
+            logger.debug(f"Coalesced {self.name} call failed with {type(call.error).__name__}; retrying it")
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Async twin of do()."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._metrics["calls"] += 1
+        while True:
+            with self._lock:
+                calls = self._async_calls.setdefault(loop, {})
+                future = calls.get(key)
+                leader = future is None
+                if leader:
+                    future = calls[key] = loop.create_future()
+                    self._metrics["executions"] += 1
+            if leader:
+                break
+            # shield: a waiter that gives up must not cancel the call for the others
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), remaining_time())
+            except (DeadlineExceeded, _LeaderCancelled) as e:
+                logger.debug(f"Coalesced {self.name} call failed with {type(e).__name__}; retrying it")
+                continue
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"Query deadline passed while waiting for a coalesced {self.name} call")
+            except Exception:
+                with self._lock:
+                    self._metrics["coalesced"] += 1
+                raise
+            with self._lock:
+                self._metrics["coalesced"] += 1
+            return result, True
+
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e if _shared(e) or isinstance(e, DeadlineExceeded) else _LeaderCancelled())
+            future.exception()  # Retrieved here, so an unawaited future is not logged as an error
+            raise
+        finally:
+            with self._lock:
+                calls.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls made, calls executed, calls served by another caller's call, and in-flight calls."""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["in_flight"] = len(self._calls) + sum(len(calls) for calls in self._async_calls.values())
+        stats["coalesce_rate"] = stats["coalesced"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+
+_single_flights: Dict[str, SingleFlight] = {}
+_single_flights_lock = threading.Lock()
+
+def get_single_flight(name: str, config: Optional[Dict[str, Any]] = None) -> Optional[SingleFlight]:
+    """Return the process-wide SingleFlight for name ("llm", "kb"), or None when disabled in config."""
+    config = config or vars(importlib.import_module("config"))
+    if not config.get("SINGLE_FLIGHT_ENABLED", True):
+        return None
+    with _single_flights_lock:
+        single_flight = _single_flights.get(name)
+        if single_flight is None:
+            single_flight = _single_flights[name] = SingleFlight(name)
+        return single_flight
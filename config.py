@@ -12,17 +12,147 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "not-needed-for-local")
 
 # For local LLM
 LOCAL_LLM_MODEL = "mistral-7b-instruct-v0.3"
+LOCAL_LLM_IS_CHAT_MODEL = False               # Send structured chat messages instead of a single prompt
+LOCAL_LLM_IS_FUNCTION_CALLING_MODEL = False   # Model supports OpenAI-style tool calls
+LOCAL_LLM_TEMPERATURE = None                  # None keeps the server's default; 0 makes completions cacheable
+
+# HTTP transport for the local LLM server
+LLM_POOL_CONNECTIONS = 4        # Number of backend hosts to keep connection pools for
+LLM_POOL_MAXSIZE = 16           # Keep-alive connections kept per backend
+LLM_CONNECT_TIMEOUT = 5.0       # Seconds allowed to establish a connection
+LLM_READ_TIMEOUT = 120.0        # Seconds allowed to wait for a completion
+LLM_MAX_RETRIES = 3             # Retries on connection errors, 429 and 5xx responses
+LLM_RETRY_BACKOFF = 0.5         # Exponential backoff factor between retries (seconds)
+LLM_MAX_CONCURRENCY = 8         # Max in-flight requests per backend
+LLM_DEADLINE_TOKENS_PER_SECOND = 20.0   # Assumed generation speed; under a query deadline max_tokens is capped to the time left
+LLM_DEADLINE_MIN_TOKENS = 32            # A call that could generate fewer tokens before the deadline is not started
+
+# Several LLM servers: with two or more URLs here, requests are balanced over them with
+# failover (LOCAL_LLM_URL is then ignored), e.g. ["http://10.0.0.5:1234/v1/chat/completions", ...]
+LOCAL_LLM_URLS = []
+LLM_ROUTING_STRATEGY = "least_outstanding"  # "least_outstanding" or "ewma" (latency moving average x queue)
+LLM_BACKEND_MAX_FAILURES = 3            # Consecutive failures (connection errors, timeouts, 5xx) before eviction
+LLM_BACKEND_EVICTION_SECONDS = 30.0     # How long an evicted server gets no requests...
+LLM_HEALTH_CHECK_INTERVAL = 10.0        # ...unless a GET /models health check (every this many seconds) succeeds first
+LLM_HEDGE_AFTER_SECONDS = None          # Also send a request to a second server if unanswered after this long; None disables
 
 # For OpenAI
 OPENAI_LLM_MODEL = "gpt-3.5-turbo"
 
 # Default embedding model (works locally)
+# Prefixes: "local:" (sentence-transformers / PyTorch), "onnx:" (ONNX Runtime, CPU) or
+# "onnx-int8:" (ONNX Runtime with int8 dynamic quantization)
 EMBEDDING_MODEL = "local:BAAI/bge-small-en-v1.5"
 
+# Knowledge base ingestion
+KB_CHUNK_SIZE = 1024            # Tokens per chunk
+KB_CHUNK_OVERLAP = 200          # Tokens shared between neighbouring chunks
+EMBED_BATCH_SIZE = 64           # Texts embedded per model call
+INGEST_NUM_WORKERS = 1          # Processes used for chunking (1 = in-process)
+EMBED_NUM_WORKERS = 1           # Processes used for embedding; each loads its own model copy
+
+# Load the knowledge base on the first ai_knowledge_base call instead of at startup. Sessions that
+# never use it skip loading the embedding model (no warmup, and no semantic response-cache matching)
+KB_LAZY_LOAD = False
+
+# Vector store backend: "numpy" (memory-mapped float32 matrix), "chroma" (embedded on-disk
+# Chroma collection, see CHROMA_* below) or "simple" (LlamaIndex JSON store)
+VECTOR_STORE_BACKEND = "numpy"
+VECTOR_STORE_DTYPE = "float32"  # numpy backend storage: "float32", "float16" (1/2 memory) or "int8" (~1/4 memory)
+
+# Search structure for the numpy backend: "flat" (exact) or "ivf" (approximate, for large corpora)
+VECTOR_INDEX_TYPE = "flat"
+IVF_NLIST = None                # Number of k-means lists; None picks ~4 * sqrt(N)
+IVF_NPROBE = 8                  # Lists scanned per query; higher = better recall, slower search
+IVF_MIN_VECTORS = 10000         # Below this many vectors the IVF index falls back to exact search
+
+# Knowledge base retrieval
+RETRIEVAL_MODE = "hybrid"             # "hybrid" (BM25 + vector, fused) or "vector" (dense only)
+KB_SIMILARITY_TOP_K = 2               # Chunks retrieved per knowledge base query
+KB_TOOL_MODE = "retrieve"             # "retrieve": the tool returns the top chunks and the agent writes the answer;
+                                      # "synthesize": the query engine first answers from them (one extra LLM call)
+KB_CONTEXT_TOKEN_BUDGET = 600         # Max tokens of chunk text returned in retrieve mode
+KB_RESPONSE_MODE = "compact"          # Synthesis in "synthesize" mode: "compact" or "tree_summarize"
+BM25_RRF_K = 60                       # Reciprocal rank fusion constant
+BM25_SHORT_CIRCUIT_COVERAGE = 1.0     # Top BM25 hit must contain this fraction of the query terms...
+BM25_SHORT_CIRCUIT_MARGIN = 1.5       # ...and outscore the runner-up this many times to skip embedding (0 = never)
+
+# Fast-path router (opt-in): direct tool queries ("weather in Tokyo", "sqrt of 144", "what is pandas")
+# are answered with the raw tool output instead of an LLM-written answer; everything else goes to the agent
+ROUTER_ENABLED = False
+ROUTER_SEMANTIC = True          # Also classify intents by embedding (uses the knowledge base's model)
+ROUTER_MIN_SIMILARITY = 0.80    # Minimum cosine similarity to an intent's example utterances...
+ROUTER_MIN_MARGIN = 0.05        # ...and lead over the examples that need the full agent
+ROUTER_LLM_CALLS_PER_HIT = 2    # LLM calls an agent spends on a direct tool query (for the saved-calls metric)
+
+# Batch mode
+BATCH_WORKERS = 4               # Concurrent agent instances used by --batch
+
+# Serve mode (--serve)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8000
+SERVER_WORKERS = 4              # Pooled agent instances per agent type (concurrent queries)
+SERVER_MAX_QUEUE = 16           # Requests allowed to wait for an agent before new ones get 503
+SERVER_QUEUE_TIMEOUT = 30.0     # Seconds a queued request waits for an agent before 503
+SERVER_MAX_BATCH = 100          # Largest /batch request accepted
+
+# ReAct prompt budget: the scratchpad of thoughts, actions and observations is resent on every step
+REACT_PROMPT_TOKEN_BUDGET = 3000        # Above this, older steps are collapsed into a short summary
+REACT_MAX_OBSERVATION_TOKENS = 800      # Longer tool observations are truncated
+REACT_KEEP_RECENT_STEPS = 2             # Most recent action/observation pairs always kept verbatim
+REACT_SUMMARY_OBSERVATION_TOKENS = 40   # Observation tokens kept per step in the summary
+
+# ReAct early termination: the agent answers with what it has so far instead of running on
+REACT_QUERY_DEADLINE_SECONDS = 60.0     # Latency budget per query (LLM calls, tools and steps); None disables it
+REACT_MAX_ITERATIONS = 10               # Reasoning steps per query
+REACT_MAX_REPEATED_ACTIONS = 2          # Stop once the same tool call (name and input) has been made this often; 0 disables
+
+# Tool execution (shared by all agents in the process)
+TOOL_EXECUTOR_WORKERS = 4       # Tool calls running at once; the calls of one model turn run in parallel
+TOOL_TIMEOUT_SECONDS = 30.0     # Per-call limit; a call that runs over returns an error observation
+TOOL_TIMEOUTS = {}              # Per-tool overrides, e.g. {"ai_knowledge_base": 60.0}
+TOOL_CONCURRENCY_LIMITS = {}    # Per-tool caps on concurrent calls, e.g. {"ai_knowledge_base": 2}
+
 # Project paths
 PROJECT_ROOT = Path(__file__).parent
 DATA_DIR = PROJECT_ROOT / "data"
 KB_PERSIST_DIR = PROJECT_ROOT / "storage" / "knowledge_base"
 
+# Exported (and quantized) ONNX embedding models
+ONNX_MODEL_DIR = PROJECT_ROOT / "storage" / "onnx_models"
+
+# Chroma backend (VECTOR_STORE_BACKEND = "chroma")
+CHROMA_PERSIST_DIR = PROJECT_ROOT / "storage" / "chroma"
+CHROMA_COLLECTION = "ai_knowledge_base"
+
+# Response cache (shared by all agent managers)
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_DIR = PROJECT_ROOT / "storage" / "response_cache"
+RESPONSE_CACHE_SEMANTIC = False                 # Opt-in: also match near-duplicate queries by embedding
+RESPONSE_CACHE_SIMILARITY_THRESHOLD = 0.95      # Minimum cosine similarity for a semantic hit
+RESPONSE_CACHE_MAX_ENTRIES = 1000               # LRU eviction beyond this many entries
+RESPONSE_CACHE_TTL_SECONDS = 3600               # Entries older than this are ignored and deleted
+RESPONSE_CACHE_UNCACHEABLE_TOOLS = ("weather_tool",)  # Answers that used these tools change over time
+
+# Request coalescing: identical LLM requests (non-streaming) and knowledge base retrievals made
+# at the same moment by concurrent queries share one call instead of each running their own
+SINGLE_FLIGHT_ENABLED = True
+
+# LLM completion cache (opt-in; only applies when LOCAL_LLM_TEMPERATURE is 0)
+COMPLETION_CACHE_ENABLED = False
+COMPLETION_CACHE_PATH = PROJECT_ROOT / "storage" / "completion_cache" / "completions.sqlite3"
+COMPLETION_CACHE_MAX_ENTRIES = 512              # In-memory LRU size
+
+# Query embedding cache (knowledge base lookups and the semantic response cache)
+QUERY_EMBEDDING_CACHE_SIZE = 1024               # In-memory LRU entries; 0 disables the cache
+QUERY_EMBEDDING_CACHE_PERSIST = False           # Also keep query embeddings in SQLite across runs
+QUERY_EMBEDDING_CACHE_PATH = PROJECT_ROOT / "storage" / "embedding_cache" / "query_embeddings.sqlite3"
+EMBEDDING_WARMUP = True                         # Run a dummy embedding batch in setup_tools()
+
+# Tracing: per-query spans for ReAct iterations, LLM calls, retrieval, embeddings and tool calls
+TRACING_ENABLED = False                         # --trace turns this on for one run
+TRACE_JSONL_PATH = PROJECT_ROOT / "storage" / "traces" / "traces.jsonl"  # One finished trace per line; None disables
+TRACE_PRINT_SUMMARY = False                     # Print a flame-style breakdown after each query
+
 # Create directories if they don't exist
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,199 @@
+"""
+BM25 Keyword Index
+
+A small inverted index that gives the knowledge base a lexical search path:
+
+1. TOKENIZING: Lowercase word tokens; hyphenated/dotted names such as "llama-index" are kept
+   whole and also split into their parts, so package names and acronyms match exactly
+2. INDEXING: Postings map each term to the chunks containing it, with term frequencies
+3. SCORING: Okapi BM25 (k1, b) over the postings of the query terms only
+4. PERSISTENCE: Saved as bm25.npz next to the vector index: the postings as flat arrays,
+   the chunk lengths and node ids, plus each chunk's source document and metadata (for
+   filters). Chunk text is not duplicated; hits are fetched from the docstore or vector store
+5. UPDATES: Chunks are added and removed per source document, following the same
+   incremental path as the vector index
+
+Lookups touch only the postings of the query terms, so they cost microseconds and
+need no embedding model.
+"""
+
+import re
+import json
+import math
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from llama_index.core.schema import BaseNode, MetadataMode
+
+logger = logging.getLogger(__name__)
+
+BM25_FILENAME = "bm25.npz"
+BM25_VERSION = 2
+LEGACY_BM25_FILENAME = "bm25.json"  # Version 1 kept every chunk's text; replaced on the next save
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its me of on or tell "
+    "that the this to was what when where which who why with you your about explain".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, dropping common stopwords."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = re.split(r"[-_.]", token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part and part not in STOPWORDS)
+    return tokens
+
+class BM25Index:
+    """Okapi BM25 over the knowledge base chunks."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add_nodes(self, nodes: List[BaseNode]):
+        """Index chunks (re-adding a node id replaces it)."""
+        for node in nodes:
+            if node.node_id in self.doc_lengths:
+                self._remove_node(node.node_id)
+            text = node.get_content(metadata_mode=MetadataMode.NONE)
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[node.node_id] = tf
+            length = sum(counts.values())
+            self.doc_lengths[node.node_id] = length
+            self._total_length += length
+            self.nodes[node.node_id] = {
+                "metadata": dict(node.metadata),
+                "ref_doc_id": node.ref_doc_id,
+                "terms": list(counts),
+            }
+
+    def _remove_node(self, node_id: str):
+        info = self.nodes.pop(node_id)
+        for term in info["terms"]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(node_id, None)
+                if not posting:
+                    del self.postings[term]
+        self._total_length -= self.doc_lengths.pop(node_id)
+
+    def delete_ref_doc(self, ref_doc_id: str):
+        """Remove every chunk that came from the given source document."""
+        for node_id in [nid for nid, info in self.nodes.items() if info["ref_doc_id"] == ref_doc_id]:
+            self._remove_node(node_id)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self) - df + 0.5) / (df + 0.5))
+
+    def search(
+        self, query: str, top_k: int = 2, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, float, float]]:
+        """Return up to top_k (node_id, score, coverage) tuples, best first.
+
+        coverage is the fraction of distinct query terms found in the chunk;
+        filters is an optional exact-match metadata restriction.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.doc_lengths:
+            return []
+        avg_length = self._total_length / len(self)
+        scores: Dict[str, float] = {}
+        matched: Counter = Counter()
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self._idf(term)
+            for node_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[node_id] / avg_length)
+                scores[node_id] = scores.get(node_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+                matched[node_id] += 1
+
+        if filters:
+            scores = {
+                node_id: score for node_id, score in scores.items()
+                if all(self.nodes[node_id]["metadata"].get(k) == v for k, v in filters.items())
+            }
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(node_id, score, matched[node_id] / len(terms)) for node_id, score in ranked]
+
+    def save(self, persist_dir: Path):
+        """Write the postings (CSR: term -> row range of chunk numbers and term frequencies) to bm25.npz."""
+        path = Path(persist_dir) / BM25_FILENAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(BM25_FILENAME + ".tmp")
+        node_ids = list(self.doc_lengths)
+        row = {node_id: i for i, node_id in enumerate(node_ids)}
+        terms = sorted(self.postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(self.postings[term]) for term in terms])
+        docs = np.fromiter((row[n] for term in terms for n in self.postings[term]), dtype=np.int32, count=indptr[-1])
+        tfs = np.fromiter((tf for term in terms for tf in self.postings[term].values()), dtype=np.int32, count=indptr[-1])
+        nodes = [[self.nodes[node_id]["ref_doc_id"], self.nodes[node_id]["metadata"]] for node_id in node_ids]
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=BM25_VERSION,
+                params=np.array([self.k1, self.b]),
+                node_ids=np.array(node_ids, dtype=str),
+                doc_lengths=np.array([self.doc_lengths[n] for n in node_ids], dtype=np.int32),
+                terms=np.array(terms, dtype=str),
+                indptr=indptr,
+                docs=docs,
+                tfs=tfs,
+                nodes=np.array(json.dumps(nodes)),
+            )
+        tmp_path.replace(path)
+        (Path(persist_dir) / LEGACY_BM25_FILENAME).unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, persist_dir: Path) -> Optional["BM25Index"]:
+        """Load the index from an index directory, or None if there is none (or only the old format)."""
+        path = Path(persist_dir) / BM25_FILENAME
+        if not path.exists():
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != BM25_VERSION:
+                logger.warning(f"Ignoring BM25 index with unsupported version: {int(data['version'])}")
+                return None
+            k1, b = data["params"].tolist()
+            node_ids = data["node_ids"].tolist()
+            doc_lengths = data["doc_lengths"].tolist()
+            terms = data["terms"].tolist()
+            indptr = data["indptr"].tolist()
+            docs = data["docs"].tolist()
+            tfs = data["tfs"].tolist()
+            nodes = json.loads(str(data["nodes"]))
+
+        index = cls(k1=k1, b=b)
+        index.doc_lengths = dict(zip(node_ids, doc_lengths))
+        index._total_length = sum(doc_lengths)
+        node_terms: List[List[str]] = [[] for _ in node_ids]
+        for t, term in enumerate(terms):
+            start, end = indptr[t], indptr[t + 1]
+            index.postings[term] = {node_ids[d]: tf for d, tf in zip(docs[start:end], tfs[start:end])}
+            for d in docs[start:end]:
+                node_terms[d].append(term)
+        for node_id, (ref_doc_id, metadata), node_term_list in zip(node_ids, nodes, node_terms):
+            index.nodes[node_id] = {"metadata": metadata, "ref_doc_id": ref_doc_id, "terms": node_term_list}
+        logger.info(f"Loaded BM25 index with {len(index)} chunks")
+        return index
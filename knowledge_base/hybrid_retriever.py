@@ -0,0 +1,112 @@
+"""
+Hybrid Retriever
+
+Combines keyword (BM25) and dense vector retrieval for the knowledge base:
+
+1. LEXICAL FIRST: Every query is scored against the BM25 index, which needs no embedding
+2. SHORT-CIRCUIT: If the best lexical hit contains every query term and clearly outscores
+   the runner-up, its results are returned directly and the embedding model is skipped
+3. DENSE: Otherwise the vector retriever runs as usual
+4. FUSION: Both rankings are merged with reciprocal rank fusion (RRF), which needs no
+   score calibration between BM25 and cosine similarity
+5. NODES: The BM25 index holds no text, so lexical-only hits are fetched by id (from the
+   docstore or vector store) once the final ranking is known
+
+Exact-term questions (package names, acronyms like "RAG") are answered by the cheap
+lexical path, while paraphrased questions still benefit from semantic search.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
+
+from knowledge_base.bm25 import BM25Index
+from utils.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+class HybridRetriever(BaseRetriever):
+    """BM25 + vector retriever fused with reciprocal rank fusion."""
+
+    def __init__(
+        self,
+        vector_retriever: BaseRetriever,
+        bm25: BM25Index,
+        fetch_nodes: Callable[[List[str]], List[BaseNode]],
+        similarity_top_k: int = 2,
+        rrf_k: int = 60,
+        short_circuit_coverage: float = 1.0,
+        short_circuit_margin: float = 1.5,
+        filters: Optional[Dict[str, Any]] = None,
+    ):
+        """Configure fusion and the lexical short-circuit.
+
+        fetch_nodes returns the chunks for a list of node ids (skipping unknown ids);
+        short_circuit_coverage is the fraction of query terms the top BM25 hit must contain
+        and short_circuit_margin how many times it must outscore the runner-up; set the
+        margin to 0 to disable the short-circuit.
+        """
+        super().__init__()
+        self.vector_retriever = vector_retriever
+        self.bm25 = bm25
+        self.fetch_nodes = fetch_nodes
+        self.similarity_top_k = similarity_top_k
+        self.rrf_k = rrf_k
+        self.short_circuit_coverage = short_circuit_coverage
+        self.short_circuit_margin = short_circuit_margin
+        self.filters = filters
+        self._lock = threading.Lock()
+        self._metrics = {"lexical": 0, "hybrid": 0}
+
+    def _is_confident(self, lexical) -> bool:
+        """True when the top lexical hit is complete and clearly ahead."""
+        if not lexical or self.short_circuit_margin <= 0:
+            return False
+        _, top_score, coverage = lexical[0]
+        if coverage < self.short_circuit_coverage:
+            return False
+        runner_up = lexical[1][1] if len(lexical) > 1 else 0.0
+        return top_score >= self.short_circuit_margin * runner_up
+
+    def _record(self, path: str):
+        with self._lock:
+            self._metrics[path] += 1
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        """Lexical short-circuit, or BM25 + vector results fused by RRF."""
+        lexical = self.bm25.search(query_bundle.query_str, top_k=self.similarity_top_k + 1, filters=self.filters)
+        if self._is_confident(lexical):
+            self._record("lexical")
+            current_span().set(path="lexical")
+            logger.debug(f"Lexical short-circuit for query: {query_bundle.query_str}")
+            scores = {node_id: score for node_id, score, _ in lexical[:self.similarity_top_k]}
+            return [NodeWithScore(node=node, score=scores[node.node_id]) for node in self.fetch_nodes(list(scores))]
+
+        self._record("hybrid")
+        current_span().set(path="hybrid")
+        dense = self.vector_retriever.retrieve(query_bundle)
+
+        fused: Dict[str, float] = {}
+        nodes = {}
+        for rank, item in enumerate(dense):
+            fused[item.node.node_id] = fused.get(item.node.node_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+            nodes[item.node.node_id] = item.node
+        for rank, (node_id, _, _) in enumerate(lexical):
+            fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:self.similarity_top_k]
+        missing = [node_id for node_id, _ in ranked if node_id not in nodes]
+        if missing:
+            nodes.update((node.node_id, node) for node in self.fetch_nodes(missing))
+        return [NodeWithScore(node=nodes[node_id], score=score) for node_id, score in ranked if node_id in nodes]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how many queries were answered lexically vs. with the vector index."""
+        with self._lock:
+            stats = dict(self._metrics)
+        total = stats["lexical"] + stats["hybrid"]
+        stats["lexical_rate"] = stats["lexical"] / total if total else 0.0
+        return stats
@@ -0,0 +1,144 @@
+"""
+IVF Approximate Nearest-Neighbor Index
+
+A pure NumPy inverted-file (IVF) index used by NumpyVectorStore:
+
+1. TRAINING: Spherical k-means on (a sample of) the unit vectors produces nlist centroids
+2. ASSIGNMENT: Every row is assigned to its nearest centroid; new rows are assigned on insert,
+   so the index grows incrementally without retraining
+3. SEARCH: A query scores the centroids, then only the rows in the nprobe closest lists
+4. PERSISTENCE: Centroids and row assignments are saved as ivf.npz next to the vectors
+
+Rows are identified by their position in the vector store's matrix, so the store keeps
+the assignments aligned when rows are appended or deleted. Recall is tuned with nprobe:
+higher values scan more lists and approach exact search.
+"""
+
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IVF_FILENAME = "ivf.npz"
+ASSIGN_CHUNK = 8192           # Rows scored against the centroids at a time (bounds temporary memory)
+TRAIN_POINTS_PER_LIST = 40    # k-means sample size per list; more adds training time, not recall
+
+def _nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for each row."""
+    assignments = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], ASSIGN_CHUNK):
+        block = np.asarray(vectors[start:start + ASSIGN_CHUNK], dtype=np.float32)
+        assignments[start:start + ASSIGN_CHUNK] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity; returns k unit-length centroids."""
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    centroids = np.array(vectors[rng.choice(n, size=k, replace=False)], dtype=np.float32)
+
+    for _ in range(iterations):
+        assignments = _nearest_centroids(vectors, centroids)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.zeros_like(centroids)
+        # Sum each cluster's rows in one pass over the rows sorted by cluster
+        order = np.argsort(assignments, kind="stable")
+        present = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts[present])[:-1]])
+        sums[present] = np.add.reduceat(vectors[order], starts, axis=0)
+
+        # Re-seed empty clusters with random points so every list stays useful
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            sums[empty] = vectors[rng.choice(n, size=empty.size, replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+class IVFIndex:
+    """Inverted lists over the rows of a normalized vector matrix."""
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8):
+        """nlist=None picks roughly 4 * sqrt(N) lists when the index is trained."""
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.trained_size = 0
+        self._order: Optional[np.ndarray] = None   # Row indices sorted by list
+        self._bounds: Optional[np.ndarray] = None  # Start offset of each list in _order
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, matrix: np.ndarray, seed: int = 0):
+        """Learn centroids from the matrix and assign every row."""
+        n = matrix.shape[0]
+        nlist = self.nlist or max(1, int(4 * np.sqrt(n)))
+        nlist = min(nlist, n)
+        sample_size = nlist * TRAIN_POINTS_PER_LIST
+        rng = np.random.default_rng(seed)
+        sample = matrix if n <= sample_size else matrix[np.sort(rng.choice(n, sample_size, replace=False))]
+        self.centroids = spherical_kmeans(np.asarray(sample, dtype=np.float32), nlist, seed=seed)
+        self.assignments = _nearest_centroids(matrix, self.centroids)
+        self.trained_size = n
+        self._invalidate()
+        logger.info(f"Trained IVF index with {nlist} lists over {n} vectors")
+
+    def add(self, vectors: np.ndarray):
+        """Assign newly appended rows to their lists."""
+        self.assignments = np.concatenate([self.assignments, _nearest_centroids(vectors, self.centroids)])
+        self._invalidate()
+
+    def keep(self, rows):
+        """Drop every row not listed in `rows` (mirrors a deletion in the store)."""
+        self.assignments = self.assignments[rows]
+        self._invalidate()
+
+    def _invalidate(self):
+        self._order = None
+        self._bounds = None
+
+    def _lists(self):
+        """Group row indices by list (rebuilt lazily after changes)."""
+        if self._order is None:
+            self._order = np.argsort(self.assignments, kind="stable").astype(np.int64)
+            sorted_assignments = self.assignments[self._order]
+            self._bounds = np.searchsorted(sorted_assignments, np.arange(self.centroids.shape[0] + 1))
+        return self._order, self._bounds
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Row indices in the nprobe lists closest to the (unit) query vector."""
+        nprobe = min(nprobe or self.nprobe, self.centroids.shape[0])
+        centroid_scores = self.centroids @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        order, bounds = self._lists()
+        return np.concatenate([order[bounds[p]:bounds[p + 1]] for p in probes])
+
+    def save(self, persist_dir: Path):
+        """Write centroids and assignments to ivf.npz."""
+        path = Path(persist_dir) / IVF_FILENAME
+        tmp_path = path.with_name(IVF_FILENAME + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centroids=self.centroids, assignments=self.assignments,
+                     trained_size=np.array(self.trained_size))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, persist_dir: Path, nprobe: int = 8, nlist: Optional[int] = None) -> Optional["IVFIndex"]:
+        """Load a saved index, or None if there is none."""
+        path = Path(persist_dir) / IVF_FILENAME
+        if not path.exists():
+            return None
+        data = np.load(path)
+        index = cls(nlist=nlist, nprobe=nprobe)
+        index.centroids = data["centroids"]
+        index.assignments = data["assignments"]
+        index.trained_size = int(data["trained_size"])
+        return index
@@ -0,0 +1,321 @@
+"""
+Memory-mapped NumPy Vector Store
+
+A LlamaIndex vector store that keeps every embedding in one contiguous float32 matrix:
+
+1. STORAGE: Embeddings are L2-normalized once at write time and saved as a .npy matrix,
+   with node ids, source document ids and metadata in a small JSON sidecar; the matrix
+   can be kept as float32, float16 or int8 (per-row scale) to cut index memory
+2. LOADING: The matrix is opened with mmap, so cold start does not parse or copy vectors;
+   pages are read lazily by the OS the first time they are scored
+3. SEARCH: Cosine top-k is one matrix-vector product followed by argpartition
+4. FILTERING: Exact-match metadata filters and doc/node id restrictions are applied as a row mask
+5. ANN (optional): With index_type="ivf" an IVF index narrows each search to the rows in the
+   nprobe closest k-means lists, trained once the store reaches ivf_min_vectors
+
+Node text stays in the LlamaIndex docstore (stores_text = False), exactly like the
+default SimpleVectorStore, so the rest of the index is unchanged.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+from knowledge_base.ivf_index import IVFIndex
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILENAME = "vectors.npy"
+IDS_FILENAME = "vector_ids.json"
+SCALES_FILENAME = "vector_scales.npy"
+IVF_RETRAIN_GROWTH = 4  # Retrain the IVF lists once the store grows this many times past its training size
+SCORE_CHUNK = 65536     # Rows upcast to float32 at a time when scoring float16/int8 storage
+
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (zero rows are left as zeros)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+def _encode(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Convert unit float32 rows to the storage dtype; int8 rows also get a per-row scale."""
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return vectors.astype(STORAGE_DTYPES[dtype]), None
+
+def _decode(stored: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    """Inverse of _encode (up to rounding)."""
+    rows = np.asarray(stored, dtype=np.float32)
+    return rows * scales[:, None] if scales is not None else rows
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """Vector store backed by a normalized float32/float16/int8 matrix on disk."""
+
+    stores_text: bool = False
+    is_embedding_query: bool = True
+
+    _matrix: np.ndarray = PrivateAttr()
+    _scales: Optional[np.ndarray] = PrivateAttr()
+    _dtype: str = PrivateAttr()
+    _node_ids: List[str] = PrivateAttr()
+    _ref_doc_ids: List[Optional[str]] = PrivateAttr()
+    _metadata: List[Dict[str, Any]] = PrivateAttr()
+    _ivf: Optional[IVFIndex] = PrivateAttr()
+    _ivf_min_vectors: int = PrivateAttr()
+
+    def __init__(
+        self,
+        dim: int = 0,
+        index_type: str = "flat",
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        ivf_min_vectors: int = 10000,
+        dtype: str = "float32",
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported vector storage dtype: {dtype}")
+        self._dtype = dtype
+        self._matrix = np.zeros((0, dim), dtype=STORAGE_DTYPES[dtype])
+        self._scales = np.zeros(0, dtype=np.float32) if dtype == "int8" else None
+        self._node_ids = []
+        self._ref_doc_ids = []
+        self._metadata = []
+        if index_type == "ivf":
+            self._ivf = IVFIndex(nlist=nlist, nprobe=nprobe)
+        elif index_type == "flat":
+            self._ivf = None
+        else:
+            raise ValueError(f"Unsupported vector index type: {index_type}")
+        self._ivf_min_vectors = ivf_min_vectors
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: Path, mmap: bool = True, **index_kwargs: Any) -> "NumpyVectorStore":
+        """Open a persisted store; the matrix is memory-mapped unless mmap is False.
+
+        A matrix saved with a different dtype than requested is converted in memory
+        (and written in the new dtype on the next persist).
+        """
+        persist_dir = Path(persist_dir)
+        store = cls(**index_kwargs)
+        store._matrix = np.load(persist_dir / VECTORS_FILENAME, mmap_mode="r" if mmap else None)
+        store._scales = np.load(persist_dir / SCALES_FILENAME) if store._matrix.dtype == np.int8 else None
+        if store._matrix.dtype != STORAGE_DTYPES[store._dtype]:
+            logger.info(f"Converting stored vectors from {store._matrix.dtype} to {store._dtype}")
+            store._matrix, store._scales = _encode(_decode(store._matrix, store._scales), store._dtype)
+        with open(persist_dir / IDS_FILENAME, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        store._node_ids = data["node_ids"]
+        store._ref_doc_ids = data["ref_doc_ids"]
+        store._metadata = data["metadata"]
+        if len(store._node_ids) != store._matrix.shape[0]:
+            raise ValueError(f"Vector store in {persist_dir} is inconsistent: ids and vectors differ in length")
+        if store._ivf is not None:
+            saved = IVFIndex.load(persist_dir, nprobe=store._ivf.nprobe, nlist=store._ivf.nlist)
+            if saved is not None and saved.assignments.shape[0] == store.count():
+                store._ivf = saved
+            else:
+                store._update_index(store._matrix)
+        logger.info(f"Loaded {len(store._node_ids)} vectors from {persist_dir}")
+        return store
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    def count(self) -> int:
+        # Deliberately not __len__: StorageContext.from_defaults checks `if vector_store:`
+        # and would silently replace an empty store with a SimpleVectorStore
+        return len(self._node_ids)
+
+    def _writable_matrix(self) -> np.ndarray:
+        """Detach a memory-mapped matrix before it is modified."""
+        if isinstance(self._matrix, np.memmap):
+            self._matrix = np.array(self._matrix)
+        return self._matrix
+
+    def _float_rows(self) -> np.ndarray:
+        """The whole matrix as float32 unit vectors."""
+        return _decode(self._matrix, self._scales)
+
+    def _score(self, q: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of q with every row (or the given rows)."""
+        matrix = self._matrix if rows is None else self._matrix[rows]
+        if matrix.dtype == np.float32:
+            scores = matrix @ q
+        else:
+            # No BLAS for float16/int8: upcast in bounded chunks
+            scores = np.concatenate([
+                np.asarray(matrix[start:start + SCORE_CHUNK], dtype=np.float32) @ q
+                for start in range(0, matrix.shape[0], SCORE_CHUNK)
+            ])
+        if self._scales is not None:
+            scores *= self._scales if rows is None else self._scales[rows]
+        return scores
+
+    def _update_index(self, vectors: np.ndarray):
+        """Assign newly added rows to IVF lists, training (or retraining) the lists when due."""
+        if self._ivf is None:
+            return
+        n = self.count()
+        if self._ivf.is_trained and n <= IVF_RETRAIN_GROWTH * self._ivf.trained_size:
+            self._ivf.add(vectors)
+        elif n >= self._ivf_min_vectors:
+            self._ivf.train(self._float_rows())
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        """Append node embeddings (normalized once, here)."""
+        if not nodes:
+            return []
+        vectors = _normalize_rows(np.asarray([node.get_embedding() for node in nodes], dtype=np.float32))
+        stored, scales = _encode(vectors, self._dtype)
+        matrix = self._writable_matrix()
+        if matrix.shape[0] == 0:
+            self._matrix = stored
+        else:
+            self._matrix = np.vstack([matrix, stored])
+        if scales is not None:
+            self._scales = np.concatenate([self._scales, scales])
+        for node in nodes:
+            self._node_ids.append(node.node_id)
+            self._ref_doc_ids.append(node.ref_doc_id)
+            self._metadata.append(dict(node.metadata))
+        self._update_index(vectors)
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        """Delete every vector that came from the given source document."""
+        keep = [i for i, doc_id in enumerate(self._ref_doc_ids) if doc_id != ref_doc_id]
+        if len(keep) == len(self._ref_doc_ids):
+            return
+        self._matrix = np.ascontiguousarray(self._matrix[keep])
+        if self._scales is not None:
+            self._scales = self._scales[keep]
+        self._node_ids = [self._node_ids[i] for i in keep]
+        self._ref_doc_ids = [self._ref_doc_ids[i] for i in keep]
+        self._metadata = [self._metadata[i] for i in keep]
+        if self._ivf is not None and self._ivf.is_trained:
+            self._ivf.keep(keep)
+
+    def _candidate_mask(self, query: VectorStoreQuery) -> Optional[np.ndarray]:
+        """Row mask for id restrictions and metadata filters, or None for all rows."""
+        mask = None
+        if query.doc_ids:
+            allowed = set(query.doc_ids)
+            mask = np.array([doc_id in allowed for doc_id in self._ref_doc_ids], dtype=bool)
+        if query.node_ids:
+            allowed = set(query.node_ids)
+            node_mask = np.array([node_id in allowed for node_id in self._node_ids], dtype=bool)
+            mask = node_mask if mask is None else mask & node_mask
+        if query.filters is not None:
+            filter_mask = np.array([self._matches(meta, query.filters) for meta in self._metadata], dtype=bool)
+            mask = filter_mask if mask is None else mask & filter_mask
+        return mask
+
+    @staticmethod
+    def _matches(metadata: Dict[str, Any], filters: MetadataFilters) -> bool:
+        """Evaluate exact-match (==) and != filters against one row's metadata."""
+        results = []
+        for f in filters.filters:
+            value = metadata.get(f.key)
+            if f.operator == FilterOperator.NE:
+                results.append(value != f.value)
+            elif f.operator == FilterOperator.EQ:
+                results.append(value == f.value)
+            else:
+                raise ValueError(f"Unsupported filter operator for NumpyVectorStore: {f.operator}")
+        condition = getattr(filters.condition, "value", filters.condition)
+        return any(results) if condition == "or" else all(results)
+
+    def _ivf_rows(self, q: np.ndarray, mask: Optional[np.ndarray], k: int, nprobe: Optional[int]) -> Optional[np.ndarray]:
+        """Candidate rows from the probed IVF lists, or None when exact search should be used."""
+        if self._ivf is None or not self._ivf.is_trained:
+            return None
+        rows = self._ivf.candidates(q, nprobe=nprobe)
+        if mask is not None:
+            rows = rows[mask[rows]]
+        if rows.size < k:
+            # Too few candidates in the probed lists (e.g. a narrow filter): search exactly
+            return None
+        return np.sort(rows)  # Ascending rows keep reads of a memory-mapped matrix sequential
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        """Return the top-k most similar vectors by cosine similarity.
+
+        Pass nprobe=... (e.g. through a retriever's vector_store_kwargs) to override the
+        number of IVF lists scanned for this query.
+        """
+        if query.query_embedding is None or len(self._node_ids) == 0:
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+
+        q = np.asarray(query.query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm > 0:
+            q = q / norm
+
+        mask = self._candidate_mask(query)
+        rows = self._ivf_rows(q, mask, query.similarity_top_k, kwargs.get("nprobe"))
+        approximate = rows is not None
+        if not approximate:
+            rows = np.arange(len(self._node_ids)) if mask is None else np.flatnonzero(mask)
+        if rows.size == 0:
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+
+        scores = self._score(q, None if mask is None and not approximate else rows)
+        k = min(query.similarity_top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return VectorStoreQueryResult(
+            nodes=None,
+            similarities=[float(scores[i]) for i in top],
+            ids=[self._node_ids[rows[i]] for i in top],
+        )
+
+    def persist(self, persist_path: str, fs: Any = None) -> None:
+        """Write the matrix and sidecar next to the other index files.
+
+        StorageContext passes the path of the default vector store JSON; the matrix
+        and ids are written into that file's directory instead.
+        """
+        persist_dir = Path(persist_path).parent
+        persist_dir.mkdir(parents=True, exist_ok=True)
+
+        # Write to temporary files and swap them in, so a mapped file is never truncated
+        vectors_tmp = persist_dir / (VECTORS_FILENAME + ".tmp")
+        with open(vectors_tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(self._matrix))
+        ids_tmp = persist_dir / (IDS_FILENAME + ".tmp")
+        with open(ids_tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "node_ids": self._node_ids,
+                "ref_doc_ids": self._ref_doc_ids,
+                "metadata": self._metadata,
+            }, f)
+        if self._scales is not None:
+            scales_tmp = persist_dir / (SCALES_FILENAME + ".tmp")
+            with open(scales_tmp, "wb") as f:
+                np.save(f, self._scales)
+            scales_tmp.replace(persist_dir / SCALES_FILENAME)
+        vectors_tmp.replace(persist_dir / VECTORS_FILENAME)
+        ids_tmp.replace(persist_dir / IDS_FILENAME)
+        if self._ivf is not None and self._ivf.is_trained:
+            self._ivf.save(persist_dir)
@@ -0,0 +1,141 @@
+"""
+ONNX Runtime Embeddings
+
+A CPU-friendly embedding backend for the knowledge base:
+
+1. EXPORT: The HuggingFace model is exported to ONNX once (via optimum) and cached on disk
+2. QUANTIZATION (optional): Weights are converted to int8 with ONNX Runtime dynamic quantization,
+   which typically cuts model size ~4x and speeds up CPU inference
+3. INFERENCE: ONNX Runtime runs the graph with all graph optimizations on the CPU provider;
+   texts are tokenized with the fast `tokenizers` library, so PyTorch is not needed at query time
+4. POOLING: CLS pooling for BGE models (mean pooling otherwise), then L2 normalization,
+   matching what the sentence-transformers path produces
+
+Selected with an "onnx:" or "onnx-int8:" prefix on EMBEDDING_MODEL in config.py.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.embeddings import BaseEmbedding
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILENAME = "model.onnx"
+QUANTIZED_MODEL_FILENAME = "model_int8.onnx"
+TOKENIZER_FILENAME = "tokenizer.json"
+BGE_QUERY_INSTRUCTION = "Represent this question for searching relevant passages: "
+
+def export_onnx_model(model_name: str, cache_dir: Path, quantize: bool = False) -> Path:
+    """Export (and optionally quantize) a HuggingFace model once; returns the .onnx path."""
+    export_dir = Path(cache_dir) / model_name.replace("/", "__")
+    model_path = export_dir / MODEL_FILENAME
+    if not model_path.exists():
+        # Export dependencies are only needed the first time
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        logger.info(f"Exporting {model_name} to ONNX in {export_dir}")
+        ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+
+    if not quantize:
+        return model_path
+    quantized_path = export_dir / QUANTIZED_MODEL_FILENAME
+    if not quantized_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info(f"Quantizing {model_name} to int8")
+        quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+    return quantized_path
+
+class OnnxEmbedding(BaseEmbedding):
+    """Sentence embeddings computed with ONNX Runtime."""
+
+    model_path: str = Field(description="Path of the .onnx model file.")
+    pooling: str = Field(default="cls", description="'cls' or 'mean' pooling.")
+    max_length: int = Field(default=512, description="Maximum tokens per text.")
+    query_instruction: Optional[str] = Field(default=None, description="Prefix added to queries.")
+
+    _session: Any = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+    _input_names: List[str] = PrivateAttr()
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: Path,
+        quantize: bool = False,
+        pooling: Optional[str] = None,
+        query_instruction: Optional[str] = None,
+        max_length: int = 512,
+        num_threads: Optional[int] = None,
+        **kwargs: Any,
+    ):
+        """Load (exporting on first use) the ONNX model for `model_name`."""
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = export_onnx_model(model_name, cache_dir, quantize=quantize)
+        is_bge = "bge" in model_name.lower()
+        if query_instruction is None and is_bge and "-en" in model_name.lower():
+            query_instruction = BGE_QUERY_INSTRUCTION
+        super().__init__(
+            model_name=model_name,
+            model_path=str(model_path),
+            pooling=pooling or ("cls" if is_bge else "mean"),
+            max_length=max_length,
+            query_instruction=query_instruction,
+            **kwargs,
+        )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self._input_names = [i.name for i in self._session.get_inputs()]
+
+        self._tokenizer = Tokenizer.from_file(str(model_path.parent / TOKENIZER_FILENAME))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        pad_id = self._tokenizer.token_to_id("[PAD]") or 0
+        self._tokenizer.enable_padding(pad_id=pad_id, pad_token=self._tokenizer.id_to_token(pad_id) or "[PAD]")
+        logger.info(f"Loaded ONNX embedding model {model_path}")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "OnnxEmbedding"
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        encodings = self._tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self._session.run(None, {name: inputs[name] for name in self._input_names})[0]
+
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (pooled / norms).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([(self.query_instruction or "") + query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
@@ -3,19 +3,28 @@ AI Knowledge Base Vector Store
 
 This module creates a searchable knowledge base for AI-related information:
 
-1. STORAGE: Converts AI documents into vector embeddings for semantic search
-2. RETRIEVAL: Finds the most relevant information based on query meaning, not just keywords
-3. PERSISTENCE: Saves indexed information to disk for reuse without reprocessing
-4. LOCAL PROCESSING: Uses HuggingFace embedding models instead of OpenAI services 
-5. TOOL INTERFACE: Provides a standard interface for agents to query the knowledge base
+1. STORAGE: Converts AI documents into vector embeddings for semantic search, kept in a
+   pluggable backend (memory-mapped NumPy matrix, embedded Chroma collection or JSON)
+2. RETRIEVAL: Finds the most relevant information based on query meaning, fused with a BM25
+   keyword index so exact terms and acronyms are matched cheaply (hybrid mode)
+3. INGESTION: Chunks and embeds documents in configurable batches on worker pools
+4. PERSISTENCE: Saves indexed information to disk for reuse without reprocessing
+   (incrementally: only new or changed documents are embedded, removed ones are deleted)
+5. LOCAL PROCESSING: Uses HuggingFace embedding models instead of OpenAI services 
+   (query embeddings are cached, and the model can be warmed up at startup)
+6. TOOL INTERFACE: Provides a standard interface for agents to query the knowledge base,
+   either returning the top chunks directly (retrieve mode, no LLM call) or a synthesized answer;
+   identical retrievals in flight at the same time are coalesced into one
 
 The knowledge base acts as a specialized AI librarian that organizes information
 and quickly retrieves relevant context when questioned about AI topics.
 """
 
+import time
 import logging
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 
 from llama_index.core import (
     VectorStoreIndex,
@@ -24,18 +33,180 @@ from llama_index.core import (
     load_index_from_storage
 )
 from llama_index.core.embeddings import BaseEmbedding
-from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.core.tools import QueryEngineTool
 from llama_index.core.tools import ToolMetadata
+from llama_index.core.tools.types import AsyncBaseTool, ToolOutput
 from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
 from llama_index.core.settings import Settings
+from llama_index.core.vector_stores import MetadataFilters, ExactMatchFilter
 
-from config import KB_PERSIST_DIR, EMBEDDING_MODEL
+from config import (
+    KB_PERSIST_DIR,
+    CHROMA_PERSIST_DIR,
+    CHROMA_COLLECTION,
+    EMBEDDING_MODEL,
+    ONNX_MODEL_DIR,
+    KB_CHUNK_SIZE,
+    KB_CHUNK_OVERLAP,
+    EMBED_BATCH_SIZE,
+    INGEST_NUM_WORKERS,
+    EMBED_NUM_WORKERS,
+    VECTOR_STORE_BACKEND,
+    VECTOR_STORE_DTYPE,
+    VECTOR_INDEX_TYPE,
+    IVF_NLIST,
+    IVF_NPROBE,
+    IVF_MIN_VECTORS,
+    RETRIEVAL_MODE,
+    KB_SIMILARITY_TOP_K,
+    KB_TOOL_MODE,
+    KB_CONTEXT_TOKEN_BUDGET,
+    KB_RESPONSE_MODE,
+    BM25_RRF_K,
+    BM25_SHORT_CIRCUIT_COVERAGE,
+    BM25_SHORT_CIRCUIT_MARGIN,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    QUERY_EMBEDDING_CACHE_PERSIST,
+    QUERY_EMBEDDING_CACHE_PATH,
+)
+from cache.embedding_cache import CachedEmbedding
+from cache.single_flight import get_single_flight
 from data.sample_documents import AI_DOCUMENTS
+from knowledge_base.bm25 import BM25Index
+from knowledge_base.hybrid_retriever import HybridRetriever
+from knowledge_base.ingestion import DocumentManifest, EmbeddingPipeline
+from knowledge_base.numpy_vector_store import NumpyVectorStore
+from utils.tokens import count_tokens, truncate_to_tokens
+from utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
+WARMUP_TEXT = "Warm up the embedding model before the first query."
+KB_TOOL_NAME = "ai_knowledge_base"
+KB_TOOL_DESCRIPTION = "Provides information about AI concepts and technologies. Use this when you need information about AI frameworks, techniques, or terminology."
+KB_RETRIEVE_DESCRIPTION = KB_TOOL_DESCRIPTION + " Returns the most relevant passages with their document titles."
+NO_RESULTS = "No relevant information found in the knowledge base."
+
+def kb_tool_description(mode: Optional[str] = None) -> str:
+    """Description of the ai_knowledge_base tool in the given mode (default KB_TOOL_MODE)."""
+    return KB_RETRIEVE_DESCRIPTION if (mode or KB_TOOL_MODE) == "retrieve" else KB_TOOL_DESCRIPTION
+
+class TracedQueryEngine(RetrieverQueryEngine):
+    """RetrieverQueryEngine that records a retrieval span for each query.
+
+    Identical retrievals running at the same time (several users asking the same thing) share
+    one retrieval through the "kb" single flight.
+    """
+
+    def retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        with span("kb.retrieve", kind="retrieval") as retrieval_span:
+            single_flight = get_single_flight("kb")
+            if single_flight is None:
+                nodes = super().retrieve(query_bundle)
+            else:
+                nodes, coalesced = single_flight.do(
+                    (id(self), query_bundle.query_str),
+                    lambda: super(TracedQueryEngine, self).retrieve(query_bundle),
+                )
+                retrieval_span.set(coalesced=coalesced)
+            retrieval_span.set(nodes=len(nodes))
+            return nodes
+
+    async def aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        with span("kb.retrieve", kind="retrieval") as retrieval_span:
+            single_flight = get_single_flight("kb")
+            if single_flight is None:
+                nodes = await super().aretrieve(query_bundle)
+            else:
+                nodes, coalesced = await single_flight.ado(
+                    (id(self), query_bundle.query_str),
+                    lambda: super(TracedQueryEngine, self).aretrieve(query_bundle),
+                )
+                retrieval_span.set(coalesced=coalesced)
+            retrieval_span.set(nodes=len(nodes))
+            return nodes
+
+def format_passages(nodes: List[NodeWithScore], token_budget: int) -> str:
+    """Numbered passages with titles, best first, cut to fit token_budget."""
+    passages = []
+    remaining = token_budget
+    for rank, node in enumerate(nodes, start=1):
+        title = node.node.metadata.get("title", "Untitled")
+        header = f"[{rank}] {title}\n"
+        room = remaining - count_tokens(header)
+        if room <= 0:
+            break
+        text = truncate_to_tokens(node.node.get_content().strip(), room)
+        if not text:
+            break
+        passages.append(header + text)
+        remaining -= count_tokens(passages[-1]) + 1
+    return "\n\n".join(passages) or NO_RESULTS
+
+class KnowledgeBaseRetrieverTool(AsyncBaseTool):
+    """ai_knowledge_base tool that returns the top chunks instead of a synthesized answer.
+
+    The agent already reasons over the tool output, so skipping the query engine's own
+    response-synthesis call saves one full LLM generation per lookup.
+    """
+
+    def __init__(self, query_engine: RetrieverQueryEngine, token_budget: int = KB_CONTEXT_TOKEN_BUDGET):
+        self._query_engine = query_engine
+        self.token_budget = token_budget
+        self._metadata = ToolMetadata(name=KB_TOOL_NAME, description=KB_RETRIEVE_DESCRIPTION)
+
+    @property
+    def metadata(self) -> ToolMetadata:
+        return self._metadata
+
+    def _output(self, query_str: str, nodes: List[NodeWithScore]) -> ToolOutput:
+        return ToolOutput(
+            content=format_passages(nodes, self.token_budget),
+            tool_name=KB_TOOL_NAME,
+            raw_input={"input": query_str},
+            raw_output=nodes,
+        )
+
+    @staticmethod
+    def _query_str(*args: Any, **kwargs: Any) -> str:
+        if args:
+            return str(args[0])
+        if "input" in kwargs:
+            return str(kwargs["input"])
+        raise ValueError("Cannot call the knowledge base without an 'input' argument")
+
+    def call(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        query_str = self._query_str(*args, **kwargs)
+        return self._output(query_str, self._query_engine.retrieve(QueryBundle(query_str)))
+
+    async def acall(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        query_str = self._query_str(*args, **kwargs)
+        return self._output(query_str, await self._query_engine.aretrieve(QueryBundle(query_str)))
+
+def get_embedding_model(model_spec: str = EMBEDDING_MODEL) -> BaseEmbedding:
+    """Create the embedding model described by a prefixed spec such as "local:BAAI/bge-small-en-v1.5"."""
+    if model_spec.startswith("local:"):
+        # Use a local embedding model
+        # Imported here: it pulls in torch and transformers, which take seconds to load
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+        model_name = model_spec.split("local:")[1]
+        logger.info(f"Using local embedding model: {model_name}")
+        return HuggingFaceEmbedding(model_name=model_name)
+    elif model_spec.startswith("onnx:") or model_spec.startswith("onnx-int8:"):
+        # ONNX Runtime on the CPU, optionally int8-quantized (onnxruntime/optimum are optional dependencies)
+        from knowledge_base.onnx_embedding import OnnxEmbedding
+
+        prefix, model_name = model_spec.split(":", 1)
+        logger.info(f"Using ONNX embedding model: {model_name} ({prefix})")
+        return OnnxEmbedding(model_name=model_name, cache_dir=ONNX_MODEL_DIR, quantize=prefix == "onnx-int8")
+        """ elif model_spec.startswith("openai:"):
+        logger.info(f"Using OpenAI embedding model: {model_spec}")
+        return OpenAIEmbedding(model=model_spec) """
+    else:
+        raise ValueError(f"Unsupported embedding model: {model_spec}")
+
 class KnowledgeBase:
     """Class to manage the vector knowledge base."""
     
@@ -43,27 +214,97 @@ class KnowledgeBase:
         """Initialize the knowledge base."""
         self.persist_dir = persist_dir or KB_PERSIST_DIR
         self.index = None
-        self.embedding_model = self._get_embedding_model()
+        self.bm25: Optional[BM25Index] = None
+        # Ingestion uses the model directly; queries go through the embedding cache
+        self.base_embedding_model = self._get_embedding_model()
+        self.embedding_model = self._wrap_with_cache(self.base_embedding_model)
         Settings.embed_model = self.embedding_model
+        self.pipeline = EmbeddingPipeline(
+            embed_model=self.base_embedding_model,
+            chunk_size=KB_CHUNK_SIZE,
+            chunk_overlap=KB_CHUNK_OVERLAP,
+            embed_batch_size=EMBED_BATCH_SIZE,
+            num_workers=INGEST_NUM_WORKERS,
+            embed_workers=EMBED_NUM_WORKERS,
+        )
+        # Settings the stored vectors depend on (model, chunking, storage format);
+        # a change means re-embedding everything
+        self.index_settings = {
+            "embedding_model": EMBEDDING_MODEL,
+            "chunk_size": KB_CHUNK_SIZE,
+            "chunk_overlap": KB_CHUNK_OVERLAP,
+            "vector_store_backend": VECTOR_STORE_BACKEND,
+            "vector_store_dtype": VECTOR_STORE_DTYPE,
+        }
         
     def _get_embedding_model(self) -> BaseEmbedding:
         """Get the embedding model based on the configuration."""
-        if EMBEDDING_MODEL.startswith("local:"):
-            # Use a local embedding model
-            model_name = EMBEDDING_MODEL.split("local:")[1]
-            logger.info(f"Using local embedding model: {model_name}")
-            return HuggingFaceEmbedding(model_name=model_name)
-            """ elif EMBEDDING_MODEL.startswith("openai:"):
-            logger.info(f"Using OpenAI embedding model: {EMBEDDING_MODEL}")
-            return OpenAIEmbedding(model=EMBEDDING_MODEL) """
-        else:
-            raise ValueError(f"Unsupported embedding model: {EMBEDDING_MODEL}")
+        return get_embedding_model(EMBEDDING_MODEL)
         
+    def _wrap_with_cache(self, embed_model: BaseEmbedding) -> BaseEmbedding:
+        """Wrap the model with the query embedding cache, if enabled."""
+        if QUERY_EMBEDDING_CACHE_SIZE <= 0:
+            return embed_model
+        return CachedEmbedding(
+            embed_model,
+            max_entries=QUERY_EMBEDDING_CACHE_SIZE,
+            db_path=QUERY_EMBEDDING_CACHE_PATH if QUERY_EMBEDDING_CACHE_PERSIST else None,
+            model_spec=EMBEDDING_MODEL,
+        )
+
+    def warmup(self, batch_size: int = 8):
+        """Run a dummy embedding batch so the first real query does not pay model load and JIT costs."""
+        start = time.perf_counter()
+        self.base_embedding_model.get_text_embedding_batch([WARMUP_TEXT] * batch_size)
+        self.base_embedding_model.get_query_embedding(WARMUP_TEXT)
+        logger.info(f"Embedding model warmed up in {time.perf_counter() - start:.2f}s")
+
+    def _create_vector_store(self, load: bool):
+        """Create the configured vector store backend (None means LlamaIndex's SimpleVectorStore)."""
+        if VECTOR_STORE_BACKEND == "numpy":
+            index_kwargs = {
+                "index_type": VECTOR_INDEX_TYPE,
+                "nlist": IVF_NLIST,
+                "nprobe": IVF_NPROBE,
+                "ivf_min_vectors": IVF_MIN_VECTORS,
+                "dtype": VECTOR_STORE_DTYPE,
+            }
+            if load:
+                return NumpyVectorStore.from_persist_dir(self.persist_dir, **index_kwargs)
+            return NumpyVectorStore(**index_kwargs)
+        elif VECTOR_STORE_BACKEND == "chroma":
+            return self._create_chroma_store(load)
+        elif VECTOR_STORE_BACKEND == "simple":
+            return None
+        else:
+            raise ValueError(f"Unsupported vector store backend: {VECTOR_STORE_BACKEND}")
+
+    def _create_chroma_store(self, load: bool):
+        """Open the embedded Chroma collection; a rebuild starts from an empty collection."""
+        # Imported here so the other backends do not need chromadb installed
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+        from llama_index.vector_stores.chroma import ChromaVectorStore
+
+        client = chromadb.PersistentClient(
+            path=str(CHROMA_PERSIST_DIR),
+            settings=ChromaSettings(anonymized_telemetry=False),
+        )
+        if not load and CHROMA_COLLECTION in [c.name for c in client.list_collections()]:
+            client.delete_collection(CHROMA_COLLECTION)
+        collection = client.get_or_create_collection(CHROMA_COLLECTION, metadata={"hnsw:space": "cosine"})
+        if load and collection.count() == 0:
+            # Index files exist but the collection is gone, so the manifest cannot be trusted
+            raise ValueError(f"Chroma collection '{CHROMA_COLLECTION}' in {CHROMA_PERSIST_DIR} is empty")
+        logger.info(f"Using Chroma collection '{CHROMA_COLLECTION}' ({collection.count()} vectors)")
+        return ChromaVectorStore(chroma_collection=collection)
+
     def create_documents(self) -> List[Document]:
         """Create document objects from sample data."""
         documents = []
         for doc_info in AI_DOCUMENTS:
             doc = Document(
+                id_=doc_info["title"],  # Stable id so the manifest can track the document across runs
                 text=doc_info["content"],
                 metadata={"title": doc_info["title"]}
             )
@@ -78,9 +319,12 @@ class KnowledgeBase:
                 logger.info(f"Loading existing index from {self.persist_dir}")
                 # Load the index if it exists
                 storage_context = StorageContext.from_defaults(
-                    persist_dir=str(self.persist_dir)
+                    persist_dir=str(self.persist_dir),
+                    vector_store=self._create_vector_store(load=True),
                 )
                 self.index = load_index_from_storage(storage_context)
+                self.bm25 = BM25Index.load(self.persist_dir)
+                self._sync_documents()
             except Exception as e:
                 logger.warning(f"Failed to load index: {e}. Creating new index.")
                 self._create_new_index()
@@ -89,42 +333,170 @@ class KnowledgeBase:
             
         return self.index
     
-    def _create_new_index(self):
+    def _sync_documents(self):
+        """Bring a loaded index up to date by embedding only the documents that changed."""
+        documents = self.create_documents()
+        manifest = DocumentManifest.load(self.persist_dir)
+        if manifest is None or self.bm25 is None:
+            # Index predates the manifest or keyword index, so it cannot be updated in place
+            logger.info("No ingestion manifest or BM25 index found, rebuilding index once")
+            self._create_new_index(documents)
+            return
+        if manifest.settings != self.index_settings:
+            logger.info(f"Index settings changed ({manifest.settings} -> {self.index_settings}), rebuilding index")
+            self._create_new_index(documents)
+            return
+
+        added, changed, removed = manifest.diff(documents)
+        if not (added or changed or removed):
+            logger.info(f"Index is up to date ({len(documents)} documents)")
+            return
+
+        logger.info(f"Updating index: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+        for doc_id in removed + [doc.doc_id for doc in changed]:
+            self.index.delete_ref_doc(doc_id, delete_from_docstore=True)
+            self.bm25.delete_ref_doc(doc_id)
+        nodes = self.pipeline.run(added + changed)
+        self.index.insert_nodes(nodes)
+        self.bm25.add_nodes(nodes)
+
+        self.index.storage_context.persist(persist_dir=str(self.persist_dir))
+        self.bm25.save(self.persist_dir)
+        DocumentManifest.from_documents(documents, self.index_settings).save(self.persist_dir)
+        logger.info(f"Index updated and saved to {self.persist_dir}")
+
+    def _create_new_index(self, documents: Optional[List[Document]] = None):
         """Create a new vector index from documents."""
         logger.info("Creating new vector index")
-        documents = self.create_documents()
+        documents = documents or self.create_documents()
         
         # Create a new storage context
-        storage_context = StorageContext.from_defaults()
+        storage_context = StorageContext.from_defaults(
+            vector_store=self._create_vector_store(load=False)
+        )
         
-        # Build the index with the specified embedding model
-        self.index = VectorStoreIndex.from_documents(
-            documents=documents,
+        # Chunk and embed in batches, then build the index from the embedded nodes
+        nodes = self.pipeline.run(documents)
+        self.index = VectorStoreIndex(
+            nodes=nodes,
             storage_context=storage_context,
-            embedding_model=self.embedding_model,  # Use the configured embedding model
+            embed_model=self.embedding_model,  # Use the configured embedding model
         )
+        self.bm25 = BM25Index()
+        self.bm25.add_nodes(nodes)
         
-        # Persist the index
+        # Persist the index, the keyword index and the manifest of what it contains
         self.index.storage_context.persist(persist_dir=str(self.persist_dir))
+        self.bm25.save(self.persist_dir)
+        DocumentManifest.from_documents(documents, self.index_settings).save(self.persist_dir)
         logger.info(f"Index created and saved to {self.persist_dir}")
     
-    def get_query_engine(self):
-        """Get a query engine from the index."""
+    def get_nodes(self, node_ids: List[str]) -> List[BaseNode]:
+        """Fetch chunks by id from the docstore, or from the vector store when it keeps the text."""
+        found: Dict[str, BaseNode] = {}
+        for node_id in node_ids:
+            node = self.index.docstore.get_document(node_id, raise_error=False)
+            if isinstance(node, BaseNode):
+                found[node_id] = node
+        missing = [node_id for node_id in node_ids if node_id not in found]
+        if missing:
+            try:
+                found.update((node.node_id, node) for node in self.index.vector_store.get_nodes(node_ids=missing))
+            except NotImplementedError:
+                logger.warning(f"Vector store cannot fetch nodes by id; dropping {len(missing)} keyword hits")
+        return [found[node_id] for node_id in node_ids if node_id in found]
+
+    def get_query_engine(self, nprobe: Optional[int] = None, title: Optional[str] = None,
+                         similarity_top_k: Optional[int] = None, response_mode: Optional[str] = None):
+        """Get a query engine from the index.
+
+        nprobe overrides IVF_NPROBE for this engine when the IVF index is enabled;
+        title restricts retrieval to chunks of the document with that title;
+        similarity_top_k and response_mode ("compact" or "tree_summarize") override
+        KB_SIMILARITY_TOP_K and KB_RESPONSE_MODE.
+        In hybrid mode, retrieval fuses BM25 and vector results (see HybridRetriever).
+        """
         if self.index is None:
             self.initialize()
         
-        return self.index.as_query_engine()
+        similarity_top_k = similarity_top_k or KB_SIMILARITY_TOP_K
+        response_mode = response_mode or KB_RESPONSE_MODE
+        kwargs: Dict[str, Any] = {"similarity_top_k": similarity_top_k}
+        if nprobe is not None:
+            kwargs["vector_store_kwargs"] = {"nprobe": nprobe}
+        if title is not None:
+            kwargs["filters"] = MetadataFilters(filters=[ExactMatchFilter(key="title", value=title)])
+
+        if RETRIEVAL_MODE == "vector":
+            return TracedQueryEngine.from_args(self.index.as_retriever(**kwargs), response_mode=response_mode)
+        elif RETRIEVAL_MODE == "hybrid":
+            retriever = HybridRetriever(
+                vector_retriever=self.index.as_retriever(**kwargs),
+                bm25=self.bm25,
+                fetch_nodes=self.get_nodes,
+                similarity_top_k=similarity_top_k,
+                rrf_k=BM25_RRF_K,
+                short_circuit_coverage=BM25_SHORT_CIRCUIT_COVERAGE,
+                short_circuit_margin=BM25_SHORT_CIRCUIT_MARGIN,
+                filters={"title": title} if title is not None else None,
+            )
+            return TracedQueryEngine.from_args(retriever, response_mode=response_mode)
+        else:
+            raise ValueError(f"Unsupported retrieval mode: {RETRIEVAL_MODE}")
     
-    def get_query_engine_tool(self):
-        """Create a QueryEngineTool from the knowledge base."""
+    def get_query_engine_tool(self, mode: Optional[str] = None) -> AsyncBaseTool:
+        """Create the ai_knowledge_base tool.
+
+        mode (default KB_TOOL_MODE) is "retrieve" for the top chunks trimmed to
+        KB_CONTEXT_TOKEN_BUDGET, or "synthesize" for a QueryEngineTool whose engine
+        writes an answer from them with its own LLM call.
+        """
+        mode = mode or KB_TOOL_MODE
         query_engine = self.get_query_engine()
+        if mode == "retrieve":
+            return KnowledgeBaseRetrieverTool(query_engine)
+        elif mode != "synthesize":
+            raise ValueError(f"Unsupported knowledge base tool mode: {mode}")
         
         query_engine_tool = QueryEngineTool(
             query_engine=query_engine,
             metadata=ToolMetadata(
-                name="ai_knowledge_base",
-                description="Provides information about AI concepts and technologies. Use this when you need information about AI frameworks, techniques, or terminology."
+                name=KB_TOOL_NAME,
+                description=kb_tool_description(mode)
             )
         )
         
-        return query_engine_tool
\ No newline at end of file
+        return query_engine_tool
+
+class LazyKnowledgeBaseTool(AsyncBaseTool):
+    """ai_knowledge_base tool that loads the knowledge base on its first call.
+
+    Sessions that never consult the knowledge base skip loading the embedding
+    model and the index entirely.
+    """
+
+    def __init__(self, loader: Callable[[], KnowledgeBase]):
+        """loader returns an initialized KnowledgeBase."""
+        self._loader = loader
+        self._tool: Optional[AsyncBaseTool] = None
+        self._lock = threading.Lock()
+        # Same description as the tool it stands in for, so the agent's prompt doesn't depend on KB_LAZY_LOAD
+        self._metadata = ToolMetadata(name=KB_TOOL_NAME, description=kb_tool_description())
+
+    @property
+    def metadata(self) -> ToolMetadata:
+        return self._metadata
+
+    def _get_tool(self) -> AsyncBaseTool:
+        if self._tool is None:
+            with self._lock:
+                if self._tool is None:
+                    logger.info("Loading knowledge base on first use")
+                    self._tool = self._loader().get_query_engine_tool()
+        return self._tool
+
+    def call(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        return self._get_tool().call(*args, **kwargs)
+
+    async def acall(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        return await self._get_tool().acall(*args, **kwargs)
\ No newline at end of file
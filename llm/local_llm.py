@@ -1,47 +1,257 @@
 import logging
 import requests
-from typing import Dict, List, Optional, Any
+import httpx
+from typing import Dict, Iterator, List, Optional, Any, Sequence
 
 from llama_index.llms.openai import OpenAI
+from llama_index.llms.openai.utils import to_openai_message_dicts
 from llama_index.llms.openai_like import OpenAILike
-from llama_index.core.llms import LLM
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.llms import (
+    LLM,
+    ChatMessage,
+    ChatResponse,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseGen,
+    MessageRole,
+)
+from openai.types.chat import ChatCompletionMessageToolCall
+
+from llm.streaming import StreamStats, chunk_delta, iter_sse_chunks
+from llm.router import LLMRouter, get_llm_router
+from llm.transport import get_transport, get_async_transport
+from cache.completion_cache import CompletionCache, get_completion_cache
+from cache.single_flight import SingleFlight, get_single_flight
+from utils.deadline import DeadlineExceeded, bounded_timeout, current_deadline, remaining_time
+from utils.tracing import span, start_span
 
 logger = logging.getLogger(__name__)
 
+def usage_attributes(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Token counts from the `usage` block of a chat-completions response, for tracing."""
+    usage = response.get("usage") or {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+    }
+
+def plain_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Message dict with assistant tool calls as plain JSON (they are kept as openai objects)."""
+    if not message.get("tool_calls"):
+        return message
+    tool_calls = [call.model_dump() if hasattr(call, "model_dump") else call for call in message["tool_calls"]]
+    return {**message, "tool_calls": tool_calls}
+
+def _past_deadline() -> bool:
+    active = current_deadline()
+    return active is not None and active.expired
+
+def _cut_short(response: Dict[str, Any]) -> bool:
+    """Whether generation stopped at max_tokens."""
+    choices = response.get("choices") or [{}]
+    return choices[0].get("finish_reason") == "length"
+
+class AttrDict(dict):
+    """Dictionary that also exposes its keys as attributes."""
+    def __init__(self, *args, **kwargs):
+        super(AttrDict, self).__init__(*args, **kwargs)
+        self.__dict__ = self
+
 class CustomOpenAILike(OpenAILike):
     """Custom OpenAILike class to align with the required payload format."""
-    
+
+    _completion_cache: Optional[CompletionCache] = PrivateAttr(default=None)
+    _deadline_tokens_per_second: Optional[float] = PrivateAttr(default=None)
+    _deadline_min_tokens: int = PrivateAttr(default=0)
+    _router: Optional[LLMRouter] = PrivateAttr(default=None)
+    _single_flight: Optional[SingleFlight] = PrivateAttr(default=None)
+
+    def set_completion_cache(self, cache: Optional[CompletionCache]):
+        """Memoize deterministic (temperature 0) completions in the given cache."""
+        self._completion_cache = cache
+
+    def set_single_flight(self, single_flight: Optional[SingleFlight]):
+        """Share one server call between identical requests made at the same time."""
+        self._single_flight = single_flight
+
+    def _flight_key(self, sent: Dict[str, Any]) -> str:
+        # Keyed on the payload actually sent, so a call capped by a tighter deadline is not shared
+        return f"{self.api_base} {CompletionCache.key(sent)}"
+
+    def set_router(self, router: Optional[LLMRouter]):
+        """Spread requests over the router's backends instead of sending them all to api_base."""
+        self._router = router
+
+    def _request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # POSTs to api_base, or to the backend the router picks (with failover).
+        if self._router is None:
+            return self._post(self.api_base, payload)
+        return self._router.call(lambda url: self._post(url, payload))
+
+    async def _arequest(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Async twin of _request.
+        if self._router is None:
+            return await self._apost(self.api_base, payload)
+        return await self._router.acall(lambda url: self._apost(url, payload))
+
+    def set_deadline_policy(self, tokens_per_second: Optional[float], min_tokens: int = 0):
+        """Cap max_tokens under a query deadline, assuming the server generates tokens_per_second."""
+        self._deadline_tokens_per_second = tokens_per_second
+        self._deadline_min_tokens = min_tokens
+
+    def _deadline_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """The payload to send within the current deadline: max_tokens capped to what the time left affords.
+
+        Raises DeadlineExceeded instead of starting a generation too short to be useful.
+        """
+        remaining = remaining_time()
+        if remaining is None:
+            return payload
+        if remaining <= 0:
+            raise DeadlineExceeded("No time left before the query deadline for an LLM call")
+        if not self._deadline_tokens_per_second:
+            return payload
+        affordable = int(remaining * self._deadline_tokens_per_second)
+        if affordable < self._deadline_min_tokens:
+            raise DeadlineExceeded(f"Only {remaining:.1f}s left before the query deadline, too little for an LLM call")
+        max_tokens = payload.get("max_tokens")
+        if max_tokens is not None and max_tokens <= affordable:
+            return payload
+        return {**payload, "max_tokens": affordable}
+
+    def _send(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Returns the raw server response, served from the completion cache when possible.
+        with span("llm.chat", kind="llm", model=self.model) as llm_span:
+            cache = self._completion_cache
+            if cache is not None:
+                cached = cache.get(payload)
+                if cached is not None:
+                    logger.debug("Completion cache hit")
+                    llm_span.set(cached=True)
+                    return cached
+            sent = self._deadline_payload(payload)
+            if self._single_flight is None:
+                response = self._request(sent)
+            else:
+                # An identical request already in flight (from another query) is shared
+                response, coalesced = self._single_flight.do(self._flight_key(sent), lambda: self._request(sent))
+                if coalesced:
+                    llm_span.set(coalesced=True)
+                    return response
+            llm_span.set(**usage_attributes(response))
+            if sent is not payload:
+                llm_span.set(deadline_max_tokens=sent["max_tokens"])
+            # A completion cut short by the deadline's max_tokens is not cached
+            if cache is not None and (sent is payload or not _cut_short(response)):
+                cache.put(payload, response)
+            return response
+
+    async def _asend(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Async twin of _send.
+        with span("llm.chat", kind="llm", model=self.model) as llm_span:
+            cache = self._completion_cache
+            if cache is not None:
+                cached = cache.get(payload)
+                if cached is not None:
+                    logger.debug("Completion cache hit")
+                    llm_span.set(cached=True)
+                    return cached
+            sent = self._deadline_payload(payload)
+            if self._single_flight is None:
+                response = await self._arequest(sent)
+            else:
+                # An identical request already in flight (from another query) is shared
+                response, coalesced = await self._single_flight.ado(self._flight_key(sent), lambda: self._arequest(sent))
+                if coalesced:
+                    llm_span.set(coalesced=True)
+                    return response
+            llm_span.set(**usage_attributes(response))
+            if sent is not payload:
+                llm_span.set(deadline_max_tokens=sent["max_tokens"])
+            # A completion cut short by the deadline's max_tokens is not cached
+            if cache is not None and (sent is payload or not _cut_short(response)):
+                cache.put(payload, response)
+            return response
+
     def _post(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-        # Sends a POST request to the specified URL with the given payload.
+        # Sends a POST request to the specified URL through the pooled, keep-alive transport.
         try:
-            response = requests.post(url, json=payload)
+            transport = get_transport(url)
+            response = transport.post(url, payload, timeout=bounded_timeout(transport.timeout))
             response.raise_for_status()                    # Handle HTTP errors
             logger.debug(f"Raw response: {response.text}") # Log the raw response for debugging purposes
             return response.json()                         # Return the JSON response from the server
         except requests.exceptions.RequestException as e:
+            # The read timeout is cut to the deadline; urllib3 may report it as a connection error
+            if _past_deadline():
+                raise DeadlineExceeded("LLM call ran past the query deadline") from e
             logger.error(f"HTTP request failed: {e}")      # Log the error
             raise
 
-    def _complete(self, prompt: str, **kwargs: Any) -> Dict[str, Any]:
-        """Override the _complete method to send the correct 'messages' payload."""
-        # Constructs the payload to match the expected format for local LLMs
+    async def _apost(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Async twin of _post, sharing one pooled httpx client per backend and event loop.
+        try:
+            transport = get_async_transport(url)
+            response = await transport.post(url, payload, timeout=bounded_timeout(transport.timeout))
+            response.raise_for_status()
+            logger.debug(f"Raw response: {response.text}")
+            return response.json()
+        except httpx.HTTPError as e:
+            if _past_deadline():
+                raise DeadlineExceeded("LLM call ran past the query deadline") from e
+            logger.error(f"HTTP request failed: {e}")
+            raise
+
+    def _stream_deltas(self, payload: Dict[str, Any]) -> Iterator[str]:
+        # Streams the completion as server-sent events and yields text deltas as they arrive.
+        payload = {**self._deadline_payload(payload), "stream": True}
+        stats = StreamStats(label=f"LLM stream ({self.model})")
+        llm_span = start_span("llm.stream", kind="llm", model=self.model)
+
+        def open_lines(url: str) -> Iterator[str]:
+            transport = get_transport(url)
+            return transport.stream_lines(url, payload, timeout=bounded_timeout(transport.timeout))
+
+        try:
+            lines = open_lines(self.api_base) if self._router is None else self._router.stream(open_lines)
+            for chunk in iter_sse_chunks(lines):
+                delta = chunk_delta(chunk)
+                stats.record(delta)
+                if delta:
+                    yield delta
+        except requests.exceptions.RequestException as e:
+            logger.error(f"HTTP stream failed: {e}")
+            raise
+        finally:
+            measured = stats.finish()
+            ttft = measured["ttft_ms"]
+            llm_span.set(completion_tokens=measured["tokens"], ttft_ms=None if ttft is None else round(ttft, 1))
+            llm_span.finish()
+
+    def _build_payload(self, messages: List[Dict[str, Any]], **kwargs: Any) -> Dict[str, Any]:
+        """Construct the chat-completions payload expected by local LLM servers."""
         payload = {
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": [plain_message(message) for message in messages],
             "model": self.model,
+            **self.additional_kwargs,  # Defaults from config, e.g. a fixed temperature
         }
         if "temperature" in kwargs:
             payload["temperature"] = kwargs["temperature"]
         if "max_tokens" in kwargs:
             payload["max_tokens"] = kwargs["max_tokens"]
+        # Tool definitions are only sent by function calling agents
+        if kwargs.get("tools"):
+            payload["tools"] = kwargs["tools"]
+            if "tool_choice" in kwargs:
+                payload["tool_choice"] = kwargs["tool_choice"]
+        return payload
 
-        logger.debug(f"Sending payload: {payload}")         # Log the payload for debugging
-        response = self._post(self.api_base, payload)       # Call the POST method to send the request to the LLM server
-        logger.debug(f"Received response: {response}")
-
-        # Parses the response from the server to extract the completion text and other metadata.
+    def _parse_completion(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse the response from the server into a completion-style result."""
         try:
             completion_text = response["choices"][0]["message"]["content"]
-            
+
             # Create a response dictionary
             response_dict = {
                 "id": response.get("id", ""),
@@ -51,34 +261,119 @@ class CustomOpenAILike(OpenAILike):
                 "choices": [{"text": completion_text}],
                 "usage": response.get("usage", {}),
             }
-            
-            # Convert to a class with attributes
-            class AttrDict(dict):
-                def __init__(self, *args, **kwargs):
-                    super(AttrDict, self).__init__(*args, **kwargs)
-                    self.__dict__ = self
-                    
+
             # Create an object that has both dictionary access and attribute access
             result = AttrDict(response_dict)
-            
+
             # Add the required attributes explicitly
             result.text = completion_text
             result.additional_kwargs = {}  # Add empty additional_kwargs
-            
+
             # Add other common attributes the OpenAI class might expect
             result.raw = response  # Store the original response
             result.delta = None    # Often used in streaming responses
-            
+
             return result
-            
+
         except (KeyError, IndexError) as e:
             logger.error(f"Invalid response format: {response}")
             raise ValueError("Invalid response format from local LLM server") from e
 
+    def _parse_chat(self, response: Dict[str, Any]) -> ChatResponse:
+        """Parse the response from the server into a ChatResponse, keeping any tool calls."""
+        try:
+            message = response["choices"][0]["message"]
+        except (KeyError, IndexError) as e:
+            logger.error(f"Invalid response format: {response}")
+            raise ValueError("Invalid response format from local LLM server") from e
+
+        additional_kwargs = {}
+        if message.get("tool_calls"):
+            additional_kwargs["tool_calls"] = [
+                ChatCompletionMessageToolCall(**tool_call) for tool_call in message["tool_calls"]
+            ]
+        return ChatResponse(
+            message=ChatMessage(
+                role=message.get("role", "assistant"),
+                content=message.get("content") or "",
+                additional_kwargs=additional_kwargs,
+            ),
+            raw=response,
+        )
+
+    def _complete(self, prompt: str, **kwargs: Any) -> Dict[str, Any]:
+        """Override the _complete method to send the correct 'messages' payload."""
+        payload = self._build_payload([{"role": "user", "content": prompt}], **kwargs)
+
+        logger.debug(f"Sending payload: {payload}")         # Log the payload for debugging
+        response = self._send(payload)                      # Send the request to the LLM server (or the completion cache)
+        logger.debug(f"Received response: {response}")
+
+        return self._parse_completion(response)
+
+    async def _acomplete(self, prompt: str, **kwargs: Any) -> Dict[str, Any]:
+        """Async version of _complete using the pooled async transport."""
+        payload = self._build_payload([{"role": "user", "content": prompt}], **kwargs)
+
+        logger.debug(f"Sending payload: {payload}")
+        response = await self._asend(payload)
+        logger.debug(f"Received response: {response}")
+
+        return self._parse_completion(response)
+
+    def _stream_complete(self, prompt: str, **kwargs: Any) -> CompletionResponseGen:
+        """Stream the completion token by token using 'stream: true'."""
+        payload = self._build_payload([{"role": "user", "content": prompt}], **kwargs)
+        logger.debug(f"Sending streaming payload: {payload}")
+
+        def gen() -> CompletionResponseGen:
+            text = ""
+            for delta in self._stream_deltas(payload):
+                text += delta
+                yield CompletionResponse(text=text, delta=delta)
+
+        return gen()
+
+    def _chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        """Send the chat history as structured messages (used when is_chat_model is set)."""
+        payload = self._build_payload(to_openai_message_dicts(messages), **kwargs)
+
+        logger.debug(f"Sending payload: {payload}")
+        response = self._send(payload)
+        logger.debug(f"Received response: {response}")
+
+        return self._parse_chat(response)
+
+    async def _achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        """Async version of _chat using the pooled async transport."""
+        payload = self._build_payload(to_openai_message_dicts(messages), **kwargs)
+
+        logger.debug(f"Sending payload: {payload}")
+        response = await self._asend(payload)
+        logger.debug(f"Received response: {response}")
+
+        return self._parse_chat(response)
+
+    def _stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        """Stream a chat response token by token using 'stream: true'."""
+        payload = self._build_payload(to_openai_message_dicts(messages), **kwargs)
+        logger.debug(f"Sending streaming payload: {payload}")
+
+        def gen() -> ChatResponseGen:
+            content = ""
+            for delta in self._stream_deltas(payload):
+                content += delta
+                yield ChatResponse(
+                    message=ChatMessage(role=MessageRole.ASSISTANT, content=content),
+                    delta=delta,
+                )
+
+        return gen()
+
 def get_llm(config: Dict[str, Any]) -> LLM:
     """Factory function to get the appropriate LLM based on config."""
     llm_type = config.get("LLM_TYPE", "lm_studio_local")
-    
+
     if llm_type == "openai":
         logger.info("Using OpenAI LLM")
         return OpenAI(
@@ -87,9 +382,19 @@ def get_llm(config: Dict[str, Any]) -> LLM:
         )
     else:
         logger.info("Using Local LLM via LM Studio")
-        return CustomOpenAILike(
+        additional_kwargs = {}
+        if config.get("LOCAL_LLM_TEMPERATURE") is not None:
+            additional_kwargs["temperature"] = config["LOCAL_LLM_TEMPERATURE"]
+        llm = CustomOpenAILike(
             model=config.get("LOCAL_LLM_MODEL", "local-model"),                # Just a placeholder for local model
             api_base=config.get("LOCAL_LLM_URL", "http://localhost:1234/v1"),  # The URL for the local LLM server, 1234 is a common default
-            api_key="fake"                                                     # Set to a dummy value for local LLMs
+            api_key="fake",                                                    # Set to a dummy value for local LLMs
+            is_chat_model=config.get("LOCAL_LLM_IS_CHAT_MODEL", False),
+            is_function_calling_model=config.get("LOCAL_LLM_IS_FUNCTION_CALLING_MODEL", False),
+            additional_kwargs=additional_kwargs,
         )
-
+        llm.set_completion_cache(get_completion_cache(config))
+        llm.set_deadline_policy(config.get("LLM_DEADLINE_TOKENS_PER_SECOND"), config.get("LLM_DEADLINE_MIN_TOKENS", 0))
+        llm.set_router(get_llm_router(config))  # None unless LOCAL_LLM_URLS lists several servers
+        llm.set_single_flight(get_single_flight("llm", config))
+        return llm
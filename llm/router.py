@@ -0,0 +1,370 @@
+"""
+LLM Router: Spreads chat-completions requests over several OpenAI-compatible servers.
+
+Flow:
+1. BACKENDS: One Backend per URL in LOCAL_LLM_URLS (LM Studio, llama.cpp, vLLM, ...); each
+   keeps its own pooled transport, so connection reuse is unchanged
+2. BALANCING: Requests go to the backend with the fewest outstanding requests
+   ("least_outstanding") or the lowest latency moving average ("ewma", weighted by its queue)
+3. FAILOVER: A connection error, timeout or 5xx response moves the request to the next
+   backend; after max_failures consecutive failures a backend is evicted for eviction_seconds
+4. HEALTH CHECKS: A background thread polls GET /models on evicted backends and takes them
+   back as soon as they answer (without it they are retried once eviction_seconds pass)
+5. HEDGING: With hedge_after set, a request still unanswered after that many seconds is sent
+   to a second backend as well and the first answer wins (trades load for tail latency)
+6. METRICS: stats() reports requests, failovers, hedges and per-backend load and latency
+
+CustomOpenAILike sends through the router when get_llm() finds several URLs, so
+ReActAgentManager and FunctionCallingAgentManager use every backend without changes.
+Client errors (4xx) and query deadlines are passed to the caller without failover.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+import importlib
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+import httpx
+import requests
+
+from llm.transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+STRATEGIES = ("least_outstanding", "ewma")
+
+def _is_backend_failure(error: BaseException) -> bool:
+    """Whether an error says the backend is unavailable (as opposed to a bad request)."""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is None or error.response.status_code >= 500
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (requests.exceptions.RequestException, httpx.HTTPError))
+
+def models_url(url: str) -> str:
+    """The /models endpoint of the server behind a chat-completions URL."""
+    base = url.rstrip("/")
+    for suffix in ("/chat/completions", "/completions"):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    return f"{base}/models"
+
+class Backend:
+    """Load, latency and health of one LLM server."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.latency_ewma: Optional[float] = None
+        self.consecutive_failures = 0
+        self.evicted_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.evicted_until
+
+class LLMRouter:
+    """Load balancer with failover, health checks and optional hedging over LLM backends."""
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        strategy: str = "least_outstanding",
+        max_failures: int = 3,
+        eviction_seconds: float = 30.0,
+        health_check_interval: Optional[float] = 10.0,
+        hedge_after: Optional[float] = None,
+        ewma_alpha: float = 0.3,
+        max_concurrency: int = 8,
+    ):
+        """Initialize the backends; health checks start with start_health_checks()."""
+        if not urls:
+            raise ValueError("LLMRouter needs at least one backend URL")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown LLM routing strategy: {strategy} (expected one of {', '.join(STRATEGIES)})")
+        self.backends = [Backend(url) for url in urls]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.eviction_seconds = eviction_seconds
+        self.health_check_interval = health_check_interval
+        self.hedge_after = hedge_after
+        self.ewma_alpha = ewma_alpha
+        self._lock = threading.Lock()
+        self._metrics = {"requests": 0, "failovers": 0, "hedged": 0, "hedge_wins": 0, "evictions": 0}
+        # With hedging, sync requests run on pool threads so the caller can take whichever answers
+        # first; sized for every backend's in-flight limit (max_concurrency) plus the hedges
+        self._hedge_pool = None if hedge_after is None else ThreadPoolExecutor(
+            max_workers=2 * max_concurrency * len(self.backends), thread_name_prefix="llm-hedge"
+        )
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    def _score(self, backend: Backend) -> float:
+        if self.strategy == "ewma":
+            # Expected wait: the latency average times the requests ahead, plus this one.
+            # Unmeasured backends score 0 so each gets tried
+            return (backend.latency_ewma or 0.0) * (backend.outstanding + 1)
+        return backend.outstanding
+
+    def _acquire(self, exclude: Sequence[Backend] = ()) -> Optional[Backend]:
+        """Pick a backend and count the request as outstanding on it."""
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude and b.available]
+            if not candidates:
+                # Everything is evicted: better to try the one whose eviction ends first than to fail
+                candidates = sorted((b for b in self.backends if b not in exclude), key=lambda b: b.evicted_until)[:1]
+            if not candidates:
+                return None
+            backend = min(candidates, key=self._score)
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def _release(self, backend: Backend, started: float, error: Optional[BaseException] = None):
+        """Record the outcome of a request sent to backend."""
+        with self._lock:
+            backend.outstanding -= 1
+            if error is None:
+                elapsed = time.monotonic() - started
+                backend.latency_ewma = elapsed if backend.latency_ewma is None else (
+                    self.ewma_alpha * elapsed + (1 - self.ewma_alpha) * backend.latency_ewma
+                )
+                backend.consecutive_failures = 0
+                return
+            if not _is_backend_failure(error):
+                return
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if backend.consecutive_failures >= self.max_failures and backend.available:
+                backend.evicted_until = time.monotonic() + self.eviction_seconds
+                self._metrics["evictions"] += 1
+                logger.warning(f"Evicting LLM backend {backend.url} for {self.eviction_seconds:g}s after "
+                               f"{backend.consecutive_failures} failures: {error}")
+
+    def _count(self, key: str):
+        with self._lock:
+            self._metrics[key] += 1
+
+    def _send_to(self, backend: Backend, send: Callable[[str], T]) -> T:
+        started = time.monotonic()
+        try:
+            result = send(backend.url)
+        except BaseException as e:
+            self._release(backend, started, e)
+            raise
+        self._release(backend, started)
+        return result
+
+    def _attempt(self, send: Callable[[str], T], tried: List[Backend]) -> T:
+        """Send once, hedged to a second backend if hedge_after passes without an answer."""
+        backend = self._acquire(tried)
+        tried.append(backend)
+        if self.hedge_after is None or len(self.backends) < 2:
+            return self._send_to(backend, send)
+
+        context = contextvars.copy_context()
+        primary = self._hedge_pool.submit(context.run, self._send_to, backend, send)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+        hedge_backend = self._acquire(tried)
+        if hedge_backend is None:
+            return primary.result()
+        tried.append(hedge_backend)
+        self._count("hedged")
+        logger.debug(f"Hedging slow request on {backend.url} to {hedge_backend.url}")
+        hedge = self._hedge_pool.submit(contextvars.copy_context().run, self._send_to, hedge_backend, send)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    return future.result()
+        # Both failed: report the primary's error
+        return primary.result()
+
+    def call(self, send: Callable[[str], T]) -> T:
+        """Run send(url) on a chosen backend, failing over to the others on backend errors."""
+        self._count("requests")
+        tried: List[Backend] = []
+        while True:
+            try:
+                return self._attempt(send, tried)
+            except Exception as e:
+                if not _is_backend_failure(e) or len(tried) >= len(self.backends):
+                    raise
+                self._count("failovers")
+                logger.warning(f"LLM backend {tried[-1].url} failed ({e}), failing over")
+
+    async def _asend_to(self, backend: Backend, send: Callable[[str], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        try:
+            result = await send(backend.url)
+        except BaseException as e:
+            self._release(backend, started, e)
+            raise
+        self._release(backend, started)
+        return result
+
+    async def _aattempt(self, send: Callable[[str], Awaitable[T]], tried: List[Backend]) -> T:
+        """Async twin of _attempt; the losing request of a hedge is cancelled."""
+        backend = self._acquire(tried)
+        tried.append(backend)
+        if self.hedge_after is None or len(self.backends) < 2:
+            return await self._asend_to(backend, send)
+        primary = asyncio.ensure_future(self._asend_to(backend, send))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        hedge_backend = None if done else self._acquire(tried)
+        if hedge_backend is None:
+            return await primary
+        tried.append(hedge_backend)
+        self._count("hedged")
+        hedge = asyncio.ensure_future(self._asend_to(hedge_backend, send))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count("hedge_wins")
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def acall(self, send: Callable[[str], Awaitable[T]]) -> T:
+        """Async twin of call()."""
+        self._count("requests")
+        tried: List[Backend] = []
+        while True:
+            try:
+                return await self._aattempt(send, tried)
+            except Exception as e:
+                if not _is_backend_failure(e) or len(tried) >= len(self.backends):
+                    raise
+                self._count("failovers")
+                logger.warning(f"LLM backend {tried[-1].url} failed ({e}), failing over")
+
+    def stream(self, open_stream: Callable[[str], Iterator[T]]) -> Iterator[T]:
+        """Yield from open_stream(url) on a chosen backend.
+
+        Fails over only until the first item arrives; after that the stream is committed.
+        Streams are not hedged.
+        """
+        self._count("requests")
+        tried: List[Backend] = []
+        while True:
+            backend = self._acquire(tried)
+            tried.append(backend)
+            started = time.monotonic()
+            received = False
+            try:
+                for item in open_stream(backend.url):
+                    received = True
+                    yield item
+            except Exception as e:
+                self._release(backend, started, e)
+                if received or not _is_backend_failure(e) or len(tried) >= len(self.backends):
+                    raise
+                self._count("failovers")
+                logger.warning(f"LLM backend {backend.url} failed ({e}), failing over")
+                continue
+            except BaseException as e:
+                # GeneratorExit when the consumer stops early
+                self._release(backend, started, e)
+                raise
+            self._release(backend, started)
+            return
+
+    def check_health(self, timeout: float = 2.0) -> Dict[str, bool]:
+        """Probe the evicted backends and take back the ones that answer; returns url -> healthy."""
+        health = {}
+        for backend in self.backends:
+            if backend.available:
+                health[backend.url] = True
+                continue
+            url = models_url(backend.url)
+            try:
+                response = get_transport(url).request("GET", url, timeout=(timeout, timeout))
+                healthy = response.status_code < 500
+            except requests.exceptions.RequestException:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    backend.evicted_until = 0.0
+                    backend.consecutive_failures = 0
+                logger.info(f"LLM backend {backend.url} is healthy again")
+            health[backend.url] = healthy
+        return health
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_check_interval):
+            try:
+                self.check_health()
+            except Exception as e:
+                logger.error(f"LLM health check failed: {e}")
+
+    def start_health_checks(self):
+        """Poll evicted backends every health_check_interval seconds on a daemon thread."""
+        if not self.health_check_interval or self._health_thread is not None:
+            return
+        self._health_thread = threading.Thread(target=self._health_loop, name="llm-health", daemon=True)
+        self._health_thread.start()
+
+    def close(self):
+        """Stop the health checks and the hedging threads."""
+        self._stop.set()
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Routing counters plus outstanding requests, latency and availability per backend."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._metrics)
+            stats["backends"] = len(self.backends)
+            stats["backends_available"] = sum(1 for b in self.backends if b.available)
+            for index, backend in enumerate(self.backends):
+                stats[f"backend{index}_requests"] = backend.requests
+                stats[f"backend{index}_failures"] = backend.failures
+                stats[f"backend{index}_outstanding"] = backend.outstanding
+                stats[f"backend{index}_latency_ewma_s"] = round(backend.latency_ewma or 0.0, 6)
+                stats[f"backend{index}_available"] = int(backend.available)
+        return stats
+
+_router: Optional[LLMRouter] = None
+_router_lock = threading.Lock()
+
+def get_llm_router(config: Optional[Dict[str, Any]] = None) -> Optional[LLMRouter]:
+    """Return the process-wide router when config lists several LOCAL_LLM_URLS, else None."""
+    global _router
+    config = config or vars(importlib.import_module("config"))
+    urls = config.get("LOCAL_LLM_URLS") or []
+    if len(urls) < 2:
+        return None
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LLMRouter(
+                    urls,
+                    strategy=config.get("LLM_ROUTING_STRATEGY", "least_outstanding"),
+                    max_failures=config.get("LLM_BACKEND_MAX_FAILURES", 3),
+                    eviction_seconds=config.get("LLM_BACKEND_EVICTION_SECONDS", 30.0),
+                    health_check_interval=config.get("LLM_HEALTH_CHECK_INTERVAL", 10.0),
+                    hedge_after=config.get("LLM_HEDGE_AFTER_SECONDS"),
+                    max_concurrency=config.get("LLM_MAX_CONCURRENCY", 8),
+                )
+                _router.start_health_checks()
+                logger.info(f"Routing LLM requests over {len(urls)} backends ({_router.strategy})")
+    return _router
@@ -0,0 +1,86 @@
+"""
+Streaming Helpers for OpenAI-compatible LLM Servers
+
+This module holds the pieces shared by every streaming code path:
+
+1. SSE PARSING: Turns the 'data: {...}' lines of a chat-completions stream into text deltas
+2. STREAM STATS: Measures time-to-first-token and tokens/sec for a single stream
+
+Each SSE chunk from LM Studio / llama.cpp carries roughly one token, so the number
+of non-empty deltas is used as the token count.
+"""
+
+import json
+import time
+import logging
+from typing import Iterable, Iterator, Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+SSE_DONE = "[DONE]"
+
+def iter_sse_chunks(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield the decoded JSON chunks of a server-sent event stream."""
+    done = False
+    for line in lines:
+        # Keep reading past [DONE] so the body is fully consumed and the
+        # keep-alive connection can go back to the pool
+        if done or not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == SSE_DONE:
+            done = True
+            continue
+        try:
+            yield json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping malformed stream chunk: {data}")
+
+def chunk_delta(chunk: Dict[str, Any]) -> str:
+    """Extract the text delta from a chat-completions stream chunk."""
+    choices = chunk.get("choices") or [{}]
+    delta = choices[0].get("delta") or {}
+    return delta.get("content") or ""
+
+class StreamStats:
+    """Time-to-first-token and throughput measurement for one stream."""
+
+    def __init__(self, label: str = "stream"):
+        self.label = label
+        self.start = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.end: Optional[float] = None
+        self.tokens = 0
+
+    def record(self, delta: str):
+        """Record the arrival of a delta."""
+        if not delta:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.tokens += 1
+
+    def finish(self) -> Dict[str, Any]:
+        """Stop the clock, log the measurements and return them."""
+        self.end = time.perf_counter()
+        stats = self.as_dict()
+        ttft = stats["ttft_ms"]
+        logger.info(
+            f"{self.label}: ttft={'n/a' if ttft is None else f'{ttft:.0f}ms'}, "
+            f"tokens={self.tokens}, tokens/sec={stats['tokens_per_sec']:.1f}, "
+            f"total={stats['total_ms']:.0f}ms"
+        )
+        return stats
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the measurements collected so far."""
+        end = self.end or time.perf_counter()
+        ttft = None if self.first_token_at is None else (self.first_token_at - self.start) * 1000
+        generation_time = end - (self.first_token_at or end)
+        tokens_per_sec = (self.tokens - 1) / generation_time if self.tokens > 1 and generation_time > 0 else 0.0
+        return {
+            "ttft_ms": ttft,
+            "tokens": self.tokens,
+            "tokens_per_sec": tokens_per_sec,
+            "total_ms": (end - self.start) * 1000,
+        }
@@ -0,0 +1,302 @@
+"""
+HTTP Transport for OpenAI-compatible LLM Servers
+
+This module provides the shared HTTP layer used by CustomOpenAILike:
+
+1. CONNECTION POOLING: One keep-alive client per backend, reused across ReAct steps
+2. TIMEOUTS: Separate connect and read timeouts so a stalled server cannot hang an agent
+3. RETRIES: Bounded retries with exponential backoff on connection errors, 429 and 5xx responses
+4. CONCURRENCY LIMITS: A per-backend semaphore caps the number of in-flight requests
+5. CONFIGURATION: Pool sizes, timeouts, retries and limits are read from config.py
+6. ASYNC: An httpx.AsyncClient twin of the transport for asyncio callers
+7. STREAMING: Line-by-line streaming of server-sent events for token streaming
+
+Transports are created once per backend (scheme + host + port) and shared by every
+LLM instance pointing at that backend, so a query that runs 10 ReAct iterations
+pays the TCP connection setup once instead of 10 times. Async transports are
+additionally scoped to the event loop they were created on.
+"""
+
+import asyncio
+import logging
+import weakref
+import threading
+import importlib
+from typing import Dict, Any, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+class HTTPTransport:
+    """Pooled, keep-alive HTTP client for a single LLM backend."""
+
+    def __init__(
+        self,
+        backend: str,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 120.0,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        max_concurrency: int = 8,
+    ):
+        """Initialize the session, retry policy and concurrency limit."""
+        self.backend = backend
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.max_concurrency = max_concurrency
+
+        # Retry connection failures and throttling/server errors, but never a read
+        # that timed out mid-generation (the server may still be working on it)
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            backoff_factor=retry_backoff,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+            pool_block=True,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._requests = 0
+        self._errors = 0
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        payload: Optional[Dict[str, Any]] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+    ) -> requests.Response:
+        """Send a request through the pooled session, respecting the concurrency limit."""
+        with self._semaphore:
+            with self._lock:
+                self._in_flight += 1
+                self._requests += 1
+            try:
+                return self.session.request(
+                    method, url, json=payload, timeout=timeout or self.timeout
+                )
+            except requests.exceptions.RequestException:
+                with self._lock:
+                    self._errors += 1
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def post(self, url: str, payload: Dict[str, Any], **kwargs: Any) -> requests.Response:
+        """Send a JSON POST request to the backend."""
+        return self.request("POST", url, payload, **kwargs)
+
+    def stream_lines(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        timeout: Optional[Tuple[float, float]] = None,
+    ) -> Iterator[str]:
+        """POST a request and yield the response body line by line as it arrives.
+
+        The concurrency slot is held until the stream is exhausted or closed.
+        """
+        with self._semaphore:
+            with self._lock:
+                self._in_flight += 1
+                self._requests += 1
+            try:
+                with self.session.post(
+                    url, json=payload, timeout=timeout or self.timeout, stream=True
+                ) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines(decode_unicode=True):
+                        yield line
+            except requests.exceptions.RequestException:
+                with self._lock:
+                    self._errors += 1
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counters for this backend."""
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "requests": self._requests,
+                "errors": self._errors,
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+            }
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+class AsyncHTTPTransport:
+    """Pooled, keep-alive async HTTP client for a single LLM backend."""
+
+    def __init__(
+        self,
+        backend: str,
+        pool_maxsize: int = 16,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 120.0,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        max_concurrency: int = 8,
+    ):
+        """Initialize the async client, retry policy and concurrency limit."""
+        self.backend = backend
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_concurrency = max_concurrency
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_maxsize,
+                max_keepalive_connections=pool_maxsize,
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+        self._requests = 0
+        self._errors = 0
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Backoff before the next attempt, honouring Retry-After when present."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.retry_backoff * (2 ** attempt)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        payload: Optional[Dict[str, Any]] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+    ) -> httpx.Response:
+        """Send a request through the pooled client with bounded retries."""
+        request_timeout = httpx.Timeout(timeout[1], connect=timeout[0]) if timeout else None
+        async with self._semaphore:
+            self._in_flight += 1
+            self._requests += 1
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        kwargs = {"timeout": request_timeout} if request_timeout else {}
+                        response = await self.client.request(method, url, json=payload, **kwargs)
+                    except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                        if attempt == self.max_retries:
+                            raise
+                        logger.warning(f"Connection to {self.backend} failed ({e}), retrying")
+                        await asyncio.sleep(self._retry_delay(attempt, None))
+                        continue
+                    if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                        logger.warning(f"{self.backend} returned {response.status_code}, retrying")
+                        await asyncio.sleep(self._retry_delay(attempt, response))
+                        continue
+                    return response
+            except httpx.HTTPError:
+                self._errors += 1
+                raise
+            finally:
+                self._in_flight -= 1
+
+    async def post(self, url: str, payload: Dict[str, Any], **kwargs: Any) -> httpx.Response:
+        """Send a JSON POST request to the backend."""
+        return await self.request("POST", url, payload, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counters for this backend."""
+        return {
+            "backend": self.backend,
+            "requests": self._requests,
+            "errors": self._errors,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+        }
+
+    async def aclose(self):
+        """Close all pooled connections."""
+        await self.client.aclose()
+
+_transports: Dict[str, HTTPTransport] = {}
+_transports_lock = threading.Lock()
+
+# Async clients and semaphores belong to one event loop, so they are kept per loop
+_async_transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncHTTPTransport]]" = weakref.WeakKeyDictionary()
+
+def _backend_key(url: str) -> str:
+    """Reduce a URL to the backend it points at (scheme://host:port)."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def _transport_settings(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Read the transport settings from config."""
+    config = config or vars(importlib.import_module("config"))
+    return {
+        "pool_maxsize": config.get("LLM_POOL_MAXSIZE", 16),
+        "connect_timeout": config.get("LLM_CONNECT_TIMEOUT", 5.0),
+        "read_timeout": config.get("LLM_READ_TIMEOUT", 120.0),
+        "max_retries": config.get("LLM_MAX_RETRIES", 3),
+        "retry_backoff": config.get("LLM_RETRY_BACKOFF", 0.5),
+        "max_concurrency": config.get("LLM_MAX_CONCURRENCY", 8),
+        "pool_connections": config.get("LLM_POOL_CONNECTIONS", 4),
+    }
+
+def get_transport(url: str, config: Optional[Dict[str, Any]] = None) -> HTTPTransport:
+    """Return the shared transport for the backend serving the given URL."""
+    key = _backend_key(url)
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = HTTPTransport(backend=key, **_transport_settings(config))
+            _transports[key] = transport
+            logger.info(f"Created pooled HTTP transport for {key}")
+        return transport
+
+def get_async_transport(url: str, config: Optional[Dict[str, Any]] = None) -> AsyncHTTPTransport:
+    """Return the shared async transport for the backend on the running event loop."""
+    key = _backend_key(url)
+    loop = asyncio.get_running_loop()
+    transports = _async_transports.setdefault(loop, {})
+    transport = transports.get(key)
+    if transport is None:
+        settings = _transport_settings(config)
+        settings.pop("pool_connections")
+        transport = AsyncHTTPTransport(backend=key, **settings)
+        transports[key] = transport
+        logger.info(f"Created pooled async HTTP transport for {key}")
+    return transport
+
+def close_transports():
+    """Close and forget every shared transport."""
+    with _transports_lock:
+        for transport in _transports.values():
+            transport.close()
+        _transports.clear()
@@ -1,21 +1,19 @@
 import os
 import logging
 import argparse
-import signal
-from contextlib import contextmanager
-from typing import List, Dict, Any
-
-from llama_index.core import Settings
-from llama_index.core.tools import BaseTool
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 
 import config
-from llm.local_llm import get_llm
-from knowledge_base.vector_store import KnowledgeBase
-from tools.calculator_tool import get_calculator_tool
-from tools.python_info_tool import get_python_info_tool
-from tools.weather_tool import get_weather_tool
-from agents.react_agent import ReActAgentManager
+
+# LlamaIndex, the embedding model and the agents are imported inside the functions that
+# use them, so `--help` and argument errors return immediately
+# (benchmarks/import_time.py guards this)
+if TYPE_CHECKING:
+    from llama_index.core.tools import BaseTool
+    from knowledge_base.vector_store import KnowledgeBase
+    from cache.response_cache import ResponseCache
+    from agents.router import FastPathRouter
 
 # Set up logging
 """Set up logging configuration for the script."""
@@ -28,49 +26,202 @@ logger = logging.getLogger(__name__)
 # Set up environment
 def setup_environment():
     """Set up the environment and LlamaIndex settings."""
+    from llama_index.core import Settings
+
     # Configure LlamaIndex settings
     Settings.llm = None
     logger.info("Environment setup complete.")
 
-def setup_tools() -> List[BaseTool]:
-    """Set up the tools for the agent."""
-    # Initialize knowledge base
+def setup_knowledge_base() -> Optional["KnowledgeBase"]:
+    """Initialize (load or build) the knowledge base, or None when it loads on first use."""
+    if config.KB_LAZY_LOAD:
+        return None
+    return _load_knowledge_base()
+
+def _load_knowledge_base() -> "KnowledgeBase":
+    from knowledge_base.vector_store import KnowledgeBase
+
     kb = KnowledgeBase()
     kb.initialize()
-    kb_tool = kb.get_query_engine_tool()
+    return kb
+
+def setup_tools(kb: Optional["KnowledgeBase"] = None) -> List["BaseTool"]:
+    """Set up the tools for the agent."""
+    from tools.calculator_tool import get_calculator_tool
+    from tools.python_info_tool import get_python_info_tool
+    from tools.weather_tool import get_weather_tool
+    from tools.traced_tool import TracedTool
+
+    # Initialize knowledge base
+    if kb is None and config.KB_LAZY_LOAD:
+        from knowledge_base.vector_store import LazyKnowledgeBaseTool
+        kb_tool = LazyKnowledgeBaseTool(_load_knowledge_base)
+    else:
+        kb = kb or _load_knowledge_base()
+        if config.EMBEDDING_WARMUP:
+            kb.warmup()
+        kb_tool = kb.get_query_engine_tool()
 
     # Get function tools
     calculator_tool = get_calculator_tool()
     python_tool = get_python_info_tool()
     weather_tool = get_weather_tool()
 
-    # Combine all tools into a list
-    tools = [kb_tool, calculator_tool, python_tool, weather_tool]
+    # Combine all tools into a list, each recorded as a span in query traces
+    tools = [TracedTool(tool) for tool in (kb_tool, calculator_tool, python_tool, weather_tool)]
     logger.info(f"Created {len(tools)} tools for the agent.")
     return tools
 
-@contextmanager
-def timeout(seconds):
-    def handler(signum, frame):
-        raise TimeoutError(f"Query processing timed out after {seconds} seconds")
-    
-    # Set the timeout handler
-    signal.signal(signal.SIGALRM, handler)
-    signal.alarm(seconds)
-    try:
-        yield
-    finally:
-        # Disable the alarm
-        signal.alarm(0)
-
-def run_demo(agent_type: str, query: str = None):
+def setup_response_cache(kb: Optional["KnowledgeBase"]) -> Optional["ResponseCache"]:
+    """Create the response cache shared by all agent managers, if enabled.
+
+    Semantic matching needs the knowledge base's embedding model, so it is off while
+    the knowledge base is loaded lazily.
+    """
+    if not config.RESPONSE_CACHE_ENABLED:
+        return None
+    from cache.response_cache import ResponseCache
+
+    cache = ResponseCache(
+        cache_dir=config.RESPONSE_CACHE_DIR,
+        embed_model=kb.embedding_model if kb is not None and config.RESPONSE_CACHE_SEMANTIC else None,
+        max_entries=config.RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds=config.RESPONSE_CACHE_TTL_SECONDS,
+        similarity_threshold=config.RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+        uncacheable_tools=config.RESPONSE_CACHE_UNCACHEABLE_TOOLS,
+    )
+    logger.info(f"Response cache enabled: {cache.stats()}")
+    return cache
+
+def setup_router(tools: List["BaseTool"], kb: Optional["KnowledgeBase"]) -> Optional["FastPathRouter"]:
+    """Create the fast-path router shared by all agent managers, if enabled.
+
+    Embedding intents need the knowledge base's embedding model, so only the rules
+    apply while the knowledge base is loaded lazily.
+    """
+    if not config.ROUTER_ENABLED:
+        return None
+    from agents.router import FastPathRouter
+
+    return FastPathRouter(
+        tools,
+        embed_model=kb.embedding_model if kb is not None and config.ROUTER_SEMANTIC else None,
+        min_similarity=config.ROUTER_MIN_SIMILARITY,
+        min_margin=config.ROUTER_MIN_MARGIN,
+        llm_calls_per_hit=config.ROUTER_LLM_CALLS_PER_HIT,
+    )
+
+def print_response(agent_manager, query: str, stream: bool = False):
+    """Print the agent's response, token by token when streaming."""
+    if stream and hasattr(agent_manager, "stream_query"):
+        print("\nResponse: ", end="", flush=True)
+        for token in agent_manager.stream_query(query):
+            print(token, end="", flush=True)
+        print()
+    else:
+        response = agent_manager.query(query)
+        print(f"\nResponse: {response}")
+
+def create_agent_manager(agent_type: str, tools: List["BaseTool"], response_cache: Optional["ResponseCache"] = None,
+                         router: Optional["FastPathRouter"] = None):
+    """Create an agent manager of the specified type, behind the fast-path router if given."""
+    if agent_type.lower() == "react":
+        from agents.react_agent import ReActAgentManager
+        agent_manager = ReActAgentManager(tools, response_cache)
+    elif agent_type.lower() == "function":
+        from agents.function_calling_agent import FunctionCallingAgentManager
+        agent_manager = FunctionCallingAgentManager(tools, response_cache)
+    else:
+        raise ValueError(f"Unknown agent type: {agent_type}")
+    if router is None:
+        return agent_manager
+    from agents.router import RoutedAgentManager
+    return RoutedAgentManager(agent_manager, router)
+
+def run_batch(agent_type: str, input_path: str, output_path: str = None, workers: int = None):
+    """Replay a JSONL file of queries through a pool of agents."""
+    from agents.agent_pool import AgentPool
+    from agents.batch_runner import BatchRunner
+    from cache.single_flight import get_single_flight
+    from llm.router import get_llm_router
+
+    setup_environment()
+    kb = setup_knowledge_base()
+    tools = setup_tools(kb)
+    response_cache = setup_response_cache(kb)
+    router = setup_router(tools, kb)
+
+    workers = workers or config.BATCH_WORKERS
+    input_path = Path(input_path)
+    output_path = Path(output_path) if output_path else input_path.with_name(f"{input_path.stem}_results.jsonl")
+
+    pool = AgentPool(lambda: create_agent_manager(agent_type, tools, response_cache, router), size=workers)
+    summary = BatchRunner(pool, workers).run(input_path, output_path)
+
+    latency = summary["latency_s"]
+    print(f"\nBatch complete: {summary['queries']} queries, {summary['failures']} failures")
+    print(f"Throughput: {summary['queries_per_sec']:.2f} queries/sec over {summary['elapsed_s']:.1f}s")
+    print(f"Latency: p50={latency['p50']:.2f}s p95={latency['p95']:.2f}s p99={latency['p99']:.2f}s")
+    print(f"Results written to {output_path}")
+    if response_cache is not None:
+        print(f"Response cache: {response_cache.stats()}")
+    if router is not None:
+        stats = router.stats()
+        print(f"Fast-path router: {stats['hits']}/{stats['queries']} queries ({stats['hit_rate']:.0%}), "
+              f"~{stats['saved_llm_calls']} LLM calls saved")
+    llm_router = get_llm_router()
+    if llm_router is not None:
+        stats = llm_router.stats()
+        print(f"LLM router: {stats['requests']} requests over {stats['backends']} servers, "
+              f"{stats['failovers']} failovers, {stats['hedged']} hedged")
+    for name in ("llm", "kb"):
+        single_flight = get_single_flight(name)
+        if single_flight is not None:
+            stats = single_flight.stats()
+            print(f"Coalesced {name} calls: {stats['coalesced']}/{stats['calls']} ({stats['coalesce_rate']:.0%})")
+
+def run_server(agent_type: str, host: str = None, port: int = None, workers: int = None):
+    """Serve queries over HTTP with the knowledge base, tools and agents kept in memory."""
+    from cache.completion_cache import get_completion_cache
+    from cache.single_flight import get_single_flight
+    from llm.router import get_llm_router
+    from server.agent_server import AgentServer
+
+    setup_environment()
+    kb = setup_knowledge_base()
+    tools = setup_tools(kb)
+    response_cache = setup_response_cache(kb)
+    router = setup_router(tools, kb)
+
+    server = AgentServer(
+        lambda requested_type: create_agent_manager(requested_type, tools, response_cache, router),
+        host=host or config.SERVER_HOST,
+        port=port or config.SERVER_PORT,
+        workers=workers or config.SERVER_WORKERS,
+        max_queue=config.SERVER_MAX_QUEUE,
+        queue_timeout=config.SERVER_QUEUE_TIMEOUT,
+        max_batch=config.SERVER_MAX_BATCH,
+        default_agent=agent_type,
+        caches={"response_cache": response_cache, "completion_cache": get_completion_cache(), "agent_router": router,
+                "llm_router": get_llm_router(), "llm_single_flight": get_single_flight("llm"),
+                "kb_single_flight": get_single_flight("kb")},
+    )
+    # Build the default pool now so the first request doesn't pay for it
+    server.pool(agent_type)
+    print(f"Serving on {server.url} (POST /query, POST /batch, GET /health, GET /metrics)")
+    server.serve_forever()
+
+def run_demo(agent_type: str, query: str = None, stream: bool = False):
     """Run a demonstration of the specified agent type."""
     setup_environment()
-    tools = setup_tools()
+    kb = setup_knowledge_base()
+    tools = setup_tools(kb)
+    response_cache = setup_response_cache(kb)
+    router = setup_router(tools, kb)
 
     if agent_type.lower() == "react":
         # Create ReAct agent
-        agent_manager = ReActAgentManager(tools)
+        agent_manager = create_agent_manager(agent_type, tools, response_cache, router)
         agent_name = "React Agent"
     else:
         raise ValueError(f"Unknown agent type: {agent_type}")
@@ -79,8 +230,7 @@ def run_demo(agent_type: str, query: str = None):
 
     if query:
         # Process a single query
-        response = agent_manager.query(query)
-        print(f"Response: {response}")
+        print_response(agent_manager, query, stream)
     else:
         # Iterative mode
         print("Running in iterative mode. Type 'exit' to quit.")
@@ -91,13 +241,8 @@ def run_demo(agent_type: str, query: str = None):
                 print("Exiting...")
                 break
             print("\nProcessing query...")
-            try:
-                with timeout(60):  # 60 second timeout
-                    response = agent_manager.query(query)
-                    print(f"\nResponse: {response}")
-            except TimeoutError as e:
-                print(f"\n{str(e)}")
-                print("Moving on to the next query...")
+            # The agent keeps to REACT_QUERY_DEADLINE_SECONDS itself and answers with what it has
+            print_response(agent_manager, query, stream)
 
 def main():
     """Main entry point for the application."""
@@ -119,17 +264,66 @@ def main():
         default="local",
         help="LLM type to use (local or openai)"
     )
-    
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the final answer token by token as it is generated"
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        metavar="FILE",
+        help="Replay a JSONL file of queries concurrently and report throughput"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        metavar="FILE",
+        help="Where to write batch results (default: <FILE>_results.jsonl)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help=f"Number of concurrent agents in batch mode (default: {config.BATCH_WORKERS}) "
+             f"or per agent type in serve mode (default: {config.SERVER_WORKERS})"
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Trace each query (LLM calls, tools, retrieval) and print a per-query time breakdown"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run an HTTP server that keeps the index, tools and agents loaded between queries"
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        help=f"Address to bind in serve mode (default: {config.SERVER_HOST})"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help=f"Port to listen on in serve mode (default: {config.SERVER_PORT})"
+    )
+
     args = parser.parse_args()
     
     # Override LLM type if specified
     if args.llm:
         config.LLM_TYPE = args.llm
+
+    if args.trace:
+        from utils.tracing import get_tracer
+        get_tracer().configure(enabled=True, print_summary=True)
         
-    run_demo(args.agent, args.query)
+    if args.serve:
+        run_server(args.agent, args.host, args.port, args.workers)
+    elif args.batch:
+        run_batch(args.agent, args.batch, args.output, args.workers)
+    else:
+        run_demo(args.agent, args.query, args.stream)
 
 if __name__ == "__main__":
     main()
-
-
-
@@ -0,0 +1 @@
+# Initialize server package
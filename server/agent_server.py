@@ -0,0 +1,435 @@
+"""
+Agent HTTP Server
+
+A long-running HTTP API that keeps the knowledge base, tools and agents resident:
+
+1. STARTUP: Tools (and the index and embedding model behind them) are built once; each
+   agent type gets a pool of agent managers, created on its first request
+2. ENDPOINTS:
+   - POST /query   {"query": "...", "agent": "react", "stream": false}
+   - POST /batch   {"queries": ["...", ...] or [{"id": ..., "query": ...}], "agent": "react"}
+     (each result carries its own status: 200, 500, or 503 when it could not be admitted)
+   - GET  /health  pool and queue status
+   - GET  /metrics Prometheus text format (requests, latency quantiles, queue, caches and,
+     with tracing enabled, time and LLM tokens per span kind)
+3. STREAMING: With "stream": true the answer is sent as server-sent events over a chunked
+   response, one event per token; an error after the first token ends the stream with an
+   "error" event
+4. BACKPRESSURE: At most workers + max_queue requests are admitted; the rest get 503 with
+   Retry-After, and admitted requests that wait longer than queue_timeout for an agent also
+   get 503, so overload sheds requests instead of piling up threads. Each /batch record is
+   admitted like a /query request, so a batch cannot take the pool past that limit
+5. ISOLATION: Agent chat memory is reset before each query, so requests never share context
+
+Per-request latency therefore excludes model loading, index loading and agent construction.
+"""
+
+import json
+import time
+import queue
+import socket
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agents.agent_pool import AgentPool
+from agents.batch_runner import BatchRunner, BUSY_ERROR, ERROR_PREFIX, ID_FIELDS, QUERY_FIELDS
+from utils.stats import summarize_latencies
+from utils.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 1000  # Recent requests per endpoint used for latency quantiles
+ENDPOINTS = ("/query", "/batch", "/health", "/metrics")
+QUANTILES = {"p50": "0.5", "p95": "0.95", "p99": "0.99"}
+
+class ServerBusy(Exception):
+    """Raised when a request cannot be admitted or no agent frees up in time."""
+
+class AgentServer:
+    """Serve agent queries over HTTP from pooled, pre-built agents."""
+
+    def __init__(
+        self,
+        agent_factory: Callable[[str], Any],
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        workers: int = 4,
+        max_queue: int = 16,
+        queue_timeout: float = 30.0,
+        max_batch: int = 100,
+        default_agent: str = "react",
+        agent_types: Tuple[str, ...] = ("react", "function"),
+        caches: Optional[Dict[str, Any]] = None,
+    ):
+        """Configure the server.
+
+        agent_factory(agent_type) builds one agent manager; caches maps a metric prefix
+        to any object with a stats() method (response cache, completion cache, ...).
+        """
+        self.agent_factory = agent_factory
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.max_batch = max_batch
+        self.default_agent = default_agent
+        self.agent_types = agent_types
+        self.caches = caches or {}
+
+        self._pools: Dict[str, AgentPool] = {}
+        self._pools_lock = threading.Lock()
+        self._admission = threading.BoundedSemaphore(workers + max_queue)
+        self._metrics_lock = threading.Lock()
+        self._admitted = 0
+        self._busy = 0
+        self._requests: Dict[Tuple[str, int], int] = {}
+        self._rejected = 0
+        self._latencies: Dict[str, deque] = {}
+        self._started = time.time()
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.app = self
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def pool(self, agent_type: str) -> AgentPool:
+        """The agent pool for an agent type, built on first use."""
+        if agent_type not in self.agent_types:
+            raise ValueError(f"Unknown agent type: {agent_type}")
+        with self._pools_lock:
+            if agent_type not in self._pools:
+                self._pools[agent_type] = AgentPool(lambda: self.agent_factory(agent_type), size=self.workers)
+            return self._pools[agent_type]
+
+    def _admit(self):
+        if not self._admission.acquire(blocking=False):
+            with self._metrics_lock:
+                self._rejected += 1
+            raise ServerBusy("Server is at capacity, retry later")
+        with self._metrics_lock:
+            self._admitted += 1
+
+    def _release(self):
+        with self._metrics_lock:
+            self._admitted -= 1
+        self._admission.release()
+
+    @contextmanager
+    def _agent(self, agent_type: str) -> Iterator[Any]:
+        """Check out a pooled agent with fresh memory, or raise ServerBusy after queue_timeout."""
+        checkout = self.pool(agent_type).acquire(timeout=self.queue_timeout)
+        try:
+            agent = checkout.__enter__()
+        except queue.Empty:
+            raise ServerBusy(f"No agent became available within {self.queue_timeout:.0f}s")
+        with self._metrics_lock:
+            self._busy += 1
+        try:
+            agent.reset()
+            yield agent
+        finally:
+            with self._metrics_lock:
+                self._busy -= 1
+            checkout.__exit__(None, None, None)
+
+    def answer(self, agent_type: str, query_text: str) -> str:
+        """Answer one query with a pooled agent (caller has been admitted)."""
+        with self._agent(agent_type) as agent:
+            return agent.query(query_text)
+
+    def stream(self, agent_type: str, query_text: str) -> Iterator[str]:
+        """Yield answer tokens from a pooled agent (caller has been admitted)."""
+        with self._agent(agent_type) as agent:
+            if hasattr(agent, "stream_query"):
+                yield from agent.stream_query(query_text)
+            else:
+                yield agent.query(query_text)
+
+    def _batch_one(self, runner: BatchRunner, query_id: str, query: str) -> Dict[str, Any]:
+        """Admit and answer one batch record; a record that cannot be admitted fails with status 503."""
+        try:
+            self._admit()
+        except ServerBusy as e:
+            return {"id": query_id, "query": query, "response": "", "latency_s": 0.0,
+                    "ok": False, "error": str(e), "status": 503}
+        try:
+            result = runner.run_one(query_id, query, timeout=self.queue_timeout)
+        finally:
+            self._release()
+        busy = not result["ok"] and (result["error"] or "").startswith(BUSY_ERROR)
+        result["status"] = 200 if result["ok"] else 503 if busy else 500
+        return result
+
+    def batch(self, agent_type: str, records: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """Answer a list of (id, query) pairs concurrently, one pooled agent per query.
+
+        Every record is admitted separately (see _admit), so the batch competes fairly with
+        /query traffic; records that are turned away or wait too long report status 503.
+        """
+        runner = BatchRunner(self.pool(agent_type))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=runner.workers) as executor:
+            results = list(executor.map(lambda record: self._batch_one(runner, *record), records))
+        elapsed = time.perf_counter() - start
+        return {
+            "results": results,
+            "summary": {
+                "queries": len(results),
+                "failures": sum(1 for r in results if not r["ok"]),
+                "rejected": sum(1 for r in results if r["status"] == 503),
+                "elapsed_s": round(elapsed, 3),
+                "latency_s": summarize_latencies([r["latency_s"] for r in results]),
+            },
+        }
+
+    def record(self, endpoint: str, status: int, latency: float):
+        """Count a finished request."""
+        endpoint = endpoint if endpoint in ENDPOINTS else "other"  # Keep label cardinality bounded
+        with self._metrics_lock:
+            key = (endpoint, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._latencies.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def health(self) -> Dict[str, Any]:
+        """Pool and queue status."""
+        with self._metrics_lock:
+            admitted, busy = self._admitted, self._busy
+        return {
+            "status": "ok",
+            "uptime_s": round(time.time() - self._started, 1),
+            "in_flight": busy,
+            "queued": max(admitted - busy, 0),
+            "agents_available": {name: pool.available() for name, pool in self._pools.items()},
+        }
+
+    def metrics(self) -> str:
+        """Prometheus text exposition of server and cache metrics."""
+        health = self.health()
+        with self._metrics_lock:
+            requests = dict(self._requests)
+            rejected = self._rejected
+            latencies = {endpoint: list(values) for endpoint, values in self._latencies.items()}
+
+        lines = ["# TYPE agent_server_requests_total counter"]
+        for (endpoint, status), count in sorted(requests.items()):
+            lines.append(f'agent_server_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+        lines += [
+            "# TYPE agent_server_rejected_total counter",
+            f"agent_server_rejected_total {rejected}",
+            "# TYPE agent_server_in_flight gauge",
+            f"agent_server_in_flight {health['in_flight']}",
+            "# TYPE agent_server_queued gauge",
+            f"agent_server_queued {health['queued']}",
+            "# TYPE agent_server_agents_available gauge",
+        ]
+        for name, available in health["agents_available"].items():
+            lines.append(f'agent_server_agents_available{{agent="{name}"}} {available}')
+        lines.append("# TYPE agent_server_request_latency_seconds summary")
+        for endpoint, values in sorted(latencies.items()):
+            stats = summarize_latencies(values)
+            for name, quantile in QUANTILES.items():
+                lines.append(
+                    f'agent_server_request_latency_seconds{{endpoint="{endpoint}",quantile="{quantile}"}} '
+                    f"{stats[name]:.6f}"
+                )
+            lines.append(f'agent_server_request_latency_seconds_count{{endpoint="{endpoint}"}} {stats["count"]}')
+        for prefix, cache in self.caches.items():
+            if cache is None:
+                continue
+            for key, value in cache.stats().items():
+                if isinstance(value, (int, float)):
+                    lines.append(f"{prefix}_{key} {value}")
+        text = "\n".join(lines) + "\n"
+        tracer = get_tracer()
+        if tracer.enabled:
+            text += tracer.prometheus_text()
+        return text
+
+    def serve_forever(self):
+        """Serve until interrupted."""
+        logger.info(f"Serving agents on {self.url} ({self.workers} agents per type)")
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Shutting down server")
+        finally:
+            self.httpd.server_close()
+
+    def shutdown(self):
+        """Stop a server running in another thread."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def _parse_records(queries: List[Any]) -> List[Tuple[str, str]]:
+    """Accept plain strings or objects with the same query/id fields as batch files."""
+    records = []
+    for n, item in enumerate(queries, start=1):
+        if isinstance(item, str):
+            records.append((str(n), item))
+            continue
+        query = next((item[k] for k in QUERY_FIELDS if item.get(k)), None)
+        if query is None:
+            raise ValueError(f"Batch item {n} has no query field ({', '.join(QUERY_FIELDS)})")
+        records.append((str(next((item[k] for k in ID_FIELDS if item.get(k)), n)), query))
+    return records
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes requests to the AgentServer stored on the HTTP server."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "AgentServer/1.0"
+
+    def setup(self):
+        super().setup()
+        # Streamed tokens are small writes; don't let Nagle's algorithm hold them back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    @property
+    def app(self) -> AgentServer:
+        return self.server.app
+
+    def log_message(self, format: str, *args: Any):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json", headers)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        data = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        return data
+
+    def do_GET(self):
+        start = time.perf_counter()
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            status = 200
+            self._send_json(status, self.app.health())
+        elif path == "/metrics":
+            status = 200
+            self._send(status, self.app.metrics().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            status = 404
+            self._send_json(status, {"error": f"Not found: {path}"})
+        self.app.record(path, status, time.perf_counter() - start)
+
+    def do_POST(self):
+        start = time.perf_counter()
+        path = self.path.split("?", 1)[0]
+        status = 500
+        try:
+            body = self._read_json()
+            agent_type = str(body.get("agent") or self.app.default_agent).lower()
+            if path == "/query":
+                status = self._handle_query(body, agent_type)
+            elif path == "/batch":
+                status = self._handle_batch(body, agent_type)
+            else:
+                status = 404
+                self._send_json(status, {"error": f"Not found: {path}"})
+        except ServerBusy as e:
+            status = 503
+            self._send_json(status, {"error": str(e)}, {"Retry-After": "1"})
+        except ValueError as e:  # Also covers invalid JSON
+            status = 400
+            self._send_json(status, {"error": str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info("Client disconnected before the response was complete")
+        except Exception as e:
+            logger.error(f"Error handling {path}: {e}")
+            self._send_json(status, {"error": f"An error occurred: {str(e)}"})
+        finally:
+            self.app.record(path, status, time.perf_counter() - start)
+
+    def _handle_query(self, body: Dict[str, Any], agent_type: str) -> int:
+        query_text = body.get("query")
+        if not isinstance(query_text, str) or not query_text.strip():
+            raise ValueError("Request needs a non-empty 'query' string")
+
+        self.app._admit()
+        try:
+            if body.get("stream"):
+                return self._stream_response(self.app.stream(agent_type, query_text))
+            query_start = time.perf_counter()
+            response = self.app.answer(agent_type, query_text)
+            ok = not response.startswith(ERROR_PREFIX)
+            self._send_json(200 if ok else 500, {
+                "query": query_text,
+                "agent": agent_type,
+                "response": response,
+                "ok": ok,
+                "latency_s": round(time.perf_counter() - query_start, 4),
+            })
+            return 200 if ok else 500
+        finally:
+            self.app._release()
+
+    def _handle_batch(self, body: Dict[str, Any], agent_type: str) -> int:
+        queries = body.get("queries")
+        if not isinstance(queries, list) or not queries:
+            raise ValueError("Request needs a non-empty 'queries' list")
+        if len(queries) > self.app.max_batch:
+            raise ValueError(f"Batch has {len(queries)} queries, the limit is {self.app.max_batch}")
+        records = _parse_records(queries)
+
+        # Records are admitted one by one inside batch()
+        self._send_json(200, self.app.batch(agent_type, records))
+        return 200
+
+    def _stream_response(self, tokens: Iterator[str]) -> int:
+        """Send tokens as server-sent events over a chunked response and return the status to record."""
+        tokens = iter(tokens)
+        # Pull the first token before sending headers, so a busy server can still answer 503
+        first = next(tokens, None)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_event(data: str, event: Optional[str] = None):
+            frame = f"event: {event}\n" if event else ""
+            payload = f"{frame}data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(payload):X}\r\n".encode("ascii") + payload + b"\r\n")
+            self.wfile.flush()
+
+        status = 200
+        try:
+            try:
+                if first is not None:
+                    write_event(json.dumps({"token": first}, ensure_ascii=False))
+                for token in tokens:
+                    write_event(json.dumps({"token": token}, ensure_ascii=False))
+                write_event("[DONE]")
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:
+                # Headers are already out, so the error can only be reported inside the stream
+                logger.error(f"Error while streaming a response: {e}")
+                status = 500
+                write_event(json.dumps({"error": f"An error occurred: {str(e)}"}, ensure_ascii=False), event="error")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        finally:
+            # Return the agent to the pool even if the client went away mid-stream
+            if hasattr(tokens, "close"):
+                tokens.close()
+        return status
@@ -0,0 +1,264 @@
+"""
+Concurrent Tool Executor
+
+This module runs the tool calls an agent makes, with limits shared by every agent in the process:
+
+1. PARALLEL TURNS: run() executes the independent tool calls of one model turn on a thread pool
+   and arun() as asyncio tasks (LlamaIndex's async adapters move sync-only tools onto threads),
+   so a turn costs the slowest tool's time rather than the sum of all of them
+2. TIMEOUTS: Each call gets TOOL_TIMEOUT_SECONDS (or its TOOL_TIMEOUTS override) from the moment
+   it starts running, cut short by the query's deadline if one is set; a call that runs over
+   returns an error ToolOutput that the model sees as the observation. Waiting for a free slot
+   or worker is bounded by the same limit, but does not eat into the call's own time
+3. CONCURRENCY LIMITS: TOOL_EXECUTOR_WORKERS caps the calls running at once, and
+   TOOL_CONCURRENCY_LIMITS caps individual tools (e.g. the embedding-heavy knowledge base);
+   a tool's slot is taken before the call is queued, so calls over the limit never occupy
+   a worker thread while they wait
+4. ORDERING: Results come back in call order, so chat memory reads the same as a sequential run
+5. TRACING: Calls run in a copy of the caller's context, so their spans nest under the
+   current iteration
+
+A running sync tool cannot be interrupted: after a timeout the agent moves on, and the
+call finishes in the background while keeping its worker thread and tool slot. Abandoned
+calls are therefore bounded by TOOL_EXECUTOR_WORKERS (and the tool's own limit): once they
+hold every worker, new calls time out waiting for one instead of starting more threads.
+Async calls of sync tools run on the event loop's default executor and are bounded by it.
+wrap() puts a single tool behind the executor, which gives ReAct agents (one Action per
+step) the same timeouts and limits.
+"""
+
+import time
+import asyncio
+import logging
+import weakref
+import threading
+import importlib
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core.tools.calling import acall_tool, call_tool
+from llama_index.core.tools.types import AsyncBaseTool, BaseTool, ToolMetadata, ToolOutput, adapt_to_async_tool
+
+from utils.deadline import remaining_time
+
+logger = logging.getLogger(__name__)
+
+ToolCall = Tuple[BaseTool, Dict[str, Any]]
+
+class _Call:
+    """One sync tool call: its future once submitted, or its output if it never started."""
+
+    __slots__ = ("name", "fn", "arguments", "future", "output", "started", "started_at")
+
+    def __init__(self, name: str, fn: Callable[[], ToolOutput], arguments: Dict[str, Any]):
+        self.name = name
+        self.fn = fn
+        self.arguments = arguments
+        self.future: Optional[Future] = None
+        self.output: Optional[ToolOutput] = None
+        self.started = threading.Event()
+        self.started_at = 0.0
+
+class ToolExecutor:
+    """Runs tool calls concurrently with per-tool timeouts and concurrency limits."""
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        timeout: float = 30.0,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        tool_concurrency: Optional[Dict[str, int]] = None,
+    ):
+        """Initialize the shared thread pool and the limits."""
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.tool_timeouts = dict(tool_timeouts or {})
+        self.tool_concurrency = dict(tool_concurrency or {})
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._limits = {name: threading.BoundedSemaphore(n) for name, n in self.tool_concurrency.items()}
+        # asyncio semaphores belong to one event loop, so async limits are kept per loop
+        self._async_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._abandoned = 0  # Timed-out calls still running on a worker thread
+
+    def timeout_for(self, name: str) -> float:
+        return self.tool_timeouts.get(name, self.timeout)
+
+    def _time_limit(self, name: str) -> float:
+        """The tool's timeout, or the time left before the query deadline if that is shorter."""
+        remaining = remaining_time()
+        timeout = self.timeout_for(name)
+        return timeout if remaining is None else min(timeout, remaining)
+
+    def _timeout_output(self, name: str, arguments: Dict[str, Any], seconds: float, waiting_for: str = "") -> ToolOutput:
+        suffix = f" waiting for {waiting_for}" if waiting_for else ""
+        seconds = round(seconds, 2)  # Limits cut short by a deadline are not round numbers
+        logger.warning(f"Tool {name} timed out after {seconds:g}s{suffix}")
+        return ToolOutput(
+            content=f"Tool {name} timed out after {seconds:g} seconds{suffix}",
+            tool_name=name,
+            raw_input=arguments,
+            raw_output=None,
+            is_error=True,
+        )
+
+    def _start(self, call: _Call, blocking: bool = True) -> bool:
+        """Take the tool's slot and queue the call on the pool, in the caller's context.
+
+        Without a free slot, returns False (non-blocking) or sets a timeout output once
+        the call's time limit passes (blocking).
+        """
+        limit = self._limits.get(call.name)
+        if limit is not None:
+            seconds = self._time_limit(call.name)
+            if not limit.acquire(blocking=blocking, timeout=seconds if blocking else None):
+                if blocking:
+                    call.output = self._timeout_output(call.name, call.arguments, seconds, "a free slot")
+                return False
+
+        def run() -> ToolOutput:
+            call.started_at = time.monotonic()
+            call.started.set()
+            return call.fn()
+
+        call.future = self._pool.submit(contextvars.copy_context().run, run)
+        if limit is not None:
+            # Also fires if the call is cancelled before it starts
+            call.future.add_done_callback(lambda _: limit.release())
+        return True
+
+    def _wait(self, call: _Call) -> ToolOutput:
+        """Result of a started call, or a timeout error once its time since it began running runs out."""
+        if call.output is not None:
+            return call.output
+        seconds = self._time_limit(call.name)
+        if not call.started.wait(seconds) and call.future.cancel():
+            return self._timeout_output(call.name, call.arguments, seconds, "a free worker")
+        call.started.wait()  # Cancel failed, so the call is running and about to set this
+        limit = self.timeout_for(call.name)
+        remaining = remaining_time()
+        elapsed = time.monotonic() - call.started_at
+        if remaining is not None:
+            limit = min(limit, elapsed + remaining)
+        try:
+            return call.future.result(timeout=max(0.0, limit - elapsed))
+        except FutureTimeoutError:
+            with self._lock:
+                self._abandoned += 1
+            call.future.add_done_callback(self._finish_abandoned)
+            logger.warning(f"Tool {call.name} keeps running in the background ({self._abandoned} abandoned calls)")
+            return self._timeout_output(call.name, call.arguments, limit)
+
+    def _finish_abandoned(self, future: Future):
+        with self._lock:
+            self._abandoned -= 1
+
+    def run(self, calls: Sequence[ToolCall]) -> List[ToolOutput]:
+        """Execute tool calls concurrently on the thread pool; results are in call order."""
+        if len(calls) == 1:
+            tool, arguments = calls[0]
+            return [self.call(tool, arguments)]
+        pending = [
+            _Call(tool.metadata.name, lambda t=tool, a=arguments: call_tool(t, a), arguments)
+            for tool, arguments in calls
+        ]
+        # Start what has a free slot first, so one busy tool does not hold up the others
+        waiting = [call for call in pending if not self._start(call, blocking=False)]
+        for call in waiting:
+            self._start(call)
+        return [self._wait(call) for call in pending]
+
+    def call(self, tool: BaseTool, arguments: Dict[str, Any]) -> ToolOutput:
+        """Execute one tool call with its timeout and limit."""
+        return self.call_fn(tool.metadata.name, lambda: call_tool(tool, arguments), arguments)
+
+    def call_fn(self, name: str, fn: Callable[[], ToolOutput], arguments: Dict[str, Any]) -> ToolOutput:
+        """Run fn as a call of tool `name`, with that tool's timeout and limit."""
+        call = _Call(name, fn, arguments)
+        self._start(call)
+        return self._wait(call)
+
+    def _async_limit(self, name: str) -> Optional[asyncio.Semaphore]:
+        """The per-tool semaphore of the running event loop, with "*" as the overall limit."""
+        if name != "*" and name not in self.tool_concurrency:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            limits = self._async_limits.setdefault(loop, {})
+            if name not in limits:
+                limits[name] = asyncio.Semaphore(self.max_workers if name == "*" else self.tool_concurrency[name])
+            return limits[name]
+
+    async def _await_limited(self, name: str, make_call: Callable[[], Awaitable[ToolOutput]],
+                             arguments: Dict[str, Any]) -> ToolOutput:
+        acquired = []
+        try:
+            for semaphore in (self._async_limit("*"), self._async_limit(name)):
+                if semaphore is None:
+                    continue
+                seconds = self._time_limit(name)
+                try:
+                    await asyncio.wait_for(semaphore.acquire(), timeout=seconds)
+                except asyncio.TimeoutError:
+                    return self._timeout_output(name, arguments, seconds, "a free slot")
+                acquired.append(semaphore)
+            # The call's own time starts once it holds its slots
+            limit = self._time_limit(name)
+            try:
+                return await asyncio.wait_for(make_call(), timeout=limit)
+            except asyncio.TimeoutError:
+                return self._timeout_output(name, arguments, limit)
+        finally:
+            for semaphore in acquired:
+                semaphore.release()
+
+    async def arun(self, calls: Sequence[ToolCall]) -> List[ToolOutput]:
+        """Execute tool calls as concurrent asyncio tasks; results are in call order."""
+        return list(await asyncio.gather(*(
+            self._await_limited(tool.metadata.name, lambda t=tool, a=arguments: acall_tool(t, a), arguments)
+            for tool, arguments in calls
+        )))
+
+    def wrap(self, tool: BaseTool) -> "ExecutorTool":
+        """Put a tool behind this executor's timeouts and limits."""
+        return ExecutorTool(tool, self)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+class ExecutorTool(AsyncBaseTool):
+    """Tool wrapper that routes direct calls (e.g. ReAct actions) through a ToolExecutor."""
+
+    def __init__(self, tool: BaseTool, executor: ToolExecutor):
+        self._tool = adapt_to_async_tool(tool)
+        self._executor = executor
+
+    @property
+    def metadata(self) -> ToolMetadata:
+        return self._tool.metadata
+
+    def call(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        return self._executor.call_fn(self.metadata.name, lambda: self._tool.call(*args, **kwargs), kwargs)
+
+    async def acall(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        return await self._executor._await_limited(self.metadata.name, lambda: self._tool.acall(*args, **kwargs), kwargs)
+
+_executor: Optional[ToolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_tool_executor(config: Optional[Dict[str, Any]] = None) -> ToolExecutor:
+    """Return the process-wide tool executor, configured from config.py on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                config = config or vars(importlib.import_module("config"))
+                _executor = ToolExecutor(
+                    max_workers=config.get("TOOL_EXECUTOR_WORKERS", 4),
+                    timeout=config.get("TOOL_TIMEOUT_SECONDS", 30.0),
+                    tool_timeouts=config.get("TOOL_TIMEOUTS"),
+                    tool_concurrency=config.get("TOOL_CONCURRENCY_LIMITS"),
+                )
+    return _executor
@@ -0,0 +1,40 @@
+"""
+Traced Tool Wrapper
+
+This module makes every agent tool show up in query traces:
+
+1. WRAPPING: TracedTool delegates metadata and calls to any tool, sync or async
+2. SPANS: Each call is recorded as a "tool" span with the tool name, output size and
+   error flag, so retrieval, embedding and LLM spans made inside the tool nest under it
+3. ZERO COST WHEN OFF: Outside an active trace the wrapper only forwards the call
+
+setup_tools() in main.py wraps all tools, so agents need no changes.
+"""
+
+from typing import Any
+
+from llama_index.core.tools.types import AsyncBaseTool, BaseTool, ToolMetadata, ToolOutput, adapt_to_async_tool
+
+from utils.tracing import span
+
+class TracedTool(AsyncBaseTool):
+    """Tool wrapper that records a tracing span per call."""
+
+    def __init__(self, tool: BaseTool):
+        self._tool = adapt_to_async_tool(tool)
+
+    @property
+    def metadata(self) -> ToolMetadata:
+        return self._tool.metadata
+
+    def call(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        with span(f"tool.{self.metadata.name}", kind="tool") as tool_span:
+            output = self._tool.call(*args, **kwargs)
+            tool_span.set(output_chars=len(output.content), is_error=output.is_error)
+            return output
+
+    async def acall(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        with span(f"tool.{self.metadata.name}", kind="tool") as tool_span:
+            output = await self._tool.acall(*args, **kwargs)
+            tool_span.set(output_chars=len(output.content), is_error=output.is_error)
+            return output
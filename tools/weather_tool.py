@@ -2,17 +2,17 @@ from datetime import datetime
 from llama_index.core.tools import FunctionTool, ToolMetadata
 
 # This is a mock weather API - in a real application, you would use an actual weather API
+# Simple mock data for demonstration purposes (also used by the fast-path router)
+WEATHER_DATA = {
+    "new york": {"temperature": 72, "condition": "sunny"},
+    "london": {"temperature": 65, "condition": "cloudy"},
+    "tokyo": {"temperature": 80, "condition": "partly cloudy"},
+    "sydney": {"temperature": 85, "condition": "clear"},
+    "paris": {"temperature": 70, "condition": "rainy"},
+}
+
 def _get_weather(location: str, date: str = None) -> str:
     """Get weather information for a location and date."""
-    # Simple mock implementation for demonstration purposes
-    weather_data = {
-        "new york": {"temperature": 72, "condition": "sunny"},
-        "london": {"temperature": 65, "condition": "cloudy"},
-        "tokyo": {"temperature": 80, "condition": "partly cloudy"},
-        "sydney": {"temperature": 85, "condition": "clear"},
-        "paris": {"temperature": 70, "condition": "rainy"},
-    }
-    
     # Default to today if no date is provided
     if date is None:
         date = datetime.now().strftime("%Y-%m-%d")
@@ -20,12 +20,12 @@ def _get_weather(location: str, date: str = None) -> str:
     # Convert location to lowercase for case-insensitive matching
     location = location.lower()
     
-    if location in weather_data:
-        temp = weather_data[location]["temperature"]
-        condition = weather_data[location]["condition"]
+    if location in WEATHER_DATA:
+        temp = WEATHER_DATA[location]["temperature"]
+        condition = WEATHER_DATA[location]["condition"]
         return f"The weather in {location.title()} on {date} is {condition} with a temperature of {temp}°F."
     else:
-        available_locations = ", ".join(city.title() for city in weather_data.keys())
+        available_locations = ", ".join(city.title() for city in WEATHER_DATA.keys())
         return f"Weather data for {location} is not available. Available locations: {available_locations}."
 
 def get_weather_tool():
@@ -0,0 +1,118 @@
+"""
+Tests for the BM25 keyword index and the hybrid retriever.
+
+Flow:
+1. Index a few small chunks (TextNodes with a source document and title metadata)
+2. Check tokenizing, BM25 ranking, query-term coverage and metadata filters
+3. Save and reload the index, then remove a source document from it
+4. Fuse BM25 with a stubbed vector retriever and check the lexical short-circuit,
+   reciprocal rank fusion and fetching of keyword-only hits by node id
+
+Run from the project root with: python -m pytest unit_test/test_bm25.py
+"""
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeRelationship, NodeWithScore, QueryBundle, RelatedNodeInfo, TextNode
+
+from knowledge_base.bm25 import BM25_FILENAME, BM25Index, tokenize
+from knowledge_base.hybrid_retriever import HybridRetriever
+
+def make_node(node_id, text, doc):
+    return TextNode(
+        id_=node_id,
+        text=text,
+        metadata={"title": doc},
+        relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=doc)},
+    )
+
+NODES = [
+    make_node("li", "LlamaIndex connects large language models to external data", "LlamaIndex"),
+    make_node("np", "NumPy provides fast arrays and matrices for numerical computing", "NumPy"),
+    make_node("pd", "pandas builds dataframes on top of NumPy arrays", "pandas"),
+    make_node("rag", "Retrieval augmented generation (RAG) grounds answers in retrieved documents", "RAG"),
+]
+BY_ID = {node.node_id: node for node in NODES}
+
+def build_index():
+    index = BM25Index()
+    index.add_nodes(NODES)
+    return index
+
+class StubRetriever(BaseRetriever):
+    """Vector retriever stand-in returning a fixed ranking."""
+
+    def __init__(self, node_ids):
+        super().__init__()
+        self.node_ids = node_ids
+        self.calls = 0
+
+    def _retrieve(self, query_bundle):
+        self.calls += 1
+        return [NodeWithScore(node=BY_ID[node_id], score=1.0 - 0.1 * rank) for rank, node_id in enumerate(self.node_ids)]
+
+def fetch_nodes(node_ids):
+    return [BY_ID[node_id] for node_id in node_ids if node_id in BY_ID]
+
+def test_tokenize_keeps_hyphenated_names_and_drops_stopwords():
+    assert tokenize("What is llama-index?") == ["llama-index", "llama", "index"]
+
+def test_search_ranks_by_bm25_and_reports_coverage():
+    results = build_index().search("numpy matrices", top_k=3)
+    assert [node_id for node_id, _, _ in results] == ["np", "pd"]
+    assert results[0][1] > results[1][1]
+    assert [coverage for _, _, coverage in results] == [1.0, 0.5]
+    assert build_index().search("quantum chromodynamics") == []
+
+def test_search_applies_metadata_filters():
+    results = build_index().search("numpy", filters={"title": "pandas"})
+    assert [node_id for node_id, _, _ in results] == ["pd"]
+
+def test_save_and_load_round_trip(tmp_path):
+    index = build_index()
+    index.save(tmp_path)
+    assert (tmp_path / BM25_FILENAME).exists()
+    loaded = BM25Index.load(tmp_path)
+    assert len(loaded) == len(index)
+    assert loaded.postings == index.postings
+    assert loaded.search("numpy matrices") == index.search("numpy matrices")
+    assert loaded.search("numpy", filters={"title": "NumPy"}) == index.search("numpy", filters={"title": "NumPy"})
+
+def test_load_without_an_index_returns_none(tmp_path):
+    assert BM25Index.load(tmp_path) is None
+
+def test_delete_ref_doc_removes_its_chunks(tmp_path):
+    index = build_index()
+    index.save(tmp_path)
+    loaded = BM25Index.load(tmp_path)
+    for bm25 in (index, loaded):
+        bm25.delete_ref_doc("NumPy")
+        assert [node_id for node_id, _, _ in bm25.search("numpy matrices")] == ["pd"]
+        assert "np" not in bm25.doc_lengths
+        assert bm25._total_length == sum(bm25.doc_lengths.values())
+
+def test_confident_lexical_hit_skips_the_vector_retriever():
+    vector = StubRetriever(["li", "np"])
+    retriever = HybridRetriever(vector, build_index(), fetch_nodes, similarity_top_k=1)
+    results = retriever.retrieve(QueryBundle("RAG"))
+    assert [r.node.node_id for r in results] == ["rag"]
+    assert vector.calls == 0
+    assert retriever.stats()["lexical"] == 1
+
+def test_rrf_fuses_both_rankings():
+    # "arrays" matches two chunks equally often, so the lexical path is not confident
+    vector = StubRetriever(["li", "pd"])
+    retriever = HybridRetriever(vector, build_index(), fetch_nodes, similarity_top_k=3, rrf_k=60)
+    results = retriever.retrieve(QueryBundle("arrays"))
+    assert vector.calls == 1
+    # BM25 ranks pd (the shorter chunk) above np; pd is the only chunk both retrievers found
+    scores = {r.node.node_id: r.score for r in results}
+    assert [r.node.node_id for r in results] == ["pd", "li", "np"]
+    assert abs(scores["pd"] - (1 / 61 + 1 / 62)) < 1e-12
+    assert abs(scores["li"] - 1 / 61) < 1e-12
+    assert abs(scores["np"] - 1 / 62) < 1e-12
+
+def test_keyword_hits_missing_from_the_store_are_dropped():
+    vector = StubRetriever(["li"])
+    retriever = HybridRetriever(vector, build_index(), lambda ids: [], similarity_top_k=3)
+    results = retriever.retrieve(QueryBundle("arrays"))
+    assert [r.node.node_id for r in results] == ["li"]
@@ -0,0 +1,76 @@
+"""
+Tests for query deadlines.
+
+Flow:
+1. Open deadlines with the deadline() context manager
+2. Check remaining time, expiry and DeadlineExceeded from check()
+3. Check that a nested deadline never extends the enclosing one and that None keeps it
+4. Check bounded_timeout() caps HTTP timeouts and that the deadline is visible in worker
+   threads that run in a copy of the caller's context
+
+Run from the project root with: python -m pytest unit_test/test_deadline.py
+"""
+
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.deadline import (
+    Deadline,
+    DeadlineExceeded,
+    bounded_timeout,
+    current_deadline,
+    deadline,
+    remaining_time,
+)
+
+def test_no_deadline_by_default():
+    assert current_deadline() is None
+    assert remaining_time() is None
+    assert bounded_timeout((5.0, 60.0)) == (5.0, 60.0)
+
+def test_remaining_time_and_expiry():
+    with deadline(0.1) as active:
+        assert 0.0 < remaining_time() <= 0.1
+        assert not active.expired
+        active.check()
+        time.sleep(0.15)
+        assert remaining_time() == 0.0
+        assert active.expired
+        with pytest.raises(DeadlineExceeded, match="0.1 second deadline"):
+            active.check()
+    assert current_deadline() is None
+
+def test_deadline_exceeded_is_a_timeout_error():
+    assert issubclass(DeadlineExceeded, TimeoutError)
+
+def test_nested_deadline_never_extends_the_outer_one():
+    with deadline(0.2) as outer:
+        with deadline(10.0) as inner:
+            assert inner.expires_at == outer.expires_at
+        with deadline(0.05) as tighter:
+            assert tighter.expires_at < outer.expires_at
+        with deadline(None) as same:
+            assert same is outer
+        assert current_deadline() is outer
+
+def test_bounded_timeout_caps_connect_and_read():
+    with deadline(2.0):
+        connect, read = bounded_timeout((5.0, 60.0))
+        assert connect <= 2.0 and read <= 2.0
+        assert bounded_timeout((0.5, 60.0))[0] == 0.5
+
+def test_deadline_reaches_threads_running_in_a_context_copy():
+    with ThreadPoolExecutor(max_workers=1) as pool, deadline(5.0) as active:
+        seen = pool.submit(contextvars.copy_context().run, current_deadline).result()
+        plain = pool.submit(current_deadline).result()
+    assert seen is active
+    assert plain is None
+
+def test_explicit_expiry():
+    expired = Deadline(1.0, expires_at=time.monotonic() - 1)
+    assert expired.remaining() == 0.0
+    with pytest.raises(DeadlineExceeded):
+        expired.check("LLM call")
@@ -0,0 +1,116 @@
+"""
+Tests for the NumPy vector store and its IVF index.
+
+Flow:
+1. Fill stores with random unit vectors (a fixed seed) attached to TextNodes
+2. Check exact top-k against a brute-force ranking, plus metadata filters and deletes
+3. Check that IVF with every list probed matches exact search, and that a store opened
+   from its persist directory (memory-mapped) returns the same results
+4. Check the float16 and int8 storage types stay close to float32 scores
+
+Run from the project root with: python -m pytest unit_test/test_numpy_vector_store.py
+"""
+
+import numpy as np
+import pytest
+
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores import ExactMatchFilter, MetadataFilters
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from knowledge_base.ivf_index import IVFIndex
+from knowledge_base.numpy_vector_store import NumpyVectorStore
+
+DIM = 16
+
+def make_nodes(count, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, DIM)).astype(np.float32)
+    nodes = [
+        TextNode(
+            id_=f"n{i}",
+            text=f"chunk {i}",
+            embedding=vectors[i].tolist(),
+            metadata={"title": f"doc{i % 4}"},
+            relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=f"doc{i % 4}")},
+        )
+        for i in range(count)
+    ]
+    return nodes, vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def brute_force(vectors, q, k, rows=None):
+    q = q / np.linalg.norm(q)
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    scores = vectors[rows] @ q
+    return [f"n{rows[i]}" for i in np.argsort(-scores)[:k]]
+
+def search(store, q, k=5, **kwargs):
+    return store.query(VectorStoreQuery(query_embedding=q.tolist(), similarity_top_k=k, **kwargs))
+
+def test_flat_top_k_matches_brute_force():
+    nodes, vectors = make_nodes(200)
+    store = NumpyVectorStore()
+    store.add(nodes)
+    q = np.random.default_rng(1).normal(size=DIM).astype(np.float32)
+    result = search(store, q, k=5)
+    assert result.ids == brute_force(vectors, q, 5)
+    assert result.similarities == sorted(result.similarities, reverse=True)
+
+def test_filters_and_delete():
+    nodes, vectors = make_nodes(40)
+    store = NumpyVectorStore()
+    store.add(nodes)
+    q = vectors[3]
+    filters = MetadataFilters(filters=[ExactMatchFilter(key="title", value="doc1")])
+    result = search(store, q, k=3, filters=filters)
+    assert result.ids == brute_force(vectors, q, 3, rows=range(1, 40, 4))
+
+    store.delete("doc3")
+    assert store.count() == 30
+    assert "n3" not in search(store, q, k=40).ids
+
+def test_ivf_with_every_list_probed_is_exact():
+    nodes, vectors = make_nodes(400)
+    store = NumpyVectorStore(index_type="ivf", nlist=8, nprobe=8, ivf_min_vectors=100)
+    store.add(nodes)
+    assert store._ivf.is_trained
+    for seed in range(5):
+        q = np.random.default_rng(seed + 10).normal(size=DIM).astype(np.float32)
+        assert search(store, q, k=5).ids == brute_force(vectors, q, 5)
+
+def test_ivf_candidates_cover_probed_lists():
+    _, vectors = make_nodes(300)
+    ivf = IVFIndex(nlist=6, nprobe=2)
+    ivf.train(vectors)
+    rows = ivf.candidates(vectors[0])
+    assert 0 in rows
+    assert len(rows) < len(vectors)
+    assert len(ivf.candidates(vectors[0], nprobe=6)) == len(vectors)
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf"])
+def test_persisted_store_returns_the_same_results(tmp_path, index_type):
+    nodes, _ = make_nodes(300)
+    store = NumpyVectorStore(index_type=index_type, nlist=8, nprobe=3, ivf_min_vectors=100)
+    store.add(nodes)
+    store.persist(str(tmp_path / "default__vector_store.json"))
+
+    loaded = NumpyVectorStore.from_persist_dir(tmp_path, index_type=index_type, nlist=8, nprobe=3, ivf_min_vectors=100)
+    assert loaded.count() == store.count()
+    q = np.random.default_rng(7).normal(size=DIM).astype(np.float32)
+    assert search(loaded, q).ids == search(store, q).ids
+
+    # Appending detaches the memory-mapped matrix instead of writing through it
+    extra, _ = make_nodes(1, seed=99)
+    extra[0].id_ = "extra"
+    loaded.add(extra)
+    assert search(loaded, np.asarray(extra[0].embedding), k=1).ids == ["extra"]
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_compact_dtypes_keep_scores_close(dtype):
+    nodes, vectors = make_nodes(100)
+    store = NumpyVectorStore(dtype=dtype)
+    store.add(nodes)
+    q = vectors[5]
+    result = search(store, q, k=3)
+    assert result.ids[0] == "n5"
+    assert abs(result.similarities[0] - 1.0) < 0.02
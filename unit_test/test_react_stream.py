@@ -0,0 +1,54 @@
+"""
+Tests for streaming ReAct queries.
+
+Flow:
+1. Build a ReActAgentManager over a scripted LLM that answers straight away
+2. Stream two queries and check the answer comes back token by token
+3. Check each streamed query starts from an empty chat history, so the agent's memory
+   only ever holds the last question and answer
+
+Run from the project root with: python -m pytest unit_test/test_react_stream.py
+"""
+
+from typing import Any
+
+from llama_index.core.base.llms.types import CompletionResponse, CompletionResponseGen
+from llama_index.core.llms import MockLLM
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+import agents.react_agent as react_agent
+from agents.react_agent import ReActAgentManager
+
+REPLY = "Thought: I can answer without using any more tools.\nAnswer: Forty two."
+
+class ScriptedLLM(MockLLM):
+    """Answers every prompt with REPLY, streamed word by word."""
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text=REPLY)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        def gen() -> CompletionResponseGen:
+            text = ""
+            for word in REPLY.split(" "):
+                delta = word if not text else f" {word}"
+                text += delta
+                yield CompletionResponse(text=text, delta=delta)
+        return gen()
+
+def make_manager(monkeypatch):
+    monkeypatch.setattr(react_agent, "get_llm", lambda config: ScriptedLLM())
+    return ReActAgentManager(tools=[])
+
+def test_stream_yields_the_answer_token_by_token(monkeypatch):
+    tokens = list(make_manager(monkeypatch).stream_query("What is six times seven?"))
+    assert len(tokens) > 1
+    assert "".join(tokens).strip() == "Forty two."
+
+def test_streamed_queries_do_not_build_up_memory(monkeypatch):
+    manager = make_manager(monkeypatch)
+    for query in ["What is six times seven?", "And what is it in words?"]:
+        assert "".join(manager.stream_query(query)).strip() == "Forty two."
+        assert len(manager.agent.memory.get_all()) == 2
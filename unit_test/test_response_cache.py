@@ -0,0 +1,103 @@
+"""
+Tests for the agent ResponseCache.
+
+Flow:
+1. Build caches in a temporary directory, with a fake embedding model whose vectors are
+   chosen per query so cosine similarities are known exactly
+2. Check the exact tier: normalization, persistence across instances, TTL expiry and
+   least-recently-used eviction
+3. Check the semantic tier: the similarity threshold, and that a near-duplicate is only
+   accepted when its numbers, capitalized words and tool arguments match
+4. Check that answers built from an uncacheable tool are not stored
+
+Run from the project root with: python -m pytest unit_test/test_response_cache.py
+"""
+
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from cache.response_cache import ResponseCache, normalize_query
+
+class FakeEmbedding:
+    """Maps normalized query text to a fixed vector; unknown text gets an orthogonal one."""
+
+    def __init__(self, vectors):
+        self.vectors = {normalize_query(text): np.asarray(v, dtype=np.float32) for text, v in vectors.items()}
+
+    def get_query_embedding(self, text):
+        return self.vectors.get(text, np.array([0.0, 0.0, 1.0], dtype=np.float32)).tolist()
+
+def tool_source(tool_name, **kwargs):
+    return SimpleNamespace(tool_name=tool_name, raw_input={"args": (), "kwargs": kwargs})
+
+def test_exact_hit_ignores_case_whitespace_and_punctuation(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.put("What is RAG?", "Retrieval augmented generation")
+    assert cache.get("  what is rag ") == "Retrieval augmented generation"
+    assert cache.get("What is RAG?", namespace="other") is None
+    assert cache.stats()["exact_hits"] == 1
+
+def test_entries_survive_a_restart(tmp_path):
+    ResponseCache(tmp_path).put("What is RAG?", "answer")
+    assert ResponseCache(tmp_path).get("what is rag") == "answer"
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = ResponseCache(tmp_path, ttl_seconds=0.05)
+    cache.put("What is RAG?", "answer")
+    time.sleep(0.1)
+    assert cache.get("What is RAG?") is None
+    assert cache.stats()["expirations"] == 1
+    assert ResponseCache(tmp_path, ttl_seconds=0.05).stats()["entries"] == 0
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResponseCache(tmp_path, max_entries=2)
+    cache.put("first", "1")
+    cache.put("second", "2")
+    assert cache.get("first") == "1"  # Now "second" is the least recently used
+    cache.put("third", "3")
+    assert cache.get("second") is None
+    assert cache.get("first") == "1"
+    assert cache.get("third") == "3"
+    assert cache.stats()["evictions"] == 1
+
+def test_semantic_hit_needs_the_threshold(tmp_path):
+    embed = FakeEmbedding({
+        "what is retrieval augmented generation": [1.0, 0.0, 0.0],
+        "explain retrieval augmented generation": [0.99, 0.141, 0.0],  # cosine ~0.99
+        "describe retrieval augmented generation": [0.8, 0.6, 0.0],    # cosine 0.8
+    })
+    cache = ResponseCache(tmp_path, embed_model=embed, similarity_threshold=0.95)
+    cache.put("what is retrieval augmented generation", "RAG answer")
+    assert cache.get("explain retrieval augmented generation") == "RAG answer"
+    assert cache.get("describe retrieval augmented generation") is None
+    stats = cache.stats()
+    assert (stats["semantic_hits"], stats["misses"]) == (1, 1)
+
+def test_semantic_hit_needs_the_same_specifics(tmp_path):
+    # Every query embeds identically, so only the specifics can tell them apart
+    same = [1.0, 0.0, 0.0]
+    embed = FakeEmbedding({q: same for q in (
+        "what is 12 times 3", "what is 13 times 3", "what is 12 times 3 exactly",
+        "weather in Tokyo", "weather in Paris",
+        "tell me about pandas", "tell me about numpy", "tell me about pandas please",
+    )})
+    cache = ResponseCache(tmp_path, embed_model=embed, similarity_threshold=0.9)
+    cache.put("what is 12 times 3", "36")
+    cache.put("weather in Tokyo", "sunny", namespace="weather")
+    cache.put("tell me about pandas", "pandas answer", namespace="packages",
+              sources=[tool_source("python_package_info", package_name="pandas")])
+
+    assert cache.get("what is 13 times 3") is None
+    assert cache.get("what is 12 times 3 exactly") == "36"
+    assert cache.get("weather in Paris", namespace="weather") is None
+    assert cache.get("tell me about numpy", namespace="packages") is None
+    assert cache.get("tell me about pandas please", namespace="packages") == "pandas answer"
+
+def test_answers_from_uncacheable_tools_are_not_stored(tmp_path):
+    cache = ResponseCache(tmp_path, uncacheable_tools=["weather_tool"])
+    cache.put("weather in Tokyo", "sunny", sources=[tool_source("weather_tool", location="Tokyo")])
+    cache.put("what is pandas", "a library", sources=[tool_source("python_package_info", package_name="pandas")])
+    assert cache.get("weather in Tokyo") is None
+    assert cache.get("what is pandas") == "a library"
@@ -0,0 +1,84 @@
+"""
+Tests for the fast-path router's rules.
+
+Flow:
+1. Build a FastPathRouter over stub tools with the real tool names and no embedding model,
+   so only RULES apply
+2. Check direct tool queries are matched with the right tool and arguments
+3. Check queries that need the agent (unknown cities or packages, several tools,
+   explanations) are not matched
+4. Check answer() returns the tool output, falls back on tool errors and counts hits
+
+Run from the project root with: python -m pytest unit_test/test_router_rules.py
+"""
+
+import pytest
+
+from llama_index.core.tools import FunctionTool
+
+from agents.router import FastPathRouter
+from data.sample_documents import PYTHON_PACKAGES
+
+def make_tool(name, fn):
+    return FunctionTool.from_defaults(fn=fn, name=name, description=name)
+
+def calculator(operation: str, a: float, b: float = 0) -> str:
+    return f"{operation}({a}, {b})"
+
+def weather(location: str) -> str:
+    return f"Weather in {location}"
+
+def package_info(package_name: str) -> str:
+    return "Error: unknown package" if package_name == "broken" else f"About {package_name}"
+
+def make_router():
+    return FastPathRouter([
+        make_tool("calculator", calculator),
+        make_tool("weather_tool", weather),
+        make_tool("python_package_info", package_info),
+    ])
+
+@pytest.mark.parametrize("query, tool, arguments", [
+    ("What is the square root of 144?", "calculator", {"operation": "square_root", "a": 144}),
+    ("sqrt 2.25", "calculator", {"operation": "square_root", "a": 2.25}),
+    ("What is 17 * 23?", "calculator", {"operation": "multiply", "a": 17, "b": 23}),
+    ("calculate 10 divided by 4", "calculator", {"operation": "divide", "a": 10, "b": 4}),
+    ("2 to the power of 8", "calculator", {"operation": "power", "a": 2, "b": 8}),
+    ("What's the weather in Tokyo?", "weather_tool", {"location": "tokyo"}),
+    ("Please, weather for New York today", "weather_tool", {"location": "new york"}),
+    ("london weather", "weather_tool", {"location": "london"}),
+    ("What is pandas?", "python_package_info", {"package_name": "pandas"}),
+    ("tell me about the scikit-learn library", "python_package_info", {"package_name": "scikit-learn"}),
+])
+def test_direct_tool_queries_match(query, tool, arguments):
+    assert make_router().match(query) == (tool, arguments, "rule")
+
+@pytest.mark.parametrize("query", [
+    "What's the weather in Atlantis?",
+    "What is quantum computing?",
+    "Compare the weather in London and Paris",
+    "What is the weather in Tokyo and what is 12 times 12?",
+    "Explain retrieval augmented generation",
+    "How does LlamaIndex relate to numpy?",
+])
+def test_agent_queries_do_not_match(query):
+    assert make_router().match(query) is None
+
+def test_rules_for_missing_tools_are_skipped():
+    router = FastPathRouter([make_tool("weather_tool", weather)])
+    assert router.match("What is 17 * 23?") is None
+    assert router.match("weather in paris") == ("weather_tool", {"location": "paris"}, "rule")
+
+def test_answer_returns_the_tool_output_and_counts_hits():
+    router = make_router()
+    assert router.answer("weather in Paris") == "Weather in paris"
+    assert router.answer("Explain RAG") is None
+    stats = router.stats()
+    assert (stats["queries"], stats["rule_hits"], stats["hits_weather_tool"]) == (2, 1, 1)
+    assert stats["saved_llm_calls"] == 2
+
+def test_tool_errors_fall_back_to_the_agent(monkeypatch):
+    monkeypatch.setitem(PYTHON_PACKAGES, "broken", "")  # Known to the rules, but the tool fails
+    router = make_router()
+    assert router.answer("what is broken") is None
+    assert router.stats()["tool_errors"] == 1
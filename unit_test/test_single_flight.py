@@ -0,0 +1,144 @@
+"""
+Tests for single-flight request coalescing.
+
+Flow:
+1. Start a slow leading call for a key, then make followers with the same key
+2. Check followers share the leader's result without running the call again
+3. Check error paths: a backend error is shared, while a leader that runs out of its own
+   deadline (or is cancelled, in the async variant) makes the followers run the call
+   themselves instead of failing with it
+4. Check a follower gives up at its own deadline and that stats() adds up
+
+Run from the project root with: python -m pytest unit_test/test_single_flight.py
+"""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+from cache.single_flight import SingleFlight
+from utils.deadline import DeadlineExceeded, deadline
+
+def start_leader(flight, key, fn, results, errors, seconds=None):
+    """Run flight.do(key, fn) on a thread (under a deadline if seconds is set)."""
+    def run():
+        try:
+            with deadline(seconds):
+                results.append(flight.do(key, fn))
+        except BaseException as e:
+            errors.append(e)
+    thread = threading.Thread(target=run)
+    thread.start()
+    time.sleep(0.05)  # Let it take the lead
+    return thread
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight("test")
+    runs = []
+
+    def slow():
+        runs.append(1)
+        time.sleep(0.2)
+        return {"answer": 42}
+
+    results, errors = [], []
+    leader = start_leader(flight, "k", slow, results, errors)
+    assert flight.do("k", slow) == ({"answer": 42}, True)
+    leader.join()
+    assert results == [({"answer": 42}, False)] and not errors
+    assert len(runs) == 1
+    stats = flight.stats()
+    assert (stats["calls"], stats["executions"], stats["coalesced"], stats["in_flight"]) == (2, 1, 1, 0)
+    assert stats["coalesce_rate"] == 0.5
+
+def test_backend_errors_are_shared():
+    flight = SingleFlight("test")
+    runs = []
+
+    def failing():
+        runs.append(1)
+        time.sleep(0.2)
+        raise ValueError("backend down")
+
+    results, errors = [], []
+    leader = start_leader(flight, "k", failing, results, errors)
+    with pytest.raises(ValueError, match="backend down"):
+        flight.do("k", failing)
+    leader.join()
+    assert isinstance(errors[0], ValueError)
+    assert len(runs) == 1
+
+def test_leader_deadline_makes_followers_retry():
+    flight = SingleFlight("test")
+    runs = []
+
+    def call():
+        runs.append(1)
+        time.sleep(0.2)
+        return "done"
+
+    def leader_call():
+        # Stands in for an LLM call that gives up when its query's deadline passes
+        runs.append(1)
+        time.sleep(0.1)
+        raise DeadlineExceeded("leader out of time")
+
+    results, errors = [], []
+    leader = start_leader(flight, "k", leader_call, results, errors)
+    assert flight.do("k", call) == ("done", False)
+    leader.join()
+    assert isinstance(errors[0], DeadlineExceeded)
+    assert len(runs) == 2
+
+def test_follower_gives_up_at_its_own_deadline():
+    flight = SingleFlight("test")
+    results, errors = [], []
+    leader = start_leader(flight, "k", lambda: time.sleep(0.5) or "late", results, errors)
+    start = time.monotonic()
+    with deadline(0.1), pytest.raises(DeadlineExceeded):
+        flight.do("k", lambda: "unused")
+    assert time.monotonic() - start < 0.3
+    leader.join()
+    assert results == [("late", False)]
+
+def test_async_followers_share_the_result_and_survive_a_cancelled_leader():
+    flight = SingleFlight("test")
+    runs = []
+
+    async def slow():
+        runs.append(1)
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def main():
+        shared = await asyncio.gather(flight.ado("a", slow), flight.ado("a", slow))
+        assert sorted(shared, key=lambda r: r[1]) == [("result", False), ("result", True)]
+
+        leader = asyncio.create_task(flight.ado("b", slow))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(flight.ado("b", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # The follower ran the call itself rather than being cancelled too
+        assert await follower == ("result", False)
+
+    asyncio.run(main())
+    assert len(runs) == 3
+
+def test_async_backend_errors_are_shared():
+    flight = SingleFlight("test")
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise ValueError("backend down")
+
+    async def main():
+        return await asyncio.gather(flight.ado("k", failing), flight.ado("k", failing), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.stats()["executions"] == 1
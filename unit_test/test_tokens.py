@@ -0,0 +1,42 @@
+"""
+Tests for the token budgeting helpers.
+
+Flow:
+1. Count tokens with the global tokenizer
+2. Check truncate_to_tokens() leaves short text alone, cuts long text at a word boundary
+   and marks the cut
+3. Check text without usable word boundaries (long JSON, URLs, base64) is cut by characters
+   to a prefix that uses the budget rather than being erased
+
+Run from the project root with: python -m pytest unit_test/test_tokens.py
+"""
+
+from utils.tokens import TRUNCATION_MARKER, count_tokens, truncate_to_tokens
+
+def test_count_tokens():
+    assert count_tokens("") == 0
+    assert count_tokens("hello world") > 0
+
+def test_text_within_budget_is_unchanged():
+    text = "short text"
+    assert truncate_to_tokens(text, 50) == text
+
+def test_long_text_is_cut_at_a_word_boundary():
+    text = " ".join(f"word{i}" for i in range(500))
+    truncated = truncate_to_tokens(text, 50)
+    assert truncated.endswith(TRUNCATION_MARKER)
+    assert count_tokens(truncated) <= 50
+    kept = truncated[:-len(TRUNCATION_MARKER)]
+    assert text.startswith(kept + " ")
+    # Keeping one more word would go over the budget
+    next_word = text[len(kept):].split(" ")[1]
+    assert count_tokens(f"{kept} {next_word}{TRUNCATION_MARKER}") > 50
+
+def test_unspaced_text_is_cut_by_characters():
+    text = "a1b2c3d4" * 1000  # One "word" far over the budget
+    truncated = truncate_to_tokens(text, 50)
+    assert truncated.endswith(TRUNCATION_MARKER)
+    assert count_tokens(truncated) <= 50
+    assert text.startswith(truncated[:-len(TRUNCATION_MARKER)])
+    # Most of the budget is used, not just a sliver
+    assert count_tokens(truncated) >= 40
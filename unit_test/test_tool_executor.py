@@ -0,0 +1,106 @@
+"""
+Tests for the concurrent ToolExecutor.
+
+Flow:
+1. Wrap small sleeping functions as FunctionTools
+2. Run several calls of one turn and check they run in parallel and come back in order
+3. Check timeouts: a slow call returns an error ToolOutput, the clock starts when the call
+   starts running, a query deadline cuts the limit short, and per-tool limits make extra
+   calls wait for a slot (bounded by the same limit)
+4. Check the async path and the ExecutorTool wrapper follow the same rules
+
+Run from the project root with: python -m pytest unit_test/test_tool_executor.py
+"""
+
+import time
+import asyncio
+
+from llama_index.core.tools import FunctionTool
+
+from tools.tool_executor import ToolExecutor
+from utils.deadline import deadline
+
+def sleep_for(seconds: float) -> str:
+    """Sleep, then echo the duration."""
+    time.sleep(seconds)
+    return f"slept {seconds}"
+
+def echo(text: str) -> str:
+    """Return the text."""
+    return text
+
+SLOW = FunctionTool.from_defaults(fn=sleep_for, name="slow")
+ECHO = FunctionTool.from_defaults(fn=echo, name="echo")
+
+def test_calls_run_in_parallel_and_keep_their_order():
+    executor = ToolExecutor(max_workers=4, timeout=5.0)
+    start = time.monotonic()
+    outputs = executor.run([(SLOW, {"seconds": 0.3}), (ECHO, {"text": "a"}), (SLOW, {"seconds": 0.3})])
+    assert time.monotonic() - start < 0.55
+    assert [o.content for o in outputs] == ["slept 0.3", "a", "slept 0.3"]
+    executor.shutdown()
+
+def test_slow_call_times_out_with_an_error_output():
+    executor = ToolExecutor(max_workers=2, timeout=0.2)
+    start = time.monotonic()
+    output = executor.call(SLOW, {"seconds": 1.0})
+    assert time.monotonic() - start < 0.5
+    assert output.is_error
+    assert output.content == "Tool slow timed out after 0.2 seconds"
+    assert output.raw_input == {"seconds": 1.0}
+    executor.shutdown()
+
+def test_per_tool_override():
+    executor = ToolExecutor(max_workers=2, timeout=0.1, tool_timeouts={"slow": 1.0})
+    assert executor.call(SLOW, {"seconds": 0.3}).content == "slept 0.3"
+    executor.shutdown()
+
+def test_timeout_counts_from_when_the_call_starts():
+    # One worker: the second call queues behind the first but still gets its full 0.5s
+    executor = ToolExecutor(max_workers=1, timeout=0.5)
+    outputs = executor.run([(SLOW, {"seconds": 0.3}), (SLOW, {"seconds": 0.3})])
+    assert [o.content for o in outputs] == ["slept 0.3", "slept 0.3"]
+    executor.shutdown()
+
+def test_deadline_cuts_the_timeout_short():
+    executor = ToolExecutor(max_workers=2, timeout=5.0)
+    start = time.monotonic()
+    with deadline(0.2):
+        output = executor.call(SLOW, {"seconds": 1.0})
+    assert time.monotonic() - start < 0.5
+    assert output.is_error and "timed out" in output.content
+    executor.shutdown()
+
+def test_tool_limit_is_taken_before_queueing():
+    executor = ToolExecutor(max_workers=4, timeout=0.4, tool_concurrency={"slow": 1})
+    start = time.monotonic()
+    outputs = executor.run([(SLOW, {"seconds": 1.0}), (SLOW, {"seconds": 0.1}), (ECHO, {"text": "a"})])
+    assert time.monotonic() - start < 0.7
+    assert outputs[0].content == "Tool slow timed out after 0.4 seconds"
+    assert outputs[1].content == "Tool slow timed out after 0.4 seconds waiting for a free slot"
+    assert outputs[2].content == "a"
+    executor.shutdown()
+
+def test_async_calls_follow_the_same_limits():
+    executor = ToolExecutor(max_workers=4, timeout=0.4, tool_concurrency={"slow": 1})
+
+    async def main():
+        return await executor.arun([(SLOW, {"seconds": 0.2}), (SLOW, {"seconds": 0.2}), (ECHO, {"text": "a"})])
+
+    outputs = asyncio.run(main())
+    # The second call waits for the first one's slot, then gets its own 0.4s
+    assert [o.content for o in outputs] == ["slept 0.2", "slept 0.2", "a"]
+
+    async def slow():
+        return await executor.arun([(SLOW, {"seconds": 1.0})])
+
+    assert asyncio.run(slow())[0].content == "Tool slow timed out after 0.4 seconds"
+    executor.shutdown()
+
+def test_wrapped_tool_uses_the_executor():
+    executor = ToolExecutor(max_workers=2, timeout=0.2)
+    wrapped = executor.wrap(SLOW)
+    assert wrapped.metadata.name == "slow"
+    assert wrapped.call(seconds=0.05).content == "slept 0.05"
+    assert wrapped.call(seconds=1.0).is_error
+    executor.shutdown()
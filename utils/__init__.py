@@ -0,0 +1 @@
+# Initialize utils package
@@ -0,0 +1,80 @@
+"""
+Query Deadlines
+
+A latency budget for one query, visible to everything the query runs:
+
+1. SCOPE: deadline(seconds) opens a Deadline for the enclosed block. It lives in a contextvar,
+   so LLM calls, tool calls (which run in a copy of the caller's context) and agent steps see
+   it without extra arguments; a nested deadline never extends the enclosing one
+2. REMAINING TIME: remaining_time() is the time left, or None when no deadline is set;
+   bounded_timeout() caps an HTTP (connect, read) timeout to it
+3. EXPIRY: Work that cannot start or finish in time raises DeadlineExceeded, which the agent
+   turns into its best partial answer
+
+Unlike a SIGALRM alarm this works on any thread and in asyncio tasks, and the agent returns
+what it has so far instead of abandoning the query.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work cannot start or finish before the query's deadline."""
+
+class Deadline:
+    """Absolute point in time by which a query should be answered."""
+
+    def __init__(self, seconds: float, expires_at: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = expires_at if expires_at is not None else time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self, what: str = "Query"):
+        """Raise DeadlineExceeded if the deadline has passed."""
+        if self.expired:
+            raise DeadlineExceeded(f"{what} exceeded its {self.seconds:g} second deadline")
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    """The innermost active deadline, or None."""
+    return _current.get()
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline, or None when there is none."""
+    active = _current.get()
+    return None if active is None else active.remaining()
+
+def bounded_timeout(timeout: Tuple[float, float]) -> Tuple[float, float]:
+    """A (connect, read) timeout that does not outlast the current deadline."""
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    connect, read = timeout
+    return min(connect, remaining), min(read, remaining)
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Run the block under a deadline `seconds` from now (no new deadline if seconds is None)."""
+    enclosing = _current.get()
+    if seconds is None:
+        yield enclosing
+        return
+    expires_at = time.monotonic() + seconds
+    if enclosing is not None:
+        expires_at = min(expires_at, enclosing.expires_at)
+    active = Deadline(seconds, expires_at)
+    token = _current.set(active)
+    try:
+        yield active
+    finally:
+        _current.reset(token)
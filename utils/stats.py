@@ -0,0 +1,37 @@
+"""
+Latency Statistics
+
+Small helpers for summarising latency samples:
+
+1. PERCENTILES: Linear-interpolated percentiles (p50/p95/p99) without extra dependencies
+2. SUMMARIES: A single dictionary with count, mean, min, max and the common percentiles
+"""
+
+import math
+from typing import Dict, Sequence
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Return the pct-th percentile (0-100) of values using linear interpolation."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+def summarize_latencies(values: Sequence[float]) -> Dict[str, float]:
+    """Summarise latency samples (in seconds)."""
+    if not values:
+        return {"count": 0, "mean": 0.0, "min": 0.0, "max": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "min": min(values),
+        "max": max(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
@@ -0,0 +1,47 @@
+"""
+Token Counting
+
+Small helpers for keeping text within a token budget:
+
+1. COUNTING: count_tokens() uses LlamaIndex's global tokenizer (tiktoken cl100k by default),
+   close enough to local models' tokenizers for budgeting
+2. TRUNCATION: truncate_to_tokens() cuts text at a word boundary so it fits a budget and
+   marks the cut; text whose first word alone is over budget (JSON, URLs, base64) is cut
+   by characters instead
+"""
+
+from llama_index.core.utils import get_tokenizer
+
+TRUNCATION_MARKER = " ..."
+CHARS_PER_TOKEN = 4             # Rough average for English text, used when no word boundary fits
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text."""
+    return len(get_tokenizer()(text)) if text else 0
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of whole words (plus a marker) that fits max_tokens; text itself if it fits."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split(" ")
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER)
+    low, high = 0, len(words)
+    # Binary search on the number of words kept
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    if low:
+        return " ".join(words[:low]) + TRUNCATION_MARKER
+    # No whole word fits: keep a character slice rather than erasing the text, searching
+    # up to twice the usual characters per token
+    low, high = 0, min(len(text), max(0, budget) * CHARS_PER_TOKEN * 2)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + TRUNCATION_MARKER
@@ -0,0 +1,289 @@
+"""
+Query Tracing
+
+Structured spans that show where the time of a single query goes:
+
+1. SPANS: span(name, kind, **attributes) times a block and nests it under the current span.
+   The current span lives in a contextvar, so each thread and asyncio task has its own stack
+2. TRACES: trace(name) opens the root span of one query; when it closes, the finished tree
+   is handed to the tracer
+3. KINDS: "query", "iteration" (one ReAct step), "llm" (latency and prompt/completion tokens
+   from `usage`), "retrieval", "embedding" and "tool"
+4. EXPORT: Finished traces are appended to a JSONL file, aggregated per span kind for
+   Prometheus-style text metrics, and optionally printed as a flame-style summary
+5. OFF BY DEFAULT: Without an active trace, span() is a contextvar lookup and a no-op
+
+Enable with TRACING_ENABLED in config.py or the --trace command-line flag.
+"""
+
+import json
+import time
+import uuid
+import logging
+import importlib
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_BAR_WIDTH = 30
+
+class Span:
+    """One timed operation with attributes and child spans."""
+
+    __slots__ = ("name", "kind", "attributes", "start", "end", "children", "error")
+
+    def __init__(self, name: str, kind: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        """Add or update attributes."""
+        self.attributes.update(attributes)
+
+    def finish(self):
+        """Stop the clock of a span opened with start_span()."""
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def walk(self) -> Iterator["Span"]:
+        """This span and all of its descendants, depth first."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """JSON-serializable tree; offsets are relative to `origin` (the root start)."""
+        origin = self.start if origin is None else origin
+        data = {
+            "name": self.name,
+            "kind": self.kind,
+            "offset_s": round(self.start - origin, 6),
+            "duration_s": round(self.duration, 6),
+            "attributes": self.attributes,
+        }
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+class _NullSpan:
+    """Stand-in returned when no trace is active; attributes are discarded."""
+
+    def set(self, **attributes: Any):
+        pass
+
+    def finish(self):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_span():
+    """The innermost active span, or a no-op span outside a trace."""
+    return _current_span.get() or NULL_SPAN
+
+@contextmanager
+def _activate(span: Span) -> Iterator[Span]:
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span.end = time.perf_counter()
+        _current_span.reset(token)
+
+@contextmanager
+def span(name: str, kind: str, **attributes: Any) -> Iterator[Any]:
+    """Record a child of the current span; does nothing outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield NULL_SPAN
+        return
+    child = Span(name, kind, attributes)
+    parent.children.append(child)
+    with _activate(child):
+        yield child
+
+def start_span(name: str, kind: str, **attributes: Any):
+    """Attach a child to the current span without making it current; call finish() when done.
+
+    For work that outlives the caller's block, such as a generator that is consumed
+    (and possibly closed) elsewhere.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NULL_SPAN
+    child = Span(name, kind, attributes)
+    parent.children.append(child)
+    return child
+
+@contextmanager
+def trace(name: str, **attributes: Any) -> Iterator[Any]:
+    """Open the root span of a query when tracing is enabled.
+
+    Nested calls (e.g. query() delegating to another traced method) join the
+    active trace as a child span instead of starting a new one.
+    """
+    if _current_span.get() is not None:
+        with span(name, "query", **attributes) as child:
+            yield child
+        return
+    tracer = get_tracer()
+    if not tracer.enabled:
+        yield NULL_SPAN
+        return
+    root = Span(name, "query", attributes)
+    try:
+        with _activate(root):
+            yield root
+    finally:
+        tracer.finish(root)
+
+def format_summary(root: Span) -> str:
+    """Flame-style text view of a finished trace: one bar per span, scaled to the root."""
+    total = root.duration or 1e-9
+    lines = []
+    for depth, item in _walk_with_depth(root):
+        width = max(1, round(SUMMARY_BAR_WIDTH * item.duration / total))
+        attributes = " ".join(f"{k}={v}" for k, v in item.attributes.items() if k != "query")
+        lines.append(
+            f"{item.duration * 1000:>9.1f} ms {100 * item.duration / total:>5.1f}% "
+            f"{'#' * width:<{SUMMARY_BAR_WIDTH}} {'  ' * depth}{item.name}"
+            + (f"  [{attributes}]" if attributes else "")
+            + (f"  !! {item.error}" if item.error else "")
+        )
+
+    by_kind: Dict[str, float] = {}
+    for child in root.children:
+        for item in _top_level_by_kind(child):
+            by_kind[item.kind] = by_kind.get(item.kind, 0.0) + item.duration
+    breakdown = ", ".join(f"{kind} {seconds * 1000:.0f} ms" for kind, seconds in sorted(by_kind.items(), key=lambda kv: -kv[1]))
+    header = f"Trace {root.name}: {total * 1000:.1f} ms" + (f" ({breakdown})" if breakdown else "")
+    return "\n".join([header] + lines)
+
+def _walk_with_depth(root: Span, depth: int = 0) -> Iterator[Tuple[int, Span]]:
+    yield depth, root
+    for child in root.children:
+        yield from _walk_with_depth(child, depth + 1)
+
+def _top_level_by_kind(item: Span) -> Iterator[Span]:
+    """Outermost spans below the query/iteration levels, so nested time is not counted twice."""
+    if item.kind not in ("query", "iteration"):
+        yield item
+        return
+    for child in item.children:
+        yield from _top_level_by_kind(child)
+
+class Tracer:
+    """Collects finished traces: JSONL export, per-kind metrics and printed summaries."""
+
+    def __init__(self, enabled: bool = False, jsonl_path: Optional[Path] = None, print_summary: bool = False):
+        self.enabled = enabled
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.print_summary = print_summary
+        self._lock = threading.Lock()
+        self._traces = 0
+        self._spans: Dict[str, Dict[str, float]] = {}
+        self._tokens = {"prompt": 0, "completion": 0}
+
+    def configure(self, enabled: Optional[bool] = None, jsonl_path: Optional[Path] = None, print_summary: Optional[bool] = None):
+        """Change settings at runtime (e.g. from command-line flags)."""
+        if enabled is not None:
+            self.enabled = enabled
+        if jsonl_path is not None:
+            self.jsonl_path = Path(jsonl_path)
+        if print_summary is not None:
+            self.print_summary = print_summary
+
+    def finish(self, root: Span):
+        """Record a finished trace."""
+        record = {
+            "trace_id": uuid.uuid4().hex,
+            "timestamp": time.time(),
+            **root.to_dict(),
+        }
+        with self._lock:
+            self._traces += 1
+            for item in root.walk():
+                stats = self._spans.setdefault(item.kind, {"count": 0, "seconds": 0.0, "errors": 0})
+                stats["count"] += 1
+                stats["seconds"] += item.duration
+                stats["errors"] += 1 if item.error else 0
+                if item.kind == "llm":
+                    self._tokens["prompt"] += item.attributes.get("prompt_tokens") or 0
+                    self._tokens["completion"] += item.attributes.get("completion_tokens") or 0
+            if self.jsonl_path is not None:
+                try:
+                    self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                except OSError as e:
+                    logger.warning(f"Could not write trace to {self.jsonl_path}: {e}")
+
+        if self.print_summary:
+            print("\n" + format_summary(root))
+        logger.debug(f"Trace {root.name} finished in {root.duration:.3f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals per span kind and LLM token counts."""
+        with self._lock:
+            return {
+                "traces": self._traces,
+                "spans": {kind: dict(values) for kind, values in self._spans.items()},
+                "tokens": dict(self._tokens),
+            }
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition of the aggregated span metrics."""
+        stats = self.stats()
+        lines = [
+            "# TYPE agent_traces_total counter",
+            f"agent_traces_total {stats['traces']}",
+            "# TYPE agent_span_seconds_total counter",
+        ]
+        for kind, values in sorted(stats["spans"].items()):
+            lines.append(f'agent_span_seconds_total{{kind="{kind}"}} {values["seconds"]:.6f}')
+        lines.append("# TYPE agent_spans_total counter")
+        for kind, values in sorted(stats["spans"].items()):
+            lines.append(f'agent_spans_total{{kind="{kind}"}} {values["count"]}')
+        lines.append("# TYPE agent_span_errors_total counter")
+        for kind, values in sorted(stats["spans"].items()):
+            lines.append(f'agent_span_errors_total{{kind="{kind}"}} {values["errors"]}')
+        lines.append("# TYPE agent_llm_tokens_total counter")
+        for token_type, count in stats["tokens"].items():
+            lines.append(f'agent_llm_tokens_total{{type="{token_type}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+def get_tracer(config: Optional[Dict[str, Any]] = None) -> Tracer:
+    """Return the process-wide tracer, configured from config.py on first use."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                config = config or vars(importlib.import_module("config"))
+                _tracer = Tracer(
+                    enabled=config.get("TRACING_ENABLED", False),
+                    jsonl_path=config.get("TRACE_JSONL_PATH"),
+                    print_summary=config.get("TRACE_PRINT_SUMMARY", False),
+                )
+    return _tracer